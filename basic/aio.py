@@ -0,0 +1,602 @@
+"""
+Модуль содержит асинхронные (asyncio) аналоги классов Request, BasicAdapter и LogReader: AsyncRequest,
+AsyncBasicAdapter и AsyncLogReader с теми же методами. HTTP запросы выполняются через aiohttp, запросы к БД
+и локальный поиск по логам - в ограниченном пуле потоков (см. blocking_executor), поэтому в одном цикле событий
+можно одновременно отправлять тысячи сообщений, проверять карточки и искать логи.
+
+Асинхронные классы не повторяют логику синхронных: формирование запросов, локальный поиск, разбор ответов,
+постраничный запрос логов (LogPages) и проверки выполняются объектами и функциями синхронных классов
+(AsyncBasicAdapter.adapter, AsyncLogReader.reader), в корутинах остаются только ожидание ввода-вывода и вызовы
+в пуле потоков. Новая логика добавляется в синхронные классы, асинхронные только вызывают ее.
+
+    async with AsyncBasicAdapter(12, "http://10.100.122.5:8080/adapter", "application/json") as adapter:
+        await asyncio.gather(*(adapter.r.send(msg) for msg in msgs))
+        report = await adapter.check_cards(cards_info, workers=100)
+
+:author: Andrei Ursaki.
+"""
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import aiohttp
+import allure
+
+from basic import db_config
+from basic.basic_adapter import BasicAdapter
+from basic.card_verifier import CardVerifier
+from basic.check_report import CheckReport
+from basic.config import Config
+from basic.instrumentation import instrumentation
+from basic.json_stream import JsonArrayParser, JsonStreamResult
+from basic.load_generator import LoadGenerator, LoadReport
+from basic.log_reader import LogPages, LogReader, LogsAttachment
+from basic.log_search import LocalLogSearch
+from basic.request import encode_message, message_text, print_response, request_headers, with_delays
+from basic.waiter import Waiter, WaitResult
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# общая HTTP сессия и цикл событий, в котором она создана, см. shared_session
+_shared = None
+
+
+def blocking_executor() -> ThreadPoolExecutor:
+    """
+    Функция для получения общего пула потоков для блокирующих операций (запросы к БД, чтение логов).
+    Количество потоков равно размеру пула соединений с БД, поэтому потоки не ждут свободного соединения.
+
+    :return: объект класса ThreadPoolExecutor
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=db_config.pool_size, thread_name_prefix="basic-blocking")
+        return _executor
+
+
+def create_session(limit: int = None) -> aiohttp.ClientSession:
+    """
+    Функция для создания HTTP сессии aiohttp с параметрами из Config. Вызывается внутри цикла событий.
+
+    :param limit: максимальное количество одновременных соединений, по умолчанию Config.aio_connection_limit
+    :return: объект класса aiohttp.ClientSession
+    """
+    connect_timeout, read_timeout = Config.http_timeout
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=limit or Config.aio_connection_limit),
+                                 timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout))
+
+
+def shared_session() -> aiohttp.ClientSession:
+    """
+    Функция для получения общей HTTP сессии текущего цикла событий, аналог Transport.shared. Используется
+    запросами, которым сессия не передана (AsyncRequest.send_request), закрывается функцией close_shared_session.
+
+    :return: объект класса aiohttp.ClientSession
+    """
+    global _shared
+    loop = asyncio.get_running_loop()
+    if _shared is None or _shared[0] is not loop or _shared[1].closed:
+        _shared = (loop, create_session())
+    return _shared[1]
+
+
+async def close_shared_session():
+    """
+    Функция для закрытия общей HTTP сессии, вызывается в конце работы цикла событий.
+    """
+    global _shared
+    if _shared is not None and _shared[0] is asyncio.get_running_loop():
+        session, _shared = _shared[1], None
+        await session.close()
+
+
+class AsyncResponse:
+    __slots__ = ("status_code", "content", "headers", "encoding")
+
+    def __init__(self, status_code: int, content: bytes, headers, encoding: str):
+        """
+        Конструктор класса. Полностью прочитанный ответ сервера, аналог requests.Response.
+
+        :param status_code: код ответа
+        :param content: тело ответа
+        :param headers: заголовки ответа
+        :param encoding: кодировка ответа
+        """
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.encoding = encoding
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class _SessionOwner:
+    def __init__(self, session: aiohttp.ClientSession = None):
+        """
+        Конструктор класса. Если сессия не передана, она создается при первом запросе и закрывается методом close.
+
+        :param session: общая HTTP сессия aiohttp
+        """
+        self._session = session
+        self._own_session = session is None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = create_session()
+            self._own_session = True
+        return self._session
+
+    async def close(self):
+        """
+        Метод для закрытия HTTP сессии, если она создана этим объектом.
+        """
+        if self._own_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+async def post(session: aiohttp.ClientSession, endpoint: str, data: bytes, headers: dict = None,
+               verify: bool = True) -> AsyncResponse:
+    """
+    Функция для отправки POST запроса и чтения ответа.
+
+    :param session: HTTP сессия aiohttp
+    :param endpoint: url/endpoint
+    :param data: тело запроса
+    :param headers: заголовки для запроса
+    :param verify: проверять ли сертификат сервера
+    :return: ответ сервера
+    """
+    with instrumentation.span("http", f"POST {endpoint}", bytes_sent=len(data)) as attrs:
+        async with session.post(endpoint, data=data, headers=headers, ssl=None if verify else False) as response:
+            content = await response.read()
+            attrs["status"] = response.status
+            return AsyncResponse(response.status, content, response.headers, response.charset)
+
+
+class AsyncLoadGenerator(LoadGenerator):
+    """
+    Асинхронный аналог LoadGenerator: сообщения отправляются корутинами в одном цикле событий, см. LoadGenerator.
+    """
+
+    async def _send(self, msg, report: LoadReport):
+        start = time.perf_counter()
+        try:
+            status = (await self.request.post(msg)).status_code
+        except Exception as e:
+            status = type(e).__name__
+        report.add(time.perf_counter() - start, status)
+
+    async def run(self, msgs, duration: float = None) -> LoadReport:
+        report = LoadReport()
+        start = time.perf_counter()
+        deadline = start + duration if duration else None
+        if self.rate is None:
+            await self._run_closed_loop(iter(msgs), report, deadline)
+        else:
+            await self._run_open_loop(iter(msgs), report, start, deadline)
+        report.duration = time.perf_counter() - start
+        return report
+
+    async def _run_closed_loop(self, msgs, report: LoadReport, deadline: float):
+        end = object()
+
+        async def worker():
+            while True:
+                msg = self._next_message(msgs, deadline, end)
+                if msg is end:
+                    return
+                await self._send(msg, report)
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+    async def _run_open_loop(self, msgs, report: LoadReport, start: float, deadline: float):
+        in_flight = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        async def send(msg):
+            try:
+                await self._send(msg, report)
+            finally:
+                in_flight.release()
+
+        for msg, send_at in self._open_loop_plan(msgs, start, deadline):
+            delay = send_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # не даем очереди расти, если сервер не успевает отвечать
+            await in_flight.acquire()
+            task = asyncio.ensure_future(send(msg))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+
+class AsyncRequest(_SessionOwner):
+
+    def __init__(self, endpoint, content_type, session: aiohttp.ClientSession = None):
+        """
+        Конструктор класса.
+
+        :param endpoint: url/endpoint адаптера
+        :param content_type: тип данных, используемых в сообщении
+        :param session: общая HTTP сессия aiohttp, по умолчанию создается своя
+        """
+        super().__init__(session)
+        self.endpoint = endpoint
+        self.content_type = content_type
+
+    @staticmethod
+    async def send_request(input_msg, endpoint, content_type, print_msg=False, headers=None, session=None):
+        msg = encode_message(input_msg)
+        session = session or shared_session()
+        response = await post(session, endpoint, msg, request_headers(content_type, headers), verify=False)
+        logger.debug("Message sent to %s", endpoint)
+        if print_msg:
+            print(message_text(input_msg))
+        return response.text
+
+    async def post(self, input_msg, header=None) -> AsyncResponse:
+        """
+        Метод для отправки сообщения адаптеру без печати/вывода.
+
+        :param input_msg: сообщение (str или bytes, например из MessageTemplate)
+        :param header: дополнительные заголовки для запроса
+        :return: ответ сервера
+        """
+        return await post(self.session, self.endpoint, encode_message(input_msg),
+                          request_headers(self.content_type, header))
+
+    async def send(self, input_msg, print_msg=False, header=None):
+        response = await self.post(input_msg, header)
+        logger.debug("Message sent to %s", self.endpoint)
+        print_response(input_msg, response, print_msg)
+
+    async def send_requests_with_delay(self, msgs, delay=30, print_msg=False):
+        for pause, msg in with_delays(msgs, delay):
+            if pause:
+                await asyncio.sleep(pause)
+            await self.send(msg, print_msg=print_msg)
+
+    async def send_load(self, msgs, rate=None, concurrency=10, ramp_up=None, duration=None) -> LoadReport:
+        """
+        Метод для нагрузочной отправки сообщений, см. Request.send_load.
+        """
+        limit = self.session.connector.limit
+        if not limit or concurrency <= limit:
+            generator = AsyncLoadGenerator(self, rate=rate, concurrency=concurrency, ramp_up=ramp_up)
+            return await generator.run(msgs, duration=duration)
+        # соединений сессии меньше конкурентности, для нагрузки нужна своя сессия
+        async with create_session(limit=concurrency) as session:
+            request = AsyncRequest(self.endpoint, self.content_type, session)
+            generator = AsyncLoadGenerator(request, rate=rate, concurrency=concurrency, ramp_up=ramp_up)
+            return await generator.run(msgs, duration=duration)
+
+
+class AsyncBasicAdapter:
+    def __init__(self, telemetry_system_id: int, endpoint: str, content_type: str,
+                 session: aiohttp.ClientSession = None, executor: ThreadPoolExecutor = None):
+        """
+        Конструктор класса.
+
+        :param telemetry_system_id: идентификационный номер телеметрической системы
+        :param endpoint: url/endpoint адаптера
+        :param content_type: тип данных, используемых в сообщении
+        :param session: общая HTTP сессия aiohttp, по умолчанию создается своя
+        :param executor: пул потоков для запросов к БД, по умолчанию общий (см. blocking_executor)
+        """
+        self.telemetry_system_id = telemetry_system_id
+        self.endpoint = endpoint
+        # синхронный адаптер, его методы работы с БД выполняются в пуле потоков
+        self.adapter = BasicAdapter(telemetry_system_id, endpoint, content_type)
+        self.sh = self.adapter.sh
+        self.r = AsyncRequest(endpoint, content_type, session)
+        self.executor = executor or blocking_executor()
+
+    async def _blocking(self, function, *args, **kwargs):
+        """
+        Метод для выполнения блокирующей функции в пуле потоков.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.executor,
+                                                                functools.partial(function, *args, **kwargs))
+
+    async def _check_data(self, sensor_code: str, info_dict: dict, route: str, header: dict = None,
+                          print_msg: bool = False) -> dict:
+        """
+        Метод для отправки запроса в CoordCom CardChecker, см. BasicAdapter.
+        """
+        info_dict = dict(info_dict, telemetry_system_id=self.telemetry_system_id, sensor_code=sensor_code)
+        result = await AsyncRequest.send_request(json.dumps(info_dict, ensure_ascii=False),
+                                                 f'{Config.card_checker_url}/{route}', 'application/json',
+                                                 headers=header, print_msg=print_msg, session=self.r.session)
+        result = json.loads(result).get("response")
+        if result:
+            return result
+
+    async def check_card(self, sensor_code: str, card_info: dict, local: bool = False) -> dict:
+        if local:
+            report = await self._blocking(CardVerifier(self.sh).verify_many, {sensor_code: card_info})
+            return report.results[sensor_code]
+        return await self._check_data(sensor_code, card_info, "checkByExternalSystemReference")
+
+    async def check_co(self, sensor_code: str, co_info: dict, header: dict = None) -> dict:
+        return await self._check_data(sensor_code, co_info, "checkCustomObject", header)
+
+    async def _check_many(self, info_dicts: dict, route: str, header: dict = None,
+                          workers: int = Config.check_workers) -> CheckReport:
+        """
+        Метод для одновременной отправки запросов в CoordCom CardChecker, не более workers запросов сразу.
+        """
+        report = CheckReport()
+        semaphore = asyncio.Semaphore(workers)
+
+        async def check(sensor_code, info_dict):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    result = await self._check_data(sensor_code, info_dict, route, header)
+                    error = None if result else "Пустой ответ CardChecker"
+                except Exception as e:
+                    result, error = None, f"{type(e).__name__}: {e}"
+                return sensor_code, time.perf_counter() - start, result, error
+
+        start = time.perf_counter()
+        for sensor_code, seconds, result, error in await asyncio.gather(*(check(*item)
+                                                                          for item in info_dicts.items())):
+            report.add(sensor_code, seconds, result, error)
+        report.duration = time.perf_counter() - start
+        return report
+
+    async def check_cards(self, cards_info: dict, workers: int = Config.check_workers,
+                          local: bool = False) -> CheckReport:
+        if local:
+            return await self._blocking(CardVerifier(self.sh).verify_many, cards_info)
+        return await self._check_many(cards_info, "checkByExternalSystemReference", workers=workers)
+
+    async def check_cos(self, cos_info: dict, header: dict = None, workers: int = Config.check_workers) -> CheckReport:
+        return await self._check_many(cos_info, "checkCustomObject", header, workers)
+
+    async def get_sensors(self, state: int) -> list:
+        return await self._blocking(self.adapter.get_sensors, state)
+
+    def invalidate_sensors(self):
+        self.adapter.invalidate_sensors()
+
+    async def check_card_for_notification(self, sensor_code) -> bool:
+        return await self._blocking(self.adapter.check_card_for_notification, sensor_code)
+
+    async def wait_for_cards(self, sensor_codes, created_after=None, timeout: float = Config.wait_timeout) -> WaitResult:
+        if created_after is None:
+            # время сервера БД, см. BasicAdapter.wait_for_cards
+            created_after = await self._blocking(self.sh.get_server_time)
+
+        async def poll(pending):
+            return await self._blocking(self.sh.get_sensors_with_card, pending, created_after)
+
+        result = await Waiter(timeout).wait_async(sensor_codes, poll)
+        if result.satisfied:
+            # открылись новые карточки, снимок состояний устарел
+            self.invalidate_sensors()
+        return result
+
+    async def wait_for_notifications(self, sensor_codes, timeout: float = Config.wait_timeout) -> WaitResult:
+        async def poll(pending):
+            return await self._blocking(self.sh.get_sensors_with_notification, pending)
+
+        return await Waiter(timeout).wait_async(sensor_codes, poll)
+
+    async def wait_for_layer_objects(self, expected: dict, timeout: float = Config.wait_timeout) -> WaitResult:
+        async def poll(pending):
+            return await self._blocking(self.adapter._updated_layer_objects, expected, pending)
+
+        return await Waiter(timeout).wait_async(expected, poll)
+
+    async def close(self):
+        await self.r.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class AsyncLogReader(_SessionOwner):
+
+    def __init__(self, server: str, start_datetime: datetime, end_datetime: datetime,
+                 session: aiohttp.ClientSession = None, backend: LocalLogSearch = None,
+                 executor: ThreadPoolExecutor = None):
+        """
+        Конструктор класса.
+
+        :param server: ip адрес сервера, на котором расположены логи.
+        :param start_datetime: дата-время для начала поиска в логах
+        :param end_datetime: дата-время для окончания поиска в логах
+        :param session: общая HTTP сессия aiohttp, по умолчанию создается своя
+        :param backend: локальный поиск по логам, если не передан - поиск выполняется сервисом LogChecker
+        :param executor: пул потоков для локального поиска, по умолчанию общий (см. blocking_executor)
+        """
+        super().__init__(session)
+        # синхронный LogReader формирует запросы и выполняет локальный поиск в пуле потоков
+        self.reader = LogReader(server, start_datetime, end_datetime, backend=backend)
+        self.file_path_integration = self.reader.file_path_integration
+        self.file_path_layer_object = self.reader.file_path_layer_object
+        self.backend = backend
+        self.executor = executor or blocking_executor()
+
+    async def _blocking(self, function, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.executor,
+                                                                functools.partial(function, *args, **kwargs))
+
+    async def get_logs(self, file_path: str, find_dict: dict, pretty_print: bool = False, log_count: int = None,
+                       full_file_search: bool = False) -> list:
+        if self.backend:
+            return await self._blocking(self.reader.get_logs, file_path, find_dict, pretty_print, log_count,
+                                        full_file_search)
+        with instrumentation.span("log", "find_logs remote") as attrs:
+            logs = [log async for log in self.iter_logs(file_path, find_dict, pretty_print, log_count,
+                                                        full_file_search)]
+            attrs["found"] = len(logs)
+        return logs
+
+    async def iter_logs(self, file_path: str, find_dict: dict, pretty_print: bool = False, log_count: int = None,
+                        full_file_search: bool = False, page_size: int = Config.log_page_size):
+        """
+        Асинхронный генератор найденных логов, см. LogReader.iter_logs. При локальном поиске генератор
+        LogReader.iter_logs выполняется в пуле потоков, логи забираются из него частями по
+        Config.log_local_chunk_size, поэтому найденные логи не накапливаются в памяти.
+        """
+        if self.backend:
+            logs = self.reader.iter_logs(file_path, find_dict, pretty_print, log_count, full_file_search)
+            # генератор нельзя выполнять в двух потоках сразу, например закрыть при отмене во время чтения части
+            lock = threading.Lock()
+
+            def next_chunk():
+                with lock:
+                    return list(itertools.islice(logs, Config.log_local_chunk_size))
+
+            def close():
+                with lock:
+                    logs.close()
+
+            try:
+                while True:
+                    chunk = await self._blocking(next_chunk)
+                    if not chunk:
+                        return
+                    for log in chunk:
+                        yield log
+            finally:
+                await self._blocking(close)
+        pages = LogPages(log_count, page_size)
+        for count, offset in pages:
+            async for log in self._iter_remote_logs(file_path, find_dict, pretty_print, count, full_file_search,
+                                                    offset):
+                pages.add(log)
+                yield log
+
+    async def _iter_remote_logs(self, file_path: str, find_dict: dict, pretty_print: bool = False,
+                                log_count: int = None, full_file_search: bool = False, offset: int = None):
+        msg = self.reader._find_logs_request(file_path, find_dict, pretty_print, log_count, full_file_search, offset)
+        endpoint = f"{Config.log_checker_url}/findLogs"
+        result = JsonStreamResult()
+        connect_timeout, read_timeout = Config.log_checker_timeout
+        timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        with instrumentation.span("http", f"POST {endpoint}", bytes_sent=len(msg)) as attrs:
+            async with self.session.post(endpoint, data=msg, ssl=False, timeout=timeout,
+                                         headers={"Content-Type": "application/json; charset=utf-8"}) as response:
+                attrs["status"] = response.status
+                # ответ читается и разбирается по частям
+                parser = JsonArrayParser("found_lоgs", result, response.charset or "utf-8")
+                async for chunk in response.content.iter_chunked(Config.log_stream_chunk_size):
+                    for log in parser.feed(chunk):
+                        yield log
+                    if parser.done:
+                        break
+                for log in parser.close():
+                    yield log
+        error = LogReader._response_error(result)
+        if error:
+            yield error
+
+    async def get_logs_batch(self, file_path: str, queries: dict, pretty_print: bool = False, log_count: int = None,
+                             full_file_search: bool = False) -> dict:
+        """
+        Метод для получения логов сразу по многим запросам, см. LogReader.get_logs_batch.
+        Запросы к LogChecker отправляются одновременно.
+        """
+        if self.backend:
+            return await self._blocking(self.reader.get_logs_batch, file_path, queries, pretty_print, log_count,
+                                        full_file_search)
+        results = await asyncio.gather(*(self.get_logs(file_path, find_dict, pretty_print, log_count,
+                                                       full_file_search)
+                                         for find_dict in queries.values()))
+        return dict(zip(queries, results))
+
+    async def get_log_for_rule(self, rule_name: str) -> list:
+        return await self.get_logs(self.file_path_integration, LogReader._rule_find_dict(rule_name), log_count=1)
+
+    async def get_chain_logs(self, file_path: str, chain_id: str) -> list:
+        return await self.get_logs(file_path, {"sphaera_x_operation_id": chain_id}, full_file_search=True)
+
+    def iter_chain_logs(self, file_path: str, chain_id: str, page_size: int = Config.log_page_size):
+        return self.iter_logs(file_path, {"sphaera_x_operation_id": chain_id}, full_file_search=True,
+                              page_size=page_size)
+
+    async def _get_chain(self, file_path: str, first_log: list, name: str, collect: bool):
+        """
+        Метод для получения "чейна" первого лога с прикреплением логов к отчету по мере получения,
+        см. LogReader.get_chain_for_rule.
+        """
+        if not first_log:
+            return None
+        logs = first_log[0]
+        if "error" in list(logs.keys()):
+            allure.attach(json.dumps(logs, ensure_ascii=False, indent=4), name, allure.attachment_type.JSON)
+            return logs
+        collected = []
+        with LogsAttachment(name) as attachment:
+            async for log in self.iter_chain_logs(file_path, logs.get("sphaera_x_operation_id")):
+                attachment.write(log)
+                if collect:
+                    collected.append(log)
+        return collected if collect else attachment.count
+
+    async def get_chain_for_rule(self, rule_name: str, collect: bool = True):
+        with allure.step(f"Получение цепочки логов для правила {rule_name}"):
+            return await self._get_chain(self.file_path_integration, await self.get_log_for_rule(rule_name),
+                                         f"Логи для правила {rule_name}", collect)
+
+    async def get_log_for_layer_object(self, layer_obj_id: str) -> list:
+        return await self.get_logs(self.file_path_layer_object, LogReader._layer_object_find_dict(layer_obj_id),
+                                   log_count=1)
+
+    async def get_chain_for_layer_object(self, layer_obj_id, collect: bool = True):
+        with allure.step(f"Получение логов для кастомного объекта с id {layer_obj_id}"):
+            return await self._get_chain(self.file_path_layer_object,
+                                         await self.get_log_for_layer_object(layer_obj_id),
+                                         f"Логи для для кастомного объекта с id {layer_obj_id}", collect)
+
+    async def _get_chains(self, file_path: str, first_logs: dict) -> dict:
+        chains, queries = LogReader._chain_queries(first_logs)
+        chains.update(await self.get_logs_batch(file_path, queries, full_file_search=True))
+        return {name: chains[name] for name in first_logs}
+
+    async def get_chains_for_rules(self, rule_names) -> dict:
+        with allure.step("Получение цепочек логов для правил"):
+            first_logs = await self.get_logs_batch(self.file_path_integration,
+                                                   {rule_name: LogReader._rule_find_dict(rule_name)
+                                                    for rule_name in rule_names},
+                                                   log_count=1)
+            chains = await self._get_chains(self.file_path_integration, first_logs)
+            LogReader._attach_chains(chains, "Логи для правила {}")
+            return chains
+
+    async def get_chains_for_layer_objects(self, layer_obj_ids) -> dict:
+        with allure.step("Получение логов для кастомных объектов"):
+            first_logs = await self.get_logs_batch(self.file_path_layer_object,
+                                                   {layer_obj_id: LogReader._layer_object_find_dict(layer_obj_id)
+                                                    for layer_obj_id in layer_obj_ids},
+                                                   log_count=1)
+            chains = await self._get_chains(self.file_path_layer_object, first_logs)
+            LogReader._attach_chains(chains, "Логи для для кастомного объекта с id {}")
+            return chains
@@ -4,28 +4,38 @@
 :author: Andrei Ursaki.
 """
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 
+from basic.card_verifier import CardVerifier
+from basic.check_report import CheckReport
+from basic.config import Config
 from basic.request import Request
+from basic.sensor_state import SensorStateSnapshot
 from basic.sql_helper import SqlHelper
+from basic.transport import Transport
+from basic.waiter import Waiter, WaitResult
 
 
 class BasicAdapter:
-    def __init__(self, telemetry_system_id: int, endpoint: str, content_type: str):
+    def __init__(self, telemetry_system_id: int, endpoint: str, content_type: str, transport: Transport = None):
         """
         Конструктор класса.
 
         :param telemetry_system_id: идентификационный номер телеметрической системы
         :param endpoint: url/endpoint адаптера
         :param content_type: тип данных, используемых в сообщении
+        :param transport: транспорт для HTTP запросов, по умолчанию общий пул соединений
         """
         self.telemetry_system_id = telemetry_system_id
         self.endpoint = endpoint
         # создание объекта класса Request, для отправки сообщений адаптеру
-        self.r = Request(endpoint, content_type)
+        self.r = Request(endpoint, content_type, transport)
         # создание объекта класса SqlHelper, для работы с базой данных
         self.sh = SqlHelper(telemetry_system_id=telemetry_system_id)
 
-    def __check_data(self, sensor_code: str, info_dict: dict, route: str, header: dict = None) -> dict:
+    def __check_data(self, sensor_code: str, info_dict: dict, route: str, header: dict = None,
+                     print_msg: bool = False) -> dict:
         """
         Метод для отправки запроса в CoordCom CardChecker.
 
@@ -33,27 +43,32 @@ class BasicAdapter:
         :param info_dict: словарь с проверяемыми значениями
         :param route: адрес метода проверки
         :param header: заголовки для запроса
+        :param print_msg: печатать ли запрос
         :return: словарь с результатами проверки, см. https://gitlab.sphaera.ru/coordcom/testers-projects/coordcom-card-checker
         """
-        # добавляем в словарь с проверяемыми значениями информацию об объекте/датчике
-        info_dict.update({'telemetry_system_id': self.telemetry_system_id, 'sensor_code': sensor_code})
+        # добавляем в копию словаря с проверяемыми значениями информацию об объекте/датчике
+        info_dict = dict(info_dict, telemetry_system_id=self.telemetry_system_id, sensor_code=sensor_code)
         # с помощью класса Request выполняем запрос
-        result = Request.send_request(json.dumps(info_dict, ensure_ascii=False), f'http://10.100.122.5:5001/{route}',
-                                      'application/json', headers=header, print_msg=True)
+        result = Request.send_request(json.dumps(info_dict, ensure_ascii=False), f'{Config.card_checker_url}/{route}',
+                                      'application/json', headers=header, print_msg=print_msg,
+                                      transport=self.r.transport)
         # преобразуем результаты в словарь
         result = json.loads(result).get("response")
         if result:
             # если есть результат, возвращаем его
             return result
 
-    def check_card(self, sensor_code: str, card_info: dict) -> dict:
+    def check_card(self, sensor_code: str, card_info: dict, local: bool = False) -> dict:
         """
         Метод для проверки карточки.
 
         :param sensor_code: код объекта/датчика
         :param card_info: словарь с проверяемыми значениями
+        :param local: проверять ли по данным из БД без CoordCom CardChecker, см. CardVerifier
         :return: словарь с результатами проверки
         """
+        if local:
+            return CardVerifier(self.sh).verify_many({sensor_code: card_info}).results[sensor_code]
         return self.__check_data(sensor_code, card_info, "checkByExternalSystemReference")
 
     def check_co(self, sensor_code: str, co_info: dict, header: dict = None) -> dict:
@@ -67,21 +82,74 @@ class BasicAdapter:
         """
         return self.__check_data(sensor_code, co_info, "checkCustomObject", header)
 
+    def __check_many(self, info_dicts: dict, route: str, header: dict = None,
+                     workers: int = Config.check_workers) -> CheckReport:
+        """
+        Метод для параллельной отправки запросов в CoordCom CardChecker.
+
+        :param info_dicts: словарь {код объекта/датчика: словарь с проверяемыми значениями}, не изменяется
+        :param route: адрес метода проверки
+        :param header: заголовки для запроса
+        :param workers: количество одновременных проверок
+        :return: сводный отчет проверки
+        """
+        report = CheckReport()
+
+        def check(sensor_code, info_dict):
+            start = time.perf_counter()
+            try:
+                result = self.__check_data(sensor_code, info_dict, route, header)
+                error = None if result else "Пустой ответ CardChecker"
+            except Exception as e:
+                result, error = None, f"{type(e).__name__}: {e}"
+            return sensor_code, time.perf_counter() - start, result, error
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for sensor_code, seconds, result, error in executor.map(lambda item: check(*item), info_dicts.items()):
+                report.add(sensor_code, seconds, result, error)
+        report.duration = time.perf_counter() - start
+        return report
+
+    def check_cards(self, cards_info: dict, workers: int = Config.check_workers, local: bool = False) -> CheckReport:
+        """
+        Метод для параллельной проверки карточек многих объектов/датчиков.
+
+        :param cards_info: словарь {код объекта/датчика: словарь с проверяемыми значениями}
+        :param workers: количество одновременных проверок
+        :param local: проверять ли по данным из БД без CoordCom CardChecker (двумя запросами для всех объектов)
+        :return: сводный отчет проверки с результатами, временем и ошибками по каждому объекту/датчику
+        """
+        if local:
+            return CardVerifier(self.sh).verify_many(cards_info)
+        return self.__check_many(cards_info, "checkByExternalSystemReference", workers=workers)
+
+    def check_cos(self, cos_info: dict, header: dict = None, workers: int = Config.check_workers) -> CheckReport:
+        """
+        Метод для параллельной проверки атрибутов кастомных объектов многих объектов/датчиков.
+
+        :param cos_info: словарь {код объекта/датчика: словарь с проверяемыми значениями}
+        :param header: заголовки для запроса, нужен для указания базы данных кастомных объектов
+        :param workers: количество одновременных проверок
+        :return: сводный отчет проверки с результатами, временем и ошибками по каждому объекту/датчику
+        """
+        return self.__check_many(cos_info, "checkCustomObject", header, workers)
+
     def get_sensors(self, state: int) -> list:
         """
         Метод для получения списка объектов/датчиков.
+        Результат берется из общего снимка состояний, после открытия/закрытия карточек вызовите invalidate_sensors.
 
         :param state: необходимое состояние объектов/датчиков (0 - датчики из t_sensor, 1 - с открытыми карточками, 2 - без открытых карточек)
         :return: список объектов/датчиков
         """
-        sensors = self.sh.get_all_sensor_codes()
-        sensors_with_open_card = self.sh.get_all_sensors_with_open_card()
-        if state == 0:
-            return sensors
-        elif state == 1:
-            return sensors_with_open_card
-        elif state == 2:
-            return list(set(sensors) - set(sensors_with_open_card))
+        return SensorStateSnapshot.for_sql_helper(self.sh).get(state)
+
+    def invalidate_sensors(self):
+        """
+        Метод для сброса снимка состояний объектов/датчиков телеметрической системы.
+        """
+        SensorStateSnapshot.invalidate(self.sh)
 
     def check_card_for_notification(self, sensor_code):
         """
@@ -91,3 +159,61 @@ class BasicAdapter:
         :return: True/False
         """
         return self.sh.is_notification_in_card(sensor_code)
+
+    def wait_for_cards(self, sensor_codes, created_after=None, timeout: float = Config.wait_timeout) -> WaitResult:
+        """
+        Метод для ожидания открытия карточек сразу для многих объектов/датчиков.
+        Каждая проверка - один запрос к БД для всех объектов/датчиков, для которых карточка еще не найдена.
+
+        :param sensor_codes: коды объектов/датчиков
+        :param created_after: учитывать только карточки, созданные не раньше этого времени (например, времени
+            сервера БД перед отправкой сообщения адаптеру, см. SqlHelper.get_server_time), по умолчанию - время
+            сервера БД в начале ожидания, чтобы оставшиеся от прошлых тестов карточки не считались открытыми
+        :param timeout: максимальное время ожидания, сек
+        :return: результат ожидания, объект класса WaitResult
+        """
+        if created_after is None:
+            # время берется с сервера БД: часы машины с тестами могут отличаться от времени создания карточек
+            created_after = self.sh.get_server_time()
+        result = Waiter(timeout).wait(sensor_codes, lambda pending: self.sh.get_sensors_with_card(pending,
+                                                                                                   created_after))
+        if result.satisfied:
+            # открылись новые карточки, снимок состояний устарел
+            self.invalidate_sensors()
+        return result
+
+    def wait_for_notifications(self, sensor_codes, timeout: float = Config.wait_timeout) -> WaitResult:
+        """
+        Метод для ожидания появления напоминаний в КК сразу для многих объектов/датчиков.
+
+        :param sensor_codes: коды объектов/датчиков
+        :param timeout: максимальное время ожидания, сек
+        :return: результат ожидания, объект класса WaitResult
+        """
+        return Waiter(timeout).wait(sensor_codes, self.sh.get_sensors_with_notification)
+
+    def wait_for_layer_objects(self, expected: dict, timeout: float = Config.wait_timeout) -> WaitResult:
+        """
+        Метод для ожидания изменения атрибутов КО сразу для многих объектов/датчиков.
+
+        :param expected: словарь {код объекта/датчика: словарь с ожидаемыми значениями атрибутов}
+        :param timeout: максимальное время ожидания, сек
+        :return: результат ожидания, объект класса WaitResult
+        """
+        return Waiter(timeout).wait(expected, lambda pending: self._updated_layer_objects(expected, pending))
+
+    def _updated_layer_objects(self, expected: dict, sensor_codes) -> set:
+        """
+        Метод для проверки атрибутов КО одним запросом для многих объектов/датчиков.
+
+        :param expected: словарь {код объекта/датчика: словарь с ожидаемыми значениями атрибутов}
+        :param sensor_codes: проверяемые коды объектов/датчиков
+        :return: множество кодов объектов/датчиков, атрибуты КО которых совпадают с ожидаемыми
+        """
+        satisfied = set()
+        for attributes in self.sh.iter_sensor_attributes(sensor_codes):
+            sensor_code = attributes['sensor_code']
+            if all(key in attributes and str(attributes[key]) == str(value)
+                   for key, value in expected[sensor_code].items()):
+                satisfied.add(sensor_code)
+        return satisfied
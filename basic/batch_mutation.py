@@ -0,0 +1,100 @@
+"""
+Модуль содержит класс BatchMutation для пакетного изменения карточек и класс BatchResult с результатами.
+
+:author: Andrei Ursaki.
+"""
+import time
+
+from basic import db_config
+from basic.db_pool import statement_name
+from basic.instrumentation import instrumentation
+
+
+class BatchResult:
+    def __init__(self):
+        """
+        Конструктор класса.
+        """
+        self.chunks = 0
+        self.cards = 0
+        self.rows_affected = 0
+        self.duration = 0.0
+
+    def to_dict(self) -> dict:
+        return {"chunks": self.chunks, "cards": self.cards, "rows_affected": self.rows_affected,
+                "duration_s": self.duration}
+
+    def __repr__(self):
+        return f"BatchResult({self.to_dict()})"
+
+
+class BatchMutation:
+    # временная таблица с ключами карточек, на нее ссылаются изменяющие запросы
+    create_keys_table = """if object_id('tempdb..#cards') is not null drop table #cards;
+                           create table #cards (CallCenterId int not null, CaseFolderId int not null,
+                           CaseId int not null, primary key (CallCenterId, CaseFolderId, CaseId))"""
+    insert_keys = "insert into #cards (CallCenterId, CaseFolderId, CaseId) values (?, ?, ?)"
+    drop_keys_table = "drop table #cards"
+
+    def __init__(self, pool, statement: str, chunk_size: int = db_config.batch_chunk_size):
+        """
+        Конструктор класса.
+
+        :param pool: пул соединений с БД, объект класса ConnectionPool
+        :param statement: изменяющий запрос, соединяющий таблицу с #cards по ключевым столбцам
+        :param chunk_size: количество карточек, изменяемых в одной транзакции
+        """
+        self.pool = pool
+        self.statement = statement
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def parse_card_key(card) -> tuple:
+        """
+        Метод для получения ключа карточки.
+
+        :param card: строка вида 'CallCenterId|CaseFolderId|CaseId' или строка запроса/кортеж,
+            первые 3 значения которого - CallCenterId, CaseFolderId, CaseId
+        :return: кортеж (CallCenterId, CaseFolderId, CaseId)
+        """
+        if isinstance(card, str):
+            card = card.split('|')
+        return tuple(int(value) for value in card[:3])
+
+    def _chunks(self, cards):
+        # повторяющиеся ключи (например, из get_card_for_close) нарушили бы первичный ключ #cards
+        chunk = {}
+        for card in cards:
+            chunk[self.parse_card_key(card)] = None
+            if len(chunk) == self.chunk_size:
+                yield list(chunk)
+                chunk = {}
+        if chunk:
+            yield list(chunk)
+
+    def run(self, cards) -> BatchResult:
+        """
+        Метод для выполнения изменения. Каждая порция карточек изменяется в отдельной транзакции.
+
+        :param cards: итерируемый объект с карточками, см. parse_card_key
+        :return: результат изменения, объект класса BatchResult
+        """
+        result = BatchResult()
+        start = time.perf_counter()
+        for chunk in self._chunks(cards):
+            with self.pool.cursor(commit=True) as cursor:
+                if hasattr(cursor, 'fast_executemany'):
+                    # отправка всех ключей порции одним пакетом вместо запроса на каждую строку
+                    cursor.fast_executemany = True
+                cursor.execute(self.create_keys_table)
+                cursor.executemany(self.insert_keys, chunk)
+                with instrumentation.span("sql", f"batch {statement_name(self.statement)}",
+                                          cards=len(chunk)) as attrs:
+                    cursor.execute(self.statement)
+                    attrs["rows"] = max(cursor.rowcount, 0)
+                result.rows_affected += max(cursor.rowcount, 0)
+                cursor.execute(self.drop_keys_table)
+            result.chunks += 1
+            result.cards += len(chunk)
+        result.duration = time.perf_counter() - start
+        return result
@@ -0,0 +1,145 @@
+"""
+Модуль содержит класс CardVerifier для проверки карточек по данным из БД OmniData без сервиса CoordCom CardChecker.
+
+:author: Andrei Ursaki.
+"""
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from basic.check_report import CheckReport
+from basic.config import Config
+
+# поля карточки с координатами, сравниваются с допуском
+COORDINATE_FIELDS = ("XCoordinate", "YCoordinate")
+
+
+def parse_datetime(value):
+    """
+    Функция для получения даты-времени из значения БД или строки в формате ISO 8601.
+
+    :param value: значение
+    :return: объект datetime или None, если значение не является датой-временем
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, str) and len(value) >= 10 and value[4:5] == '-' and value[7:8] == '-':
+        value = value.strip().replace(' ', 'T', 1)
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            # более 6 знаков долей секунды (например, .0000000 из SQL Server)
+            head, dot, tail = value.partition('.')
+            digits = len(tail) - len(tail.lstrip('0123456789'))
+            try:
+                return datetime.fromisoformat(f"{head}.{tail[:min(digits, 6)]}{tail[digits:]}")
+            except ValueError:
+                return None
+    return None
+
+
+def to_json_value(value):
+    """
+    Функция для приведения значения из БД к виду, в котором его возвращает CardChecker.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, list):
+        return [to_json_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_json_value(item) for key, item in value.items()}
+    return value
+
+
+class CardVerifier:
+    def __init__(self, sql_helper, datetime_tolerance: float = Config.card_datetime_tolerance,
+                 coordinate_tolerance: float = Config.card_coordinate_tolerance):
+        """
+        Конструктор класса.
+
+        :param sql_helper: объект класса SqlHelper
+        :param datetime_tolerance: допустимая разница дат-времени, сек
+        :param coordinate_tolerance: допустимая разница координат
+        """
+        self.sql_helper = sql_helper
+        self.datetime_tolerance = datetime_tolerance
+        self.coordinate_tolerance = coordinate_tolerance
+
+    def compare(self, field: str, expected, actual) -> bool:
+        """
+        Метод для сравнения проверяемого значения со значением из карточки с учетом типа:
+        даты-время сравниваются с допуском (если у одного из значений нет часового пояса - без учета часового пояса),
+        координаты и числа - как числа, напоминания (Notices) - каждое ожидаемое напоминание должно совпасть
+        хотя бы с одним напоминанием карточки, остальные значения - как строки.
+
+        :param field: поле карточки
+        :param expected: проверяемое значение
+        :param actual: значение из карточки
+        :return: True/False
+        """
+        if expected is None or actual is None:
+            return expected is None and actual is None
+        if isinstance(expected, dict):
+            return isinstance(actual, dict) and all(key in actual and self.compare(key, value, actual[key])
+                                                    for key, value in expected.items())
+        if isinstance(expected, list):
+            return isinstance(actual, list) and all(any(self.compare(field, item, actual_item)
+                                                        for actual_item in actual)
+                                                    for item in expected)
+        expected_dt, actual_dt = parse_datetime(expected), parse_datetime(actual)
+        if expected_dt is not None and actual_dt is not None:
+            if (expected_dt.tzinfo is None) != (actual_dt.tzinfo is None):
+                expected_dt, actual_dt = expected_dt.replace(tzinfo=None), actual_dt.replace(tzinfo=None)
+            return abs((expected_dt - actual_dt).total_seconds()) <= self.datetime_tolerance
+        # поля bit из БД могут прийти как bool или как 0/1
+        expected = int(expected) if isinstance(expected, bool) else expected
+        actual = int(actual) if isinstance(actual, bool) else actual
+        try:
+            expected_number, actual_number = float(expected), float(actual)
+        except (TypeError, ValueError):
+            return str(expected) == str(actual)
+        tolerance = self.coordinate_tolerance if field in COORDINATE_FIELDS else 0
+        return abs(expected_number - actual_number) <= tolerance
+
+    def verify(self, expected: dict, card: dict) -> dict:
+        """
+        Метод для проверки карточки.
+
+        :param expected: словарь с проверяемыми значениями
+        :param card: словарь атрибутов карточки (см. SqlHelper.get_cards_data), None - карточки нет
+        :return: словарь с результатами проверки {поле: {"expected": ..., "actual": ..., "result": True/False}}
+        """
+        result = {}
+        for field, value in expected.items():
+            actual = card.get(field) if card else None
+            result[field] = {"expected": value, "actual": to_json_value(actual),
+                             "result": card is not None and field in card and self.compare(field, value, actual)}
+        return result
+
+    def verify_many(self, cards_info: dict) -> CheckReport:
+        """
+        Метод для проверки карточек многих объектов/датчиков. Данные карточек получаются из БД пакетно
+        (см. SqlHelper.get_cards_data), проверяется последняя созданная карточка объекта/датчика (оставшиеся
+        от прошлых тестов карточки не учитываются).
+
+        :param cards_info: словарь {код объекта/датчика: словарь с проверяемыми значениями}
+        :return: сводный отчет проверки с результатами, временем и ошибками по каждому объекту/датчику
+        """
+        report = CheckReport()
+        start = time.perf_counter()
+        cards = self.sql_helper.get_cards_data(cards_info)
+        for sensor_code, expected in cards_info.items():
+            check_start = time.perf_counter()
+            sensor_cards = cards.get(sensor_code)
+            # карточки отсортированы от новых к старым
+            card = sensor_cards[0] if sensor_cards else None
+            report.add(sensor_code, time.perf_counter() - check_start, self.verify(expected, card),
+                       None if card else "Карточка не найдена")
+        report.duration = time.perf_counter() - start
+        return report
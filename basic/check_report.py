@@ -0,0 +1,96 @@
+"""
+Модуль содержит класс CheckReport - сводный отчет пакетной проверки объектов/датчиков.
+
+:author: Andrei Ursaki.
+"""
+from basic.stats import LatencyStats
+
+
+class CheckReport:
+    def __init__(self):
+        """
+        Конструктор класса.
+        """
+        # результаты проверки, ключ - код объекта/датчика
+        self.results = {}
+        # время проверки, сек
+        self.timings = {}
+        # ошибки проверки (исключение или пустой ответ)
+        self.failures = {}
+        self.latency = LatencyStats()
+        self.duration = 0.0
+
+    def add(self, sensor_code: str, seconds: float, result: dict = None, error: str = None):
+        """
+        Метод для добавления результата проверки объекта/датчика.
+
+        :param sensor_code: код объекта/датчика
+        :param seconds: время проверки, сек
+        :param result: словарь с результатами проверки
+        :param error: описание ошибки
+        """
+        self.timings[sensor_code] = seconds
+        self.latency.add(seconds)
+        self.results[sensor_code] = result
+        if error is not None:
+            self.failures[sensor_code] = error
+
+    @staticmethod
+    def mismatched_fields(result: dict) -> list:
+        """
+        Метод для получения несовпавших полей из результата проверки. Учитываются только поля с результатом
+        сравнения вида {"expected": ..., "actual": ..., "result": True/False} (локальная проверка, CardVerifier),
+        ответ CardChecker другого вида несовпавших полей не содержит - для него учитываются только ошибки.
+
+        :param result: словарь с результатами проверки
+        :return: список полей, для которых result не True
+        """
+        if not isinstance(result, dict):
+            return []
+        return [field for field, checked in result.items()
+                if isinstance(checked, dict) and "result" in checked and checked["result"] is not True]
+
+    @property
+    def mismatches(self) -> dict:
+        """
+        Несовпавшие поля объектов/датчиков, проверка которых выполнена без ошибок.
+        """
+        mismatches = {}
+        for sensor_code, result in self.results.items():
+            if sensor_code not in self.failures:
+                fields = self.mismatched_fields(result)
+                if fields:
+                    mismatches[sensor_code] = fields
+        return mismatches
+
+    @property
+    def passed(self) -> list:
+        """
+        Объекты/датчики, проверка которых выполнена без ошибок и без несовпавших полей.
+        """
+        return [sensor_code for sensor_code, result in self.results.items()
+                if sensor_code not in self.failures and not self.mismatched_fields(result)]
+
+    @property
+    def failed(self) -> list:
+        passed = set(self.passed)
+        return [sensor_code for sensor_code in self.results if sensor_code not in passed]
+
+    def to_dict(self) -> dict:
+        return {"checked": len(self.results), "failed": len(self.failed), "duration_s": self.duration,
+                "latency": self.latency.summary(), "failures": dict(self.failures), "mismatches": self.mismatches}
+
+    def summary(self) -> str:
+        """
+        Метод для получения результатов в виде строки для печати/вывода.
+
+        :return: строка с результатами проверки
+        """
+        mismatches = self.mismatches
+        lines = [f"Проверено объектов: {len(self.results)} за {self.duration:.2f} с, ошибок: {len(self.failures)}, "
+                 f"не совпало: {len(mismatches)}"]
+        for sensor_code, error in self.failures.items():
+            lines.append(f"{sensor_code}: {error}")
+        for sensor_code, fields in mismatches.items():
+            lines.append(f"{sensor_code}: не совпали поля {', '.join(map(str, fields))}")
+        return "\n".join(lines)
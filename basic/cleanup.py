@@ -0,0 +1,260 @@
+"""
+Модуль содержит класс CleanupPipeline для очистки тестовых карточек телеметрической системы и класс CleanupReport
+с результатами очистки.
+
+Карточки читаются из БД страницами, каждая страница проходит все этапы очистки по порядку, несколько страниц
+обрабатываются одновременно. Обработанные страницы записываются в файл контрольной точки, прерванную очистку
+можно продолжить. Запуск из корня проекта:
+
+    python -m basic.cleanup --telemetry-system-id 12 --stages denotify reindex --checkpoint cleanup_12.json
+
+:author: Andrei Ursaki.
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from basic import db_config
+from basic.sensor_state import SensorStateSnapshot
+from basic.sql_helper import SqlHelper
+
+logger = logging.getLogger(__name__)
+
+# удаление напоминаний, см. SqlHelper.delete_notify
+DENOTIFY = "denotify"
+# перевод в индекс 64 "Тестирование Системы", см. SqlHelper.change_index_to_test
+REINDEX = "reindex"
+# закрытие карточек, функция закрытия передается в CleanupPipeline
+CLOSE = "close"
+
+
+class CleanupReport:
+    def __init__(self, dry_run: bool = False):
+        """
+        Конструктор класса.
+
+        :param dry_run: очистка выполнялась без изменения карточек
+        """
+        self.dry_run = dry_run
+        self.pages = 0
+        self.cards = 0
+        # количество измененных строк по этапам
+        self.rows_affected = {}
+        self.duration = 0.0
+        # ключ последней карточки, до которой (включительно) обработаны все страницы
+        self.last_key = None
+        self._lock = threading.Lock()
+
+    def add(self, cards: int, rows_affected: dict):
+        """
+        Метод для добавления результата обработки страницы.
+
+        :param cards: количество карточек на странице
+        :param rows_affected: количество измененных строк по этапам
+        """
+        with self._lock:
+            self.pages += 1
+            self.cards += cards
+            for stage, rows in rows_affected.items():
+                self.rows_affected[stage] = self.rows_affected.get(stage, 0) + rows
+
+    @property
+    def throughput(self) -> float:
+        return self.cards / self.duration if self.duration else 0.0
+
+    def to_dict(self) -> dict:
+        return {"dry_run": self.dry_run, "pages": self.pages, "cards": self.cards,
+                "rows_affected": dict(self.rows_affected), "duration_s": self.duration,
+                "throughput_cards_s": self.throughput, "last_key": self.last_key}
+
+    def summary(self) -> str:
+        """
+        Метод для получения результатов в виде строки для печати/вывода.
+
+        :return: строка с результатами очистки
+        """
+        mode = " (без изменений)" if self.dry_run else ""
+        lines = [f"Обработано карточек{mode}: {self.cards} ({self.pages} стр.) за {self.duration:.2f} с, "
+                 f"{self.throughput:.1f} карт./с"]
+        for stage, rows in self.rows_affected.items():
+            lines.append(f"{stage}: изменено строк {rows}")
+        return "\n".join(lines)
+
+
+class CleanupPipeline:
+    def __init__(self, sql_helper: SqlHelper, stages=(DENOTIFY, REINDEX), close=None,
+                 page_size: int = db_config.batch_chunk_size, workers: int = db_config.cleanup_workers,
+                 checkpoint: str = None, dry_run: bool = False, progress=None):
+        """
+        Конструктор класса.
+
+        :param sql_helper: объект класса SqlHelper
+        :param stages: этапы очистки в порядке выполнения - названия (DENOTIFY, REINDEX, CLOSE) или пары
+            (название, функция), функция принимает список карточек и возвращает объект с атрибутом rows_affected
+            (например, BatchResult) или количество измененных строк
+        :param close: функция закрытия карточек для этапа CLOSE, принимает список карточек
+            (CallCenterId, CaseFolderId, CaseId, CaseTypeId)
+        :param page_size: количество карточек на странице (и в одной транзакции каждого этапа)
+        :param workers: количество одновременно обрабатываемых страниц
+        :param checkpoint: путь к файлу контрольной точки, если файл есть - очистка продолжается с сохраненного места
+        :param dry_run: только прочитать карточки, не выполняя этапы
+        :param progress: функция, вызываемая с объектом CleanupReport после обработки каждой страницы
+        """
+        self.sql_helper = sql_helper
+        self.stages = [self._stage(stage, close) for stage in stages]
+        self.page_size = page_size
+        self.workers = workers
+        self.checkpoint = checkpoint
+        self.dry_run = dry_run
+        self.progress = progress or self._log_progress
+
+    def _stage(self, stage, close) -> tuple:
+        """
+        Метод для получения этапа очистки в виде пары (название, функция).
+        """
+        if not isinstance(stage, str):
+            return tuple(stage)
+        if stage == DENOTIFY:
+            return stage, lambda cards: self.sql_helper.delete_notify(cards, self.page_size)
+        if stage == REINDEX:
+            return stage, lambda cards: self.sql_helper.change_index_to_test(cards, self.page_size)
+        if stage == CLOSE:
+            if close is None:
+                raise ValueError("Для этапа close нужна функция закрытия карточек (параметр close)")
+            return stage, close
+        raise ValueError(f"Неизвестный этап очистки: {stage}")
+
+    @staticmethod
+    def _log_progress(report: CleanupReport):
+        logger.info("Обработано карточек: %s (%s стр.), %.1f карт./с", report.cards, report.pages,
+                    report.cards / report.duration if report.duration else 0.0)
+
+    def _load_checkpoint(self, telemetry_system_id) -> tuple:
+        """
+        Метод для получения ключа последней обработанной карточки из файла контрольной точки.
+
+        :param telemetry_system_id: идентификатор телеметрической системы
+        :return: ключ карточки или None, если очистка начинается сначала
+        """
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return None
+        with open(self.checkpoint, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("telemetry_system_id") != telemetry_system_id:
+            raise ValueError(f"Контрольная точка {self.checkpoint} относится к телеметрической системе "
+                             f"{data.get('telemetry_system_id')}")
+        return tuple(data["last_key"])
+
+    def _save_checkpoint(self, telemetry_system_id, report: CleanupReport):
+        if not self.checkpoint or self.dry_run:
+            return
+        temp_path = f"{self.checkpoint}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"telemetry_system_id": telemetry_system_id, "last_key": report.last_key,
+                       "cards": report.cards}, f)
+        # файл заменяется целиком, прерывание записи не портит контрольную точку
+        os.replace(temp_path, self.checkpoint)
+
+    def _process(self, page: list) -> dict:
+        """
+        Метод для выполнения всех этапов очистки для страницы карточек.
+
+        :param page: список карточек
+        :return: количество измененных строк по этапам
+        """
+        rows_affected = {}
+        if self.dry_run:
+            return rows_affected
+        for name, function in self.stages:
+            try:
+                result = function(page)
+            finally:
+                # этап изменяет карточки, снимок состояний объектов/датчиков устарел (в том числе после ошибки)
+                SensorStateSnapshot.invalidate(self.sql_helper)
+            rows_affected[name] = getattr(result, "rows_affected", result) or 0
+        return rows_affected
+
+    def run(self, telemetry_system_id=None) -> CleanupReport:
+        """
+        Метод для запуска очистки. В памяти одновременно находится не больше 2 * workers страниц.
+        При ошибке этапа новые страницы не обрабатываются, исключение пробрасывается после завершения уже начатых,
+        в контрольной точке остается последняя карточка, до которой все страницы обработаны.
+
+        :param telemetry_system_id: идентификатор телеметрической системы, по умолчанию - из sql_helper
+        :return: результат очистки, объект класса CleanupReport
+        """
+        if telemetry_system_id is None:
+            telemetry_system_id = self.sql_helper.telemetry_system_id
+        report = CleanupReport(self.dry_run)
+        after = self._load_checkpoint(telemetry_system_id)
+        report.last_key = list(after) if after else None
+        # страницы завершаются в произвольном порядке, контрольная точка сдвигается только по непрерывному префиксу
+        last_keys, done, next_page = {}, set(), 0
+        errors = []
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(self.workers * 2)
+        start = time.perf_counter()
+
+        def process(number, page):
+            nonlocal next_page
+            try:
+                rows_affected = self._process(page)
+            except Exception as e:
+                errors.append(e)
+                return
+            finally:
+                slots.release()
+            report.add(len(page), rows_affected)
+            with lock:
+                done.add(number)
+                while next_page in done:
+                    done.discard(next_page)
+                    report.last_key = last_keys.pop(next_page)
+                    next_page += 1
+                report.duration = time.perf_counter() - start
+                self._save_checkpoint(telemetry_system_id, report)
+                self.progress(report)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pages = self.sql_helper.iter_cards_for_close(telemetry_system_id, self.page_size, after)
+            for number, page in enumerate(pages):
+                # ждем, пока в обработке не станет меньше 2 * workers страниц
+                slots.acquire()
+                if errors:
+                    slots.release()
+                    break
+                with lock:
+                    last_keys[number] = [int(value) for value in page[-1][:3]]
+                executor.submit(process, number, page)
+            pages.close()
+        report.duration = time.perf_counter() - start
+        if errors:
+            raise errors[0]
+        if self.checkpoint and not self.dry_run and os.path.exists(self.checkpoint):
+            # очистка завершена, следующий запуск начнется сначала
+            os.remove(self.checkpoint)
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Очистка тестовых карточек телеметрической системы")
+    parser.add_argument("--telemetry-system-id", type=int, required=True)
+    parser.add_argument("--stages", nargs="+", default=[DENOTIFY, REINDEX], choices=[DENOTIFY, REINDEX],
+                        help="этапы очистки в порядке выполнения")
+    parser.add_argument("--page-size", type=int, default=db_config.batch_chunk_size)
+    parser.add_argument("--workers", type=int, default=db_config.cleanup_workers)
+    parser.add_argument("--checkpoint", default=None, help="файл контрольной точки для продолжения очистки")
+    parser.add_argument("--dry-run", action="store_true", help="только подсчитать карточки")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    pipeline = CleanupPipeline(SqlHelper(args.telemetry_system_id), args.stages, page_size=args.page_size,
+                               workers=args.workers, checkpoint=args.checkpoint, dry_run=args.dry_run)
+    print(pipeline.run().summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,51 @@
 class Config:
+    # адрес сервиса CoordCom CardChecker
+    card_checker_url = "http://10.100.122.5:5001"
+    # адрес сервиса LogChecker
+    log_checker_url = "http://10.100.122.5:5002"
     # путь к логам Integration
     integration_logs_path = r"\d$\Logs\Integration\Integration.log"
     # путь к логам КО
     layer_objects_logs_path = r"\d$\Logs\LayerObjectsRabbit\Integration.log"
+    # максимальное количество keep-alive соединений к одному хосту
+    http_pool_size = 10
+    # количество повторных попыток установить соединение
+    http_retries = 3
+    # коэффициент задержки между повторными попытками, сек
+    http_backoff_factor = 0.3
+    # таймаут запроса (подключение, чтение), сек
+    http_timeout = (5, 60)
+    # таймаут запроса к LogChecker (подключение, чтение), сек: поиск по всему файлу может идти долго,
+    # поэтому время чтения не ограничено
+    log_checker_timeout = (5, None)
+    # время жизни снимка состояний объектов/датчиков (см. BasicAdapter.get_sensors), сек
+    sensor_state_ttl = 300
+    # поле записи лога с временем записи (для локального поиска по логам, см. LocalLogSearch)
+    log_timestamp_field = "@timestamp"
+    # каталог для хранения индексов логов (см. LogIndex), None - временный каталог системы
+    log_index_dir = None
+    # минимальный интервал между сохранениями индекса лога на диск, сек
+    log_index_save_interval = 60
+    # количество одновременных проверок при пакетной проверке (см. BasicAdapter.check_cards)
+    check_workers = 10
+    # максимальное время ожидания реакции системы (см. Waiter), сек
+    wait_timeout = 60
+    # пауза после первой проверки при ожидании, сек
+    wait_initial_delay = 0.5
+    # во сколько раз увеличивается пауза между проверками при ожидании
+    wait_backoff_factor = 2
+    # максимальная пауза между проверками при ожидании, сек
+    wait_max_delay = 5
+    # размер части ответа LogChecker, читаемой за один раз при потоковом разборе, байт
+    log_stream_chunk_size = 64 * 1024
+    # количество логов, запрашиваемых у LogChecker за один запрос (log_count/offset), None - все логи одним запросом
+    log_page_size = None
+    # количество логов, передаваемых из пула потоков за один раз при асинхронном локальном поиске
+    # (см. AsyncLogReader.iter_logs)
+    log_local_chunk_size = 500
+    # допустимая разница дат-времени при локальной проверке карточек (см. CardVerifier), сек
+    card_datetime_tolerance = 1
+    # допустимая разница координат при локальной проверке карточек
+    card_coordinate_tolerance = 1e-6
+    # максимальное количество одновременных HTTP соединений асинхронного клиента (см. AsyncRequest)
+    aio_connection_limit = 100
@@ -21,3 +21,25 @@ db_layer_obj_conn_122 = ';'.join([driver, server_layerobj_122, port, db_layer_ob
 db_sensors_conn_122 = ';'.join([driver, server_layerobj_122, port, db_sensors, user, pw])
 
 db_coordcom_conn = ';'.join([driver, server_omnidata, port, db_omnidata, user, pw])
+
+# максимальное количество соединений в пуле для одной строки подключения
+pool_size = 5
+# время ожидания свободного соединения из пула, сек
+pool_timeout = 30
+# через сколько секунд простоя соединение проверяется перед выдачей из пула
+pool_health_check_interval = 60
+# максимальное количество значений в одном запросе (ограничение SQL Server - 2100 параметров на запрос)
+query_chunk_size = 2000
+# количество строк, получаемых из курсора за один раз при потоковом чтении
+fetch_size = 1000
+# количество карточек, изменяемых в одной транзакции (меньше порога эскалации блокировок SQL Server - 5000)
+batch_chunk_size = 1000
+# количество одновременно обрабатываемых страниц карточек при очистке (см. CleanupPipeline), меньше pool_size
+cleanup_workers = 4
+# количество запросов, для которых на одном соединении хранятся подготовленные курсоры (см. ConnectionPool.prepared)
+prepared_cursors = 32
+# количество результатов справочных запросов в кэше и время их жизни, сек (см. basic/queries.py)
+query_cache_size = 1024
+query_cache_ttl = 300
+# количество объектов/датчиков в одном запросе карточек по ExternalSystemReference (условия like через or)
+reference_chunk_size = 256
@@ -0,0 +1,289 @@
+"""
+Модуль содержит класс ConnectionPool - пул соединений с БД и класс QueryResult - результат выполненного запроса.
+
+:author: Andrei Ursaki.
+"""
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from basic import db_config
+
+# тип запроса и первая таблица после from/update/into, без имени БД и схемы
+_STATEMENT_PATTERN = re.compile(r"^\s*(\w+).*?\b(?:from|update|into)\s+(?:\[?\w+\]?\.)*\[?(\w+)\]?",
+                                re.IGNORECASE | re.DOTALL)
+
+
+class QueryResult:
+    def __init__(self, cursor):
+        """
+        Конструктор класса. Забирает все строки из курсора, после чего курсор и соединение можно освободить.
+
+        :param cursor: курсор с выполненным запросом
+        """
+        self.description = cursor.description
+        self.rowcount = cursor.rowcount
+        self._rows = cursor.fetchall() if cursor.description else []
+        self._position = 0
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size: int = 1) -> list:
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self) -> list:
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def copy(self) -> "QueryResult":
+        """
+        Метод для получения копии результата с теми же строками, читаемой с начала (например, из кэша результатов).
+
+        :return: объект класса QueryResult
+        """
+        result = object.__new__(QueryResult)
+        result.description = self.description
+        result.rowcount = self.rowcount
+        result._rows = self._rows
+        result._position = 0
+        return result
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def __len__(self):
+        return len(self._rows)
+
+
+@lru_cache(maxsize=256)
+def statement_name(query: str) -> str:
+    """
+    Функция для получения короткого названия запроса для замеров: тип запроса и первая таблица.
+
+    :param query: запрос
+    :return: название запроса, например "select t_sensor"
+    """
+    found = _STATEMENT_PATTERN.search(query)
+    if not found:
+        return query.split(None, 1)[0].lower() if query.strip() else ""
+    return f"{found.group(1).lower()} {found.group(2)}"
+
+
+class ConnectionPool:
+    # функция подключения к БД вместо pyodbc.connect, принимает строку подключения
+    connect_function = None
+    # общие пулы, ключ - строка подключения
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(self, conn_str: str, size: int = db_config.pool_size, timeout: float = db_config.pool_timeout,
+                 health_check_interval: float = db_config.pool_health_check_interval):
+        """
+        Конструктор класса.
+
+        :param conn_str: строка с параметрами подключения к БД
+        :param size: максимальное количество соединений в пуле
+        :param timeout: время ожидания свободного соединения, сек
+        :param health_check_interval: через сколько секунд простоя соединение проверяется перед выдачей
+        """
+        self.conn_str = conn_str
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        # свободные соединения в виде пар (соединение, время последнего использования)
+        self._idle = queue.LifoQueue()
+        # свободные "места" в пуле, по одному на каждое соединение, которое еще можно открыть
+        self._slots = threading.BoundedSemaphore(size)
+        # подготовленные курсоры соединений: {соединение: {запрос: курсор}}, см. prepared
+        self._cursors = {}
+        self.closed = False
+
+    @classmethod
+    def for_connection(cls, conn_str: str) -> "ConnectionPool":
+        """
+        Метод для получения общего пула для строки подключения. Все объекты, работающие с одной БД, используют один пул.
+
+        :param conn_str: строка с параметрами подключения к БД
+        :return: объект класса ConnectionPool
+        """
+        with cls._pools_lock:
+            pool = cls._pools.get(conn_str)
+            if pool is None or pool.closed:
+                pool = cls._pools[conn_str] = cls(conn_str)
+            return pool
+
+    @classmethod
+    def close_all(cls):
+        """
+        Метод для закрытия всех общих пулов.
+        """
+        with cls._pools_lock:
+            pools, cls._pools = list(cls._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    def _connect(self):
+        """
+        Метод для открытия нового соединения. По умолчанию используется pyodbc, другую функцию подключения
+        (например, к тестовой БД) можно задать через атрибут класса connect_function.
+
+        :return: соединение
+        """
+        connect_function = type(self).connect_function
+        if connect_function is not None:
+            return connect_function(self.conn_str)
+        import pyodbc
+        return pyodbc.connect(self.conn_str)
+
+    @staticmethod
+    def _is_alive(conn) -> bool:
+        """
+        Метод для проверки работоспособности соединения.
+
+        :param conn: соединение
+        :return: True/False
+        """
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1").fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_cursor(cursor):
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+    def _discard(self, conn):
+        for cursor in self._cursors.pop(conn, {}).values():
+            self._close_cursor(cursor)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _checkout(self):
+        """
+        Метод для получения соединения из пула. Если свободных соединений нет, но пул не заполнен - открывается новое.
+
+        :return: соединение
+        """
+        if self.closed:
+            raise RuntimeError("Connection pool is closed")
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"No free connection in pool after {self.timeout} s")
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - last_used < self.health_check_interval or self._is_alive(conn):
+                    return conn
+                # соединение "умерло" за время простоя, закрываем его и берем следующее
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, conn, broken: bool = False):
+        """
+        Метод для возврата соединения в пул.
+
+        :param conn: соединение
+        :param broken: соединение неработоспособно и должно быть закрыто
+        """
+        if broken or self.closed:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Контекстный менеджер для получения соединения из пула. При выходе соединение возвращается в пул,
+        при ошибке - транзакция откатывается, а неработоспособное соединение закрывается.
+        """
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self._release(conn, broken)
+
+    @contextmanager
+    def cursor(self, commit: bool = False):
+        """
+        Контекстный менеджер для получения курсора. Курсор всегда закрывается, соединение возвращается в пул.
+
+        :param commit: фиксировать ли транзакцию при успешном выходе
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                if commit:
+                    conn.commit()
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def prepared(self, query: str, commit: bool = False, size: int = db_config.prepared_cursors):
+        """
+        Контекстный менеджер для получения курсора, закрепленного за запросом на соединении из пула. Курсор
+        не закрывается и выдается снова при следующем выполнении того же запроса на этом соединении: pyodbc
+        подготавливает запрос один раз и при повторном выполнении передает только значения параметров.
+
+        :param query: запрос с плейсхолдерами "?"
+        :param commit: фиксировать ли транзакцию при успешном выходе
+        :param size: количество запросов, для которых на соединении хранятся курсоры (давно не используемые закрываются)
+        """
+        with self.connection() as conn:
+            # соединение выдано только этому потоку, поэтому курсоры соединения без блокировки
+            cursors = self._cursors.setdefault(conn, OrderedDict())
+            cursor = cursors.pop(query, None) or conn.cursor()
+            try:
+                yield cursor
+                if commit:
+                    conn.commit()
+            except BaseException:
+                # после ошибки курсор не используется повторно
+                self._close_cursor(cursor)
+                raise
+            cursors[query] = cursor
+            while len(cursors) > size:
+                self._close_cursor(cursors.popitem(last=False)[1])
+
+    def close(self):
+        """
+        Метод для закрытия всех свободных соединений пула. Занятые соединения закрываются при возврате в пул.
+        """
+        self.closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
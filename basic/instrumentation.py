@@ -0,0 +1,256 @@
+"""
+Модуль содержит класс Instrumentation для замера времени HTTP запросов, запросов к БД и поиска по логам,
+а также "приемники" замеров: HistogramSink, JsonFileSink, AllureSink.
+
+По умолчанию приемников нет и замеры не выполняются. Пример использования:
+
+    histogram = HistogramSink()
+    instrumentation.add_sink(histogram)
+    ...
+    print(histogram.report())
+
+:author: Andrei Ursaki.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+
+from basic.stats import LatencyStats
+
+
+class Span:
+    __slots__ = ("kind", "name", "attrs", "started", "duration")
+
+    def __init__(self, kind: str, name: str, attrs: dict):
+        """
+        Конструктор класса.
+
+        :param kind: тип операции (http, sql, log)
+        :param name: название операции
+        :param attrs: дополнительные данные (код ответа, количество строк и т.п.)
+        """
+        self.kind = kind
+        self.name = name
+        self.attrs = attrs
+        self.started = None
+        self.duration = None
+
+    @property
+    def operation(self) -> str:
+        return f"{self.kind} {self.name}"
+
+    def to_dict(self) -> dict:
+        return {"operation": self.operation, "started": self.started, "duration_ms": self.duration * 1000,
+                **self.attrs}
+
+
+class NullSink:
+    def record(self, span: Span):
+        pass
+
+    def close(self):
+        pass
+
+
+class HistogramSink(NullSink):
+    def __init__(self):
+        """
+        Конструктор класса. Замеры хранятся в памяти, сгруппированные по операциям.
+        """
+        self.latency = {}
+        # сумма числовых атрибутов по операциям (например, количество полученных строк)
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, span: Span):
+        with self._lock:
+            stats = self.latency.get(span.operation)
+            if stats is None:
+                stats = self.latency[span.operation] = LatencyStats()
+                self.totals[span.operation] = {}
+            totals = self.totals[span.operation]
+            for key, value in span.attrs.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and key != "status":
+                    totals[key] = totals.get(key, 0) + value
+        stats.add(span.duration)
+
+    def export(self) -> dict:
+        """
+        Метод для получения всех замеров в виде, пригодном для передачи в другой процесс (см. merge).
+
+        :return: словарь {операция: {"durations": список длительностей, сек, "totals": суммы атрибутов}}
+        """
+        with self._lock:
+            operations = list(self.latency.items())
+            return {operation: {"durations": stats.values, "totals": dict(self.totals[operation])}
+                    for operation, stats in operations}
+
+    def merge(self, exported: dict):
+        """
+        Метод для добавления замеров, полученных методом export (например, от других процессов pytest-xdist).
+
+        :param exported: словарь, полученный методом export
+        """
+        with self._lock:
+            for operation, data in exported.items():
+                stats = self.latency.get(operation)
+                if stats is None:
+                    stats = self.latency[operation] = LatencyStats()
+                    self.totals[operation] = {}
+                totals = self.totals[operation]
+                for key, value in data["totals"].items():
+                    totals[key] = totals.get(key, 0) + value
+                for duration in data["durations"]:
+                    stats.add(duration)
+
+    def summary(self) -> dict:
+        """
+        Метод для получения статистики по операциям.
+
+        :return: словарь {операция: статистика задержек и суммы атрибутов}
+        """
+        with self._lock:
+            operations = list(self.latency.items())
+        return {operation: {**stats.summary(), **self.totals[operation]} for operation, stats in sorted(operations)}
+
+    def report(self) -> str:
+        """
+        Метод для получения статистики по операциям в виде таблицы для печати/вывода.
+
+        :return: строка со статистикой
+        """
+        lines = [f"{'операция':<70} {'кол-во':>8} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'всего, с':>9}"]
+        for operation, stats in self.summary().items():
+            lines.append(f"{operation[:70]:<70} {stats['count']:>8} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+                         f"{stats['p99_ms']:>9.1f} {stats['mean_ms'] * stats['count'] / 1000:>9.2f}")
+        return "\n".join(lines)
+
+
+class JsonFileSink(NullSink):
+    def __init__(self, path: str):
+        """
+        Конструктор класса. Каждый замер записывается в файл отдельной строкой json.
+
+        :param path: путь к файлу
+        """
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def record(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class AllureSink(HistogramSink):
+    def __init__(self, name: str = "Время выполнения операций"):
+        """
+        Конструктор класса. Замеры собираются в памяти и прикрепляются к отчету allure методом attach.
+
+        :param name: название вложения
+        """
+        super().__init__()
+        self.name = name
+
+    def attach(self):
+        """
+        Метод для прикрепления статистики по операциям к текущему шагу/тесту allure.
+        """
+        import allure
+        allure.attach(json.dumps(self.summary(), ensure_ascii=False, indent=4), self.name,
+                      allure.attachment_type.JSON)
+
+    def close(self):
+        if self.latency:
+            self.attach()
+
+
+class _SpanContext:
+    __slots__ = ("_instrumentation", "span", "_start")
+
+    def __init__(self, instrumentation, span: Span):
+        self._instrumentation = instrumentation
+        self.span = span
+
+    def __enter__(self) -> dict:
+        self.span.started = datetime.now().isoformat()
+        self._start = time.perf_counter()
+        return self.span.attrs
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.span.duration = time.perf_counter() - self._start
+        if exc_type is not None:
+            self.span.attrs["error"] = exc_type.__name__
+        self._instrumentation.record(self.span)
+
+
+class _NullContext:
+    __slots__ = ()
+
+    def __enter__(self) -> dict:
+        # атрибуты, заданные внутри блока, никуда не сохраняются
+        return {}
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class Instrumentation:
+    def __init__(self):
+        """
+        Конструктор класса.
+        """
+        self.sinks = []
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        with self._lock:
+            self.sinks = self.sinks + [sink]
+        return sink
+
+    def remove_sink(self, sink):
+        with self._lock:
+            self.sinks = [item for item in self.sinks if item is not sink]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.sinks)
+
+    def span(self, kind: str, name: str, **attrs):
+        """
+        Метод для замера времени операции, используется как контекстный менеджер. Внутри блока в возвращаемый
+        словарь можно добавить атрибуты операции (например, количество строк). Если приемников нет, замер
+        не выполняется.
+
+        :param kind: тип операции (http, sql, log)
+        :param name: название операции
+        :param attrs: дополнительные данные
+        """
+        if not self.sinks:
+            return _NULL_CONTEXT
+        return _SpanContext(self, Span(kind, name, attrs))
+
+    def record(self, span: Span):
+        for sink in self.sinks:
+            sink.record(span)
+
+    def close(self):
+        """
+        Метод для закрытия всех приемников (запись файлов, прикрепление вложений allure).
+        """
+        with self._lock:
+            sinks, self.sinks = self.sinks, []
+        for sink in sinks:
+            sink.close()
+
+
+# общий для всего процесса объект, через него замеряются Transport, SqlHelper и LogReader
+instrumentation = Instrumentation()
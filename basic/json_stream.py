@@ -0,0 +1,170 @@
+"""
+Модуль содержит класс JsonArrayParser и функцию iter_json_array для потокового разбора массива из ответа
+в формате json.
+
+:author: Andrei Ursaki.
+"""
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+# символы, которыми может заканчиваться элемент массива
+_ITEM_END = _WHITESPACE + ",]"
+
+
+class JsonStreamResult:
+    def __init__(self):
+        """
+        Конструктор класса. Заполняется при разборе ответа, окончательные значения - после завершения разбора.
+        """
+        # найден ли массив с указанным ключом
+        self.found = False
+        # весь ответ в виде словаря, если массив не найден (например, ответ с ошибкой)
+        self.document = None
+        # ошибка разбора ответа
+        self.error = None
+
+
+def _skip(buffer: str, position: int, chars: str) -> int:
+    while position < len(buffer) and buffer[position] in chars:
+        position += 1
+    return position
+
+
+class JsonArrayParser:
+    def __init__(self, key: str, result: JsonStreamResult = None, encoding: str = "utf-8"):
+        """
+        Конструктор класса. Парсер получает ответ частями (метод feed) и возвращает элементы массива
+        из json вида {"<key>": [...]} по мере их получения, в памяти хранится только непрочитанная часть ответа.
+        Если массив не найден, ответ разбирается целиком и сохраняется в result.document.
+
+        :param key: ключ массива
+        :param result: объект класса JsonStreamResult для получения результата разбора
+        :param encoding: кодировка ответа
+        """
+        self.result = result if result is not None else JsonStreamResult()
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self._marker = json.dumps(key, ensure_ascii=False)
+        self._buffer = ""
+        self._position = 0
+        # начало массива найдено, до этого ответ хранится целиком на случай, если массива нет
+        self._in_array = False
+        self._done = False
+
+    @property
+    def done(self) -> bool:
+        """
+        Разбор закончен: массив прочитан до конца или ответ разобран целиком.
+        """
+        return self._done
+
+    def feed(self, chunk: bytes) -> list:
+        """
+        Метод для разбора очередной части ответа.
+
+        :param chunk: часть ответа
+        :return: список элементов массива, полностью полученных в этой части
+        """
+        if self._done:
+            return []
+        self._buffer += self._decoder.decode(chunk)
+        return self._parse(eof=False)
+
+    def close(self) -> list:
+        """
+        Метод для завершения разбора после получения всего ответа.
+
+        :return: список оставшихся элементов массива
+        """
+        if self._done:
+            return []
+        self._buffer += self._decoder.decode(b"", final=True)
+        items = self._parse(eof=True)
+        if not self._done:
+            if self._in_array:
+                self.result.error = "Неожиданный конец ответа"
+            else:
+                # массива нет, разбираем ответ целиком
+                try:
+                    self.result.document = json.loads(self._buffer)
+                except json.decoder.JSONDecodeError as e:
+                    self.result.error = str(e)
+            self._done = True
+        self._buffer = ""
+        return items
+
+    def _find_array(self) -> bool:
+        """
+        Метод для поиска начала массива: "<key>": [
+
+        :return: True, если начало найдено или вместо массива null (разбор закончен)
+        """
+        buffer, marker = self._buffer, self._marker
+        while True:
+            start = buffer.find(marker, self._position)
+            if start == -1:
+                # ключ может быть получен не полностью
+                self._position = max(self._position, len(buffer) - len(marker))
+                return False
+            colon = _skip(buffer, start + len(marker), _WHITESPACE)
+            value = _skip(buffer, colon + 1, _WHITESPACE)
+            if value >= len(buffer):
+                self._position = start
+                return False
+            if buffer[colon] == ":" and buffer[value] in "[n":
+                self.result.found = True
+                self._in_array = True
+                self._position = value + 1
+                if buffer[value] == "n":
+                    # вместо массива null
+                    self._done = True
+                return True
+            # найденная строка - не ключ, а значение
+            self._position = start + len(marker)
+
+    def _parse(self, eof: bool) -> list:
+        items = []
+        if not self._in_array and not self._find_array():
+            return items
+        buffer, position = self._buffer, self._position
+        while not self._done:
+            position = _skip(buffer, position, _WHITESPACE + ",")
+            if position >= len(buffer):
+                break
+            if buffer[position] == "]":
+                self._done = True
+                break
+            try:
+                item, end = _decoder.raw_decode(buffer, position)
+            except json.decoder.JSONDecodeError as e:
+                if eof:
+                    self.result.error = str(e)
+                    self._done = True
+                break
+            if not eof and (end == len(buffer) or buffer[end] not in _ITEM_END):
+                # элемент мог быть получен не полностью: число "-1." разбирается как -1, если "5e3" еще не получено
+                break
+            items.append(item)
+            position = end
+        # прочитанная часть буфера больше не нужна
+        self._buffer, self._position = buffer[position:], 0
+        return items
+
+
+def iter_json_array(chunks, key: str, result: JsonStreamResult = None, encoding: str = "utf-8"):
+    """
+    Функция для потокового разбора массива из json вида {"<key>": [...]}, см. JsonArrayParser.
+
+    :param chunks: итерируемый объект с частями ответа (bytes), например response.iter_content()
+    :param key: ключ массива
+    :param result: объект класса JsonStreamResult для получения результата разбора
+    :param encoding: кодировка ответа
+    :return: генератор элементов массива
+    """
+    parser = JsonArrayParser(key, result, encoding)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            return
+    yield from parser.close()
@@ -0,0 +1,240 @@
+"""
+Модуль содержит класс LoadGenerator для нагрузочной отправки сообщений адаптеру и класс LoadReport с ее результатами.
+
+:author: Andrei Ursaki.
+"""
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from basic.stats import LatencyStats
+
+
+class LoadReport:
+    def __init__(self):
+        """
+        Конструктор класса.
+        """
+        self.latency = LatencyStats()
+        # количество ошибок по коду ответа (или по имени исключения, если ответ не получен)
+        self.errors = Counter()
+        self.sent = 0
+        self.duration = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float, status):
+        """
+        Метод для добавления результата отправки одного сообщения.
+
+        :param seconds: время отправки, сек
+        :param status: код ответа или имя исключения
+        """
+        self.latency.add(seconds)
+        with self._lock:
+            self.sent += 1
+            if not (isinstance(status, int) and 200 <= status < 300):
+                self.errors[status] += 1
+
+    @property
+    def throughput(self) -> float:
+        """
+        Достигнутая пропускная способность, сообщений в секунду.
+        """
+        return self.sent / self.duration if self.duration else 0.0
+
+    def to_dict(self) -> dict:
+        """
+        Метод для получения результатов в виде словаря.
+
+        :return: словарь с результатами нагрузки
+        """
+        return {"sent": self.sent,
+                "errors": {str(status): count for status, count in self.errors.items()},
+                "duration_s": self.duration,
+                "throughput_msg_s": self.throughput,
+                "latency": self.latency.summary()}
+
+    def summary(self) -> str:
+        """
+        Метод для получения результатов в виде строки для печати/вывода.
+
+        :return: строка с результатами нагрузки
+        """
+        latency = self.latency.summary()
+        lines = [f"Отправлено сообщений: {self.sent} за {self.duration:.2f} с ({self.throughput:.1f} msg/s)"]
+        if latency["count"]:
+            lines.append(f"Задержка, мс: p50={latency['p50_ms']:.1f} p95={latency['p95_ms']:.1f} "
+                         f"p99={latency['p99_ms']:.1f} max={latency['max_ms']:.1f}")
+        if self.errors:
+            lines.append("Ошибки: " + ", ".join(f"{status}: {count}" for status, count in self.errors.most_common()))
+        return "\n".join(lines)
+
+
+class LoadGenerator:
+    def __init__(self, request, rate: float = None, concurrency: int = 10, ramp_up: list = None):
+        """
+        Конструктор класса.
+
+        Если не задана ни частота, ни профиль разгона, сообщения отправляются с фиксированной конкурентностью
+        (каждый поток отправляет следующее сообщение сразу после получения ответа). Иначе сообщения отправляются
+        с заданной частотой, но не более concurrency сообщений одновременно.
+
+        :param request: объект класса Request, через который отправляются сообщения
+        :param rate: целевая частота отправки, сообщений в секунду
+        :param concurrency: количество потоков/одновременно отправляемых сообщений
+        :param ramp_up: профиль разгона - список этапов (длительность в секундах, частота в конце этапа),
+            частота внутри этапа меняется линейно, после последнего этапа используется rate
+        """
+        if rate is None and ramp_up:
+            rate = ramp_up[-1][1]
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive")
+        pool_size = getattr(getattr(request, "transport", None), "pool_size", None)
+        if pool_size is not None and pool_size < concurrency:
+            # лишние потоки ждали бы свободного соединения, а время ожидания попадало бы в задержки
+            raise ValueError(f"concurrency ({concurrency}) is greater than transport pool size ({pool_size})")
+        self.request = request
+        self.rate = rate
+        self.concurrency = concurrency
+        self.ramp_up = ramp_up or []
+
+    def current_rate(self, elapsed: float) -> float:
+        """
+        Метод для получения целевой частоты отправки в момент времени с учетом профиля разгона.
+
+        :param elapsed: время с начала нагрузки, сек
+        :return: частота, сообщений в секунду
+        """
+        start_rate = 0.0
+        for duration, stage_rate in self.ramp_up:
+            if elapsed < duration:
+                return start_rate + (stage_rate - start_rate) * elapsed / duration
+            elapsed -= duration
+            start_rate = stage_rate
+        return self.rate
+
+    def schedule(self):
+        """
+        Генератор моментов отправки сообщений с начала нагрузки: n-е сообщение отправляется, когда интеграл частоты
+        по времени (с учетом профиля разгона) достигает n, первое - сразу.
+
+        :return: бесконечный генератор времени отправки, сек
+        """
+        sent, elapsed, start_rate = 0, 0.0, 0.0
+        for duration, stage_rate in self.ramp_up:
+            # частота внутри этапа: start_rate + slope * t
+            slope = (stage_rate - start_rate) / duration
+            stage_sends = (start_rate + stage_rate) / 2 * duration
+            while sent < stage_sends:
+                if slope:
+                    offset = (math.sqrt(start_rate ** 2 + 2 * slope * sent) - start_rate) / slope
+                else:
+                    offset = sent / start_rate
+                yield elapsed + min(offset, duration)
+                sent += 1
+            # сообщения этапа, не отправленные целиком, переходят в следующий этап
+            sent -= stage_sends
+            elapsed += duration
+            start_rate = stage_rate
+        while True:
+            yield elapsed + sent / self.rate
+            sent += 1
+
+    def _open_loop_plan(self, msgs, start: float, deadline: float):
+        """
+        Генератор сообщений для отправки с заданной частотой вместе с моментом отправки.
+
+        :return: генератор пар (сообщение, время отправки по time.perf_counter)
+        """
+        for msg, offset in zip(msgs, self.schedule()):
+            send_at = start + offset
+            if deadline is not None and send_at > deadline:
+                return
+            yield msg, send_at
+
+    def _send(self, msg, report: LoadReport):
+        """
+        Метод для отправки одного сообщения и записи результата в отчет.
+
+        :param msg: сообщение
+        :param report: отчет нагрузки
+        """
+        start = time.perf_counter()
+        try:
+            status = self.request.post(msg).status_code
+        except Exception as e:
+            status = type(e).__name__
+        report.add(time.perf_counter() - start, status)
+
+    def run(self, msgs, duration: float = None) -> LoadReport:
+        """
+        Метод для запуска нагрузки.
+
+        :param msgs: итерируемый объект или генератор сообщений
+        :param duration: максимальная длительность нагрузки, сек
+        :return: отчет нагрузки
+        """
+        report = LoadReport()
+        start = time.perf_counter()
+        deadline = start + duration if duration else None
+        if self.rate is None:
+            self._run_closed_loop(iter(msgs), report, deadline)
+        else:
+            self._run_open_loop(iter(msgs), report, start, deadline)
+        report.duration = time.perf_counter() - start
+        return report
+
+    @staticmethod
+    def _next_message(msgs, deadline: float, end):
+        """
+        Метод для получения следующего сообщения при отправке с фиксированной конкурентностью.
+
+        :return: сообщение или end, если сообщения закончились или истекло время нагрузки
+        """
+        if deadline is not None and time.perf_counter() >= deadline:
+            return end
+        return next(msgs, end)
+
+    def _run_closed_loop(self, msgs, report: LoadReport, deadline: float):
+        """
+        Метод для отправки сообщений с фиксированной конкурентностью.
+        """
+        lock = threading.Lock()
+        end = object()
+
+        def worker():
+            while True:
+                with lock:
+                    msg = self._next_message(msgs, deadline, end)
+                if msg is end:
+                    return
+                self._send(msg, report)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _run_open_loop(self, msgs, report: LoadReport, start: float, deadline: float):
+        """
+        Метод для отправки сообщений с заданной частотой.
+        """
+        in_flight = threading.BoundedSemaphore(self.concurrency)
+
+        def send(msg):
+            try:
+                self._send(msg, report)
+            finally:
+                in_flight.release()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for msg, send_at in self._open_loop_plan(msgs, start, deadline):
+                delay = send_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # не даем очереди расти, если сервер не успевает отвечать
+                in_flight.acquire()
+                executor.submit(send, msg)
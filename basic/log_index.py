@@ -0,0 +1,217 @@
+"""
+Модуль содержит класс LogIndex - инкрементальный индекс файла лога для быстрого поиска цепочек логов.
+
+Индекс хранит позиции строк по sphaera_x_operation_id, statementName правила и идентификаторам кастомных объектов,
+сохраняется на диск и при следующем обновлении дочитывает только добавленные в файл строки.
+
+:author: Andrei Ursaki.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from basic.config import Config
+
+OPERATION = "op"
+RULE = "rule"
+LAYER_OBJECT = "obj"
+
+_OPERATION_PATTERN = re.compile(rb'"sphaera_x_operation_id"\s*:\s*"((?:[^"\\]|\\.)+)"')
+# символы < и > в json'е могут быть экранированы
+_RULE_PATTERN = re.compile(rb'(?:<|\\u003[cC])statementName(?:>|\\u003[eE])(.*?)(?:<|\\u003[cC])/statementName')
+_LAYER_OBJECT_OPERATION = b"CreateOrUpdateElement"
+_UUID_PATTERN = re.compile(rb"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+_UUID_STR_PATTERN = re.compile(_UUID_PATTERN.pattern.decode())
+_RULE_STR_PATTERN = re.compile(r"<statementName>(.*?)</statementName>")
+# размер начала файла, по которому определяется, что файл был заменен (ротация лога)
+_HEAD_SIZE = 4096
+# версия формата сохраненного индекса, индекс другой версии строится заново
+_VERSION = 2
+
+
+def _json_string(fragment: bytes) -> str:
+    """
+    Функция для получения значения из фрагмента строки json: экранированные символы (\\uXXXX, \\") раскодируются,
+    чтобы ключ индекса совпадал со значением из поискового запроса.
+
+    :param fragment: часть строки json без кавычек
+    :return: значение
+    """
+    try:
+        return json.loads(b'"' + fragment + b'"')
+    except ValueError:
+        return fragment.decode('utf-8', 'replace')
+
+
+class LogIndex:
+    def __init__(self, path: str, index_dir: str = None):
+        """
+        Конструктор класса. Если индекс был сохранен ранее, он загружается с диска.
+
+        :param path: путь к файлу лога
+        :param index_dir: каталог для хранения индексов, по умолчанию Config.log_index_dir
+        """
+        self.path = path
+        index_dir = index_dir or Config.log_index_dir or os.path.join(tempfile.gettempdir(), "basic_log_index")
+        name = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+        self.index_path = os.path.join(index_dir, f"{name}.json")
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.inode = None
+        self.mtime = 0
+        self.head = None
+        self.head_size = 0
+        # позиция, до которой файл проиндексирован (начало первой непрочитанной строки)
+        self.indexed_size = 0
+        self.entries = {}
+
+    def _load(self):
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get("version") != _VERSION:
+            return
+        self.inode = state["inode"]
+        self.mtime = state["mtime"]
+        self.head = state["head"]
+        self.head_size = state["head_size"]
+        self.indexed_size = state["indexed_size"]
+        self.entries = state["entries"]
+
+    def save(self):
+        """
+        Метод для сохранения индекса на диск.
+        """
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _save(self):
+        state = {"version": _VERSION, "path": self.path, "inode": self.inode, "mtime": self.mtime,
+                 "head": self.head, "head_size": self.head_size, "indexed_size": self.indexed_size,
+                 "entries": self.entries}
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        # запись через временный файл, чтобы прерванное сохранение не испортило индекс
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def _head_hash(self, log_file, size: int) -> str:
+        return hashlib.sha1(log_file.data[:size]).hexdigest()
+
+    def _is_rotated(self, log_file, stat) -> bool:
+        """
+        Метод для проверки, был ли файл заменен с прошлого обновления индекса (ротация лога): другой inode,
+        уменьшился размер или время изменения, изменилось уже проиндексированное начало файла.
+        """
+        if self.head is None:
+            return False
+        return (stat.st_ino != self.inode or stat.st_size < self.indexed_size or stat.st_mtime < self.mtime
+                or self._head_hash(log_file, self.head_size) != self.head)
+
+    def update(self, log_file):
+        """
+        Метод для обновления индекса. Индексируются только строки, добавленные с прошлого обновления,
+        если файл был заменен - индекс строится заново.
+
+        :param log_file: открытый файл лога, объект класса LogFile
+        """
+        with self._lock:
+            stat = log_file.stat()
+            if self._is_rotated(log_file, stat):
+                self._reset()
+            if log_file.size > self.indexed_size:
+                self._index(log_file, self.indexed_size, log_file.size)
+                self.inode = stat.st_ino
+                self.mtime = stat.st_mtime
+                self.head_size = min(log_file.size, _HEAD_SIZE)
+                self.head = self._head_hash(log_file, self.head_size)
+                self._dirty = True
+            # индекс большого файла сохраняется не чаще, чем раз в Config.log_index_save_interval секунд
+            if self._dirty and time.monotonic() - self._saved_at >= Config.log_index_save_interval:
+                self._save()
+
+    def _add(self, kind: str, value: bytes, pos: int):
+        positions = self.entries.setdefault(f"{kind}:{_json_string(value)}", [])
+        # одна строка может содержать значение несколько раз
+        if not positions or positions[-1] != pos:
+            positions.append(pos)
+
+    def _index(self, log_file, start: int, end: int):
+        """
+        Метод для индексации диапазона файла. Индексируются только полные строки.
+        """
+        # последняя строка может быть еще не дописана
+        end = log_file.data.rfind(b"\n", start, end) + 1
+        if end <= start:
+            return
+        data = log_file.data
+        for match in _OPERATION_PATTERN.finditer(data, start, end):
+            self._add(OPERATION, match.group(1), log_file.line_start(match.start()))
+        for match in _RULE_PATTERN.finditer(data, start, end):
+            self._add(RULE, match.group(1), log_file.line_start(match.start()))
+        pos = data.find(_LAYER_OBJECT_OPERATION, start, end)
+        while pos != -1:
+            line_start, line_end = log_file.line_start(pos), log_file.line_end(pos)
+            for match in _UUID_PATTERN.finditer(data, line_start, line_end):
+                self._add(LAYER_OBJECT, match.group(0).lower(), line_start)
+            pos = data.find(_LAYER_OBJECT_OPERATION, line_end, end)
+        self.indexed_size = end
+
+    def lookup(self, kind: str, value: str, start: int = 0, end: int = None) -> list:
+        """
+        Метод для получения позиций строк по значению.
+
+        :param kind: тип значения (OPERATION, RULE, LAYER_OBJECT)
+        :param value: значение
+        :param start: начало диапазона файла
+        :param end: конец диапазона файла
+        :return: отсортированный список позиций начала строк
+        """
+        if kind == LAYER_OBJECT:
+            value = value.lower()
+        positions = self.entries.get(f"{kind}:{value}", [])
+        lo = bisect_left(positions, start)
+        hi = len(positions) if end is None else bisect_left(positions, end)
+        return positions[lo:hi]
+
+
+def index_key(find_dict: dict):
+    """
+    Функция для определения, можно ли выполнить поисковой запрос по индексу.
+
+    :param find_dict: словарь с данными, по которым будет произведен поиск
+    :return: кортеж (тип значения, значение) или None, если запрос нельзя выполнить по индексу
+    """
+    operation_id = find_dict.get("sphaera_x_operation_id")
+    if isinstance(operation_id, str):
+        return OPERATION, operation_id
+    data_list = find_dict.get("sphaera_data")
+    if not isinstance(data_list, list):
+        return None
+    for item in data_list:
+        data = item.get("data") if isinstance(item, dict) else None
+        if not isinstance(data, str):
+            continue
+        rule = _RULE_STR_PATTERN.search(data)
+        if rule:
+            return RULE, rule.group(1)
+        if find_dict.get("sphaera_operation") == _LAYER_OBJECT_OPERATION.decode() \
+                and _UUID_STR_PATTERN.fullmatch(data):
+            return LAYER_OBJECT, data
+    return None
@@ -4,28 +4,118 @@
 :author: Andrei Ursaki.
 """
 import json
+import os
+import tempfile
+import textwrap
 from datetime import datetime
 
 import allure
 
 from basic.config import Config
-from basic.request import Request
+from basic.instrumentation import instrumentation
+from basic.json_stream import JsonStreamResult, iter_json_array
+from basic.log_search import LocalLogSearch
+from basic.transport import Transport
+
+
+class LogsAttachment:
+    def __init__(self, name: str):
+        """
+        Конструктор класса. Логи записываются во временный файл по одному и прикрепляются к отчету allure
+        при выходе из контекстного менеджера.
+
+        :param name: название вложения
+        """
+        self.name = name
+        self.count = 0
+        self._file = tempfile.NamedTemporaryFile("w", encoding="utf-8", suffix=".json", delete=False)
+
+    def write(self, log: dict):
+        # формат файла совпадает с json.dumps(logs, indent=4)
+        self._file.write(",\n" if self.count else "[\n")
+        self._file.write(textwrap.indent(json.dumps(log, ensure_ascii=False, indent=4), "    "))
+        self.count += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._file.write("\n]" if self.count else "[]")
+        self._file.close()
+        try:
+            if exc_type is None:
+                allure.attach.file(self._file.name, self.name, allure.attachment_type.JSON)
+        finally:
+            os.remove(self._file.name)
+
+
+class LogPages:
+    def __init__(self, log_count: int = None, page_size: int = Config.log_page_size):
+        """
+        Конструктор класса. Постраничный запрос логов у LogChecker (LogReader.iter_logs, AsyncLogReader.iter_logs):
+        страницы запрашиваются, пока не получена неполная страница, ошибка или log_count логов.
+
+            pages = LogPages(log_count, page_size)
+            for count, offset in pages:
+                for log in <логи страницы>:
+                    pages.add(log)
+
+        :param log_count: ограничение количества возвращаемых логов
+        :param page_size: количество логов на странице, None - все логи одной страницей
+        """
+        self.log_count = log_count
+        self.page_size = page_size
+        self.done = False
+        self._received = 0
+
+    def __iter__(self):
+        """
+        :return: генератор кортежей (количество логов на странице, количество пропускаемых логов)
+        """
+        if not self.page_size:
+            yield self.log_count, None
+            return
+        offset = 0
+        while not self.done and (self.log_count is None or offset < self.log_count):
+            count = self.page_size if self.log_count is None else min(self.page_size, self.log_count - offset)
+            self._received = 0
+            yield count, offset
+            if self._received < count:
+                # последняя страница
+                return
+            offset += self._received
+
+    def add(self, log: dict):
+        """
+        Метод для учета полученного лога, после ошибки следующие страницы не запрашиваются.
+
+        :param log: лог или словарь с ключом "error"
+        """
+        if "error" in log:
+            self.done = True
+        else:
+            self._received += 1
 
 
 class LogReader:
 
-    def __init__(self, server: str, start_datetime: datetime, end_datetime: datetime):
+    def __init__(self, server: str, start_datetime: datetime, end_datetime: datetime, transport: Transport = None,
+                 backend: LocalLogSearch = None):
         """
         Конструктор класса.
 
         :param server: ip адрес сервера, на котором расположены логи.
         :param start_datetime: дата-время для начала поиска в логах
         :param end_datetime: дата-время для окончания поиска в логах
+        :param transport: транспорт для HTTP запросов, по умолчанию общий пул соединений
+        :param backend: локальный поиск по логам, если не передан - поиск выполняется сервисом LogChecker
         """
         self.file_path_integration = fr"\\{server}{Config.integration_logs_path}"
         self.file_path_layer_object = fr"\\{server}{Config.layer_objects_logs_path}"
         self.start_dt_iso_str = start_datetime.isoformat(timespec="seconds")
         self.end_dt_iso_str = end_datetime.isoformat(timespec="seconds")
+        self.transport = transport or Transport.shared()
+        self.backend = backend
 
     def get_logs(self, file_path: str, find_dict: dict, pretty_print: bool = False, log_count: int = None,
                  full_file_search: bool = False) -> list:
@@ -39,6 +129,99 @@ class LogReader:
         :param full_file_search: производить ли поиск по всему файлу
         :return: список найденных логов
         """
+        with instrumentation.span("log", "find_logs local" if self.backend else "find_logs remote") as attrs:
+            logs = list(self.iter_logs(file_path, find_dict, pretty_print, log_count, full_file_search))
+            attrs["found"] = len(logs)
+        return logs
+
+    def get_logs_batch(self, file_path: str, queries: dict, pretty_print: bool = False, log_count: int = None,
+                       full_file_search: bool = False) -> dict:
+        """
+        Метод для получения логов сразу по многим запросам. При локальном поиске все запросы выполняются за один
+        проход по файлу (см. LocalLogSearch.find_many), LogChecker пакетного поиска не поддерживает - запросы к нему
+        отправляются по одному.
+
+        :param file_path: путь к файлу в котором необходимо произвести поиск
+        :param queries: словарь {название запроса: словарь с данными, по которым будет произведен поиск}
+        :param pretty_print: возвращать ли данные в более читабельном виде
+        :param log_count: ограничение количества возвращаемых логов для каждого запроса
+        :param full_file_search: производить ли поиск по всему файлу
+        :return: словарь {название запроса: список найденных логов}
+        """
+        with instrumentation.span("log", "find_logs_batch local" if self.backend else "find_logs_batch remote",
+                                  queries=len(queries)) as attrs:
+            if self.backend:
+                start, end = (None, None) if full_file_search else (self.start_dt_iso_str, self.end_dt_iso_str)
+                try:
+                    results = self.backend.find_many(file_path, queries, start, end, log_count)
+                except OSError as e:
+                    # если файл недоступен возвращаем ошибку для каждого запроса, как это делает LogChecker
+                    results = {name: [{"error": str(e)}] for name in queries}
+            else:
+                results = {name: self.get_logs(file_path, find_dict, pretty_print, log_count, full_file_search)
+                           for name, find_dict in queries.items()}
+            attrs["found"] = sum(len(logs) for logs in results.values())
+        return results
+
+    def iter_logs(self, file_path: str, find_dict: dict, pretty_print: bool = False, log_count: int = None,
+                  full_file_search: bool = False, page_size: int = Config.log_page_size):
+        """
+        Метод для потокового получения логов. Логи возвращаются по мере чтения ответа LogChecker (или файла при
+        локальном поиске), весь ответ в памяти не хранится. Ошибка возвращается в виде словаря с ключом "error".
+
+        :param file_path: путь к файлу в котором необходимо произвести поиск
+        :param find_dict: словарь с данными, по которым будеи произведен поиск
+        :param pretty_print: возвращать ли данные в более читабельном виде
+        :param log_count: ограничение количества возвращаемых логов
+        :param full_file_search: производить ли поиск по всему файлу
+        :param page_size: количество логов, запрашиваемых у LogChecker за один запрос, None - все логи одним запросом
+        :return: генератор найденных логов
+        """
+        if self.backend:
+            # поиск выполняется локально, без обращения к LogChecker
+            yield from self._iter_local_logs(file_path, find_dict, log_count, full_file_search)
+            return
+        pages = LogPages(log_count, page_size)
+        for count, offset in pages:
+            for log in self._iter_remote_logs(file_path, find_dict, pretty_print, count, full_file_search, offset):
+                pages.add(log)
+                yield log
+
+    def _iter_remote_logs(self, file_path: str, find_dict: dict, pretty_print: bool = False, log_count: int = None,
+                          full_file_search: bool = False, offset: int = None):
+        """
+        Метод для потокового получения логов с помощью сервиса LogChecker.
+
+        :param file_path: путь к файлу в котором необходимо произвести поиск
+        :param find_dict: словарь с данными, по которым будеи произведен поиск
+        :param pretty_print: возвращать ли данные в более читабельном виде
+        :param log_count: ограничение количества возвращаемых логов
+        :param full_file_search: производить ли поиск по всему файлу
+        :param offset: количество пропускаемых логов
+        :return: генератор найденных логов
+        """
+        # отправляем запрос в LogChecker, ответ читается по частям
+        msg = self._find_logs_request(file_path, find_dict, pretty_print, log_count, full_file_search, offset)
+        response = self.transport.post(f"{Config.log_checker_url}/findLogs", msg,
+                                       headers={"Content-Type": "application/json; charset=utf-8"}, verify=False,
+                                       stream=True, timeout=Config.log_checker_timeout)
+        result = JsonStreamResult()
+        try:
+            yield from iter_json_array(response.iter_content(Config.log_stream_chunk_size), "found_lоgs", result,
+                                       response.encoding or "utf-8")
+        finally:
+            response.close()
+        error = self._response_error(result)
+        if error:
+            yield error
+
+    def _find_logs_request(self, file_path: str, find_dict: dict, pretty_print: bool = False, log_count: int = None,
+                           full_file_search: bool = False, offset: int = None) -> bytes:
+        """
+        Метод для формирования тела запроса к LogChecker, параметры см. _iter_remote_logs.
+
+        :return: тело запроса
+        """
         # составляем словарь с параметрами поиска
         msg = {"file_path": file_path, "find": find_dict, "pretty": pretty_print}
         if not full_file_search:
@@ -47,20 +230,81 @@ class LogReader:
         if log_count:
             # если необходимо добавляем ограничение по количеству логов
             msg.update({"log_count": log_count})
-        # формируем json
-        msg = json.dumps(msg, ensure_ascii=False)
-        # отправляем запрос в LogChecker
-        result = Request.send_request(msg, "http://10.100.122.5:5002/findLogs", "application/json", print_msg=True)
-        try:
-            # пытаемся получить данные из пришедшего json'а
-            result = json.loads(result)
-            if result.get("error"):
-                return [result]
-            else:
-                return result.get("found_lоgs")
-        except json.decoder.JSONDecodeError:
+        if offset:
+            msg.update({"offset": offset})
+        return json.dumps(msg, ensure_ascii=False).encode("utf-8")
+
+    @staticmethod
+    def _response_error(result: JsonStreamResult) -> dict:
+        """
+        Метод для получения ошибки из разобранного ответа LogChecker.
+
+        :param result: результат разбора ответа
+        :return: словарь с ошибкой или None
+        """
+        if isinstance(result.document, dict) and result.document.get("error"):
+            return result.document
+        if result.error:
             # если ответ не содержит json возвращаем ошибку
-            return [{"error": "Необработанная серверная ошибка"}]
+            return {"error": "Необработанная серверная ошибка"}
+
+    def _iter_local_logs(self, file_path: str, find_dict: dict, log_count: int = None,
+                         full_file_search: bool = False):
+        """
+        Метод для потокового получения логов с помощью локального поиска.
+
+        :param file_path: путь к файлу в котором необходимо произвести поиск
+        :param find_dict: словарь с данными, по которым будеи произведен поиск
+        :param log_count: ограничение количества возвращаемых логов
+        :param full_file_search: производить ли поиск по всему файлу
+        :return: генератор найденных логов
+        """
+        start, end = (None, None) if full_file_search else (self.start_dt_iso_str, self.end_dt_iso_str)
+        try:
+            yield from self.backend.iter_find(file_path, find_dict, start, end, log_count)
+        except OSError as e:
+            # если файл недоступен возвращаем ошибку, как это делает LogChecker
+            yield {"error": str(e)}
+
+    @staticmethod
+    def attach_logs(logs, name: str, collect: bool = True):
+        """
+        Метод для прикрепления логов к отчету allure. Логи записываются во временный файл по одному,
+        поэтому их можно передать генератором, не собирая в список.
+
+        :param logs: итерируемый объект или генератор логов
+        :param name: название вложения
+        :param collect: возвращать ли список логов, если False - логи в памяти не хранятся
+        :return: список логов или их количество, если collect=False
+        """
+        collected = []
+        with LogsAttachment(name) as attachment:
+            for log in logs:
+                attachment.write(log)
+                if collect:
+                    collected.append(log)
+        return collected if collect else attachment.count
+
+    @staticmethod
+    def _rule_find_dict(rule_name: str) -> dict:
+        """
+        Метод для формирования поискового запроса логов по правилу.
+
+        :param rule_name: название правила
+        :return: словарь с данными для поиска
+        """
+        return {"sphaera_process": "Sphaera.Telemetry.Cep",
+                "sphaera_data": [{"data": f"<statementName>{rule_name}</statementName>"}]}
+
+    @staticmethod
+    def _layer_object_find_dict(layer_obj_id: str) -> dict:
+        """
+        Метод для формирования поискового запроса логов по кастомному объекту.
+
+        :param layer_obj_id: уникальный идентификатор кастомного объекта
+        :return: словарь с данными для поиска
+        """
+        return {"sphaera_operation": "CreateOrUpdateElement", "sphaera_data": [{"data": layer_obj_id}]}
 
     def get_log_for_rule(self, rule_name: str) -> list:
         """
@@ -69,10 +313,7 @@ class LogReader:
         :param rule_name: название правила
         :return: список с первым найденым логом
         """
-        # формируем поисковой запрос
-        find_dict = {"sphaera_process": "Sphaera.Telemetry.Cep",
-                     "sphaera_data": [{"data": f"<statementName>{rule_name}</statementName>"}]}
-        return self.get_logs(self.file_path_integration, find_dict, log_count=1)
+        return self.get_logs(self.file_path_integration, self._rule_find_dict(rule_name), log_count=1)
 
     def get_chain_logs(self, file_path: str, chain_id: str) -> list:
         """
@@ -86,26 +327,39 @@ class LogReader:
         find_dict = {"sphaera_x_operation_id": chain_id}
         return self.get_logs(file_path, find_dict, full_file_search=True)
 
+    def iter_chain_logs(self, file_path: str, chain_id: str, page_size: int = Config.log_page_size):
+        """
+        Метод для потокового получения логов по "чейну", см. iter_logs.
+
+        :param file_path: путь к файлу в котором необходимо произвести поиск
+        :param chain_id: уникальный идентификаторуцепочки логов
+        :param page_size: количество логов, запрашиваемых у LogChecker за один запрос
+        :return: генератор найденных логов
+        """
+        find_dict = {"sphaera_x_operation_id": chain_id}
+        return self.iter_logs(file_path, find_dict, full_file_search=True, page_size=page_size)
+
     @allure.step("Получение цепочки логов для правила {1}")
-    def get_chain_for_rule(self, rule_name: str) -> list:
+    def get_chain_for_rule(self, rule_name: str, collect: bool = True):
         """
         Метод для получения цепочки логов по выбранному правилу. Используется комбинация из 2 предыдущих методов.
+        Логи "чейна" прикрепляются к отчету по мере получения.
 
         :param rule_name: название правила
+        :param collect: возвращать ли список логов, если False - возвращается только их количество
         :return: список найденных логов
         """
         # получаем список с первым логом по правилу
         rule_log = self.get_log_for_rule(rule_name)
         if rule_log:
             logs = rule_log[0]
+            name = f"Логи для правила {rule_name}"
             if "error" not in list(logs.keys()):
-                # если получили лог, получаем его "чейн"
+                # если получили лог, получаем его "чейн" и прикрепляем для отчетности
                 log_id = logs.get("sphaera_x_operation_id")
-                # получаем логи по данному "чейну"
-                logs = self.get_chain_logs(self.file_path_integration, log_id)
-            # прикрепляем полученные логи для отчетности
-            allure.attach(json.dumps(logs, ensure_ascii=False, indent=4), f"Логи для правила {rule_name}",
-                          allure.attachment_type.JSON)
+                return self.attach_logs(self.iter_chain_logs(self.file_path_integration, log_id), name, collect)
+            # прикрепляем ошибку для отчетности
+            allure.attach(json.dumps(logs, ensure_ascii=False, indent=4), name, allure.attachment_type.JSON)
             return logs
 
     def get_log_for_layer_object(self, layer_obj_id: str) -> list:
@@ -115,28 +369,96 @@ class LogReader:
         :param layer_obj_id: уникальный идентификатор кастомного объекта
         :return: список с первым найденым логом
         """
-        # формируем поисковой запрос
-        find_dict = {"sphaera_operation": "CreateOrUpdateElement", "sphaera_data": [{"data": layer_obj_id}]}
-        return self.get_logs(self.file_path_layer_object, find_dict, log_count=1)
+        return self.get_logs(self.file_path_layer_object, self._layer_object_find_dict(layer_obj_id), log_count=1)
 
     @allure.step("Получение логов для кастомного объекта с id {1}")
-    def get_chain_for_layer_object(self, layer_obj_id):
+    def get_chain_for_layer_object(self, layer_obj_id, collect: bool = True):
         """
         Метод для получения цепочки логов по выбранному кастомному объекту.
+        Логи "чейна" прикрепляются к отчету по мере получения.
 
         :param layer_obj_id: уникальный идентификатор кастомного объекта
+        :param collect: возвращать ли список логов, если False - возвращается только их количество
         :return: список найденных логов
         """
         # получаем список с первым логом по кастомному объекту
         layer_object_log = self.get_log_for_layer_object(layer_obj_id)
         if layer_object_log:
             logs = layer_object_log[0]
+            name = f"Логи для для кастомного объекта с id {layer_obj_id}"
             if "error" not in list(logs.keys()):
-                # если получили лог, получаем его "чейн"
+                # если получили лог, получаем его "чейн" и прикрепляем для отчетности
                 log_id = logs.get("sphaera_x_operation_id")
-                # получаем логи по данному "чейну"
-                logs = self.get_chain_logs(self.file_path_layer_object, log_id)
-            # прикрепляем полученные логи для отчетности
-            allure.attach(json.dumps(logs, ensure_ascii=False, indent=4),
-                          f"Логи для для кастомного объекта с id {layer_obj_id}", allure.attachment_type.JSON)
+                return self.attach_logs(self.iter_chain_logs(self.file_path_layer_object, log_id), name, collect)
+            # прикрепляем ошибку для отчетности
+            allure.attach(json.dumps(logs, ensure_ascii=False, indent=4), name, allure.attachment_type.JSON)
             return logs
+
+    def _get_chains(self, file_path: str, first_logs: dict) -> dict:
+        """
+        Метод для получения "чейнов" сразу для многих первых логов одним пакетным поиском.
+
+        :param file_path: путь к файлу в котором необходимо произвести поиск
+        :param first_logs: словарь {название запроса: список с первым найденным логом}
+        :return: словарь {название запроса: список логов "чейна", словарь с ошибкой или None, если лог не найден}
+        """
+        chains, queries = self._chain_queries(first_logs)
+        chains.update(self.get_logs_batch(file_path, queries, full_file_search=True))
+        return {name: chains[name] for name in first_logs}
+
+    @staticmethod
+    def _chain_queries(first_logs: dict) -> tuple:
+        """
+        Метод для формирования поисковых запросов по "чейнам" первых логов.
+
+        :param first_logs: словарь {название запроса: список с первым найденным логом}
+        :return: кортеж (словарь результатов для запросов без "чейна", словарь поисковых запросов по "чейнам")
+        """
+        chains, queries = {}, {}
+        for name, logs in first_logs.items():
+            if not logs:
+                chains[name] = None
+            elif "error" in logs[0]:
+                chains[name] = logs[0]
+            else:
+                queries[name] = {"sphaera_x_operation_id": logs[0].get("sphaera_x_operation_id")}
+        return chains, queries
+
+    @staticmethod
+    def _attach_chains(chains: dict, name_format: str):
+        for name, logs in chains.items():
+            if logs is not None:
+                allure.attach(json.dumps(logs, ensure_ascii=False, indent=4), name_format.format(name),
+                              allure.attachment_type.JSON)
+
+    @allure.step("Получение цепочек логов для правил")
+    def get_chains_for_rules(self, rule_names) -> dict:
+        """
+        Метод для получения цепочек логов сразу по многим правилам. При локальном поиске файл просматривается
+        2 раза: поиск первых логов по всем правилам и поиск логов по всем "чейнам".
+
+        :param rule_names: названия правил
+        :return: словарь {название правила: список найденных логов}, см. get_chain_for_rule
+        """
+        first_logs = self.get_logs_batch(self.file_path_integration,
+                                         {rule_name: self._rule_find_dict(rule_name) for rule_name in rule_names},
+                                         log_count=1)
+        chains = self._get_chains(self.file_path_integration, first_logs)
+        self._attach_chains(chains, "Логи для правила {}")
+        return chains
+
+    @allure.step("Получение логов для кастомных объектов")
+    def get_chains_for_layer_objects(self, layer_obj_ids) -> dict:
+        """
+        Метод для получения цепочек логов сразу по многим кастомным объектам, см. get_chains_for_rules.
+
+        :param layer_obj_ids: уникальные идентификаторы кастомных объектов
+        :return: словарь {id кастомного объекта: список найденных логов}, см. get_chain_for_layer_object
+        """
+        first_logs = self.get_logs_batch(self.file_path_layer_object,
+                                         {layer_obj_id: self._layer_object_find_dict(layer_obj_id)
+                                          for layer_obj_id in layer_obj_ids},
+                                         log_count=1)
+        chains = self._get_chains(self.file_path_layer_object, first_logs)
+        self._attach_chains(chains, "Логи для для кастомного объекта с id {}")
+        return chains
@@ -0,0 +1,356 @@
+"""
+Модуль содержит класс LocalLogSearch - локальный поиск по файлам логов, альтернатива сервису LogChecker.
+
+Файл лога читается через mmap, каждая запись - json объект на отдельной строке, записи упорядочены по времени.
+Время записи берется из поля Config.log_timestamp_field в формате ISO 8601.
+
+:author: Andrei Ursaki.
+"""
+import json
+import mmap
+import os
+import re
+import threading
+
+from basic.config import Config
+from basic.log_index import LogIndex, index_key
+
+# символы, которые не экранируются при записи json'а, по ним можно искать прямо в байтах файла
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_.:\-]+")
+
+
+def matches(value, find, substring: bool = False) -> bool:
+    """
+    Функция для проверки соответствия значения из лога поисковому запросу (семантика поиска LogChecker):
+    для словаря должны совпасть все ключи, для списка - каждый элемент запроса должен совпасть хотя бы с одним
+    элементом из лога. Поля записи сравниваются на равенство, строки внутри списков (например, "data"
+    в sphaera_data) ищутся как подстрока.
+
+    :param value: значение из лога
+    :param find: значение из поискового запроса
+    :param substring: искать ли строку как подстроку
+    :return: True/False
+    """
+    if isinstance(find, dict):
+        return isinstance(value, dict) and all(key in value and matches(value[key], item, substring)
+                                               for key, item in find.items())
+    if isinstance(find, list):
+        return isinstance(value, list) and all(any(matches(element, item, True) for element in value)
+                                               for item in find)
+    if isinstance(find, str) and substring:
+        return value is not None and find in (value if isinstance(value, str) else str(value))
+    return value == find
+
+
+def search_tokens(find, exact: bool = True) -> list:
+    """
+    Функция для получения из поискового запроса фрагментов, которые обязательно присутствуют в строке лога.
+    Поля записи сравниваются на равенство, поэтому значение поля вместе с кавычками ищется целиком.
+
+    :param find: поисковой запрос
+    :param exact: сравниваются ли строки запроса на равенство (вне списков)
+    :return: список фрагментов (bytes), от самого длинного к самому короткому
+    """
+    tokens = set()
+    if isinstance(find, dict):
+        values = find.values()
+    elif isinstance(find, list):
+        values, exact = find, False
+    else:
+        values = [find]
+    for value in values:
+        if isinstance(value, (dict, list)):
+            tokens.update(search_tokens(value, exact))
+        elif isinstance(value, str):
+            if exact and _TOKEN_PATTERN.fullmatch(value):
+                tokens.add(f'"{value}"'.encode())
+            else:
+                tokens.update(token.encode() for token in _TOKEN_PATTERN.findall(value))
+    return sorted(tokens, key=len, reverse=True)
+
+
+class LogFile:
+    def __init__(self, path: str, timestamp_field: str = Config.log_timestamp_field):
+        """
+        Конструктор класса. Файл отображается в память только для чтения.
+
+        :param path: путь к файлу лога
+        :param timestamp_field: поле с временем записи
+        """
+        self.path = path
+        self._timestamp_pattern = re.compile(rb'"' + re.escape(timestamp_field.encode()) + rb'"\s*:\s*"([^"]+)"')
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # пустой файл отобразить в память нельзя
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+
+    def stat(self) -> os.stat_result:
+        return os.fstat(self._file.fileno())
+
+    def close(self):
+        if self.size:
+            self.data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def line_end(self, pos: int) -> int:
+        """
+        Метод для получения позиции начала следующей строки.
+        """
+        end = self.data.find(b'\n', pos)
+        return self.size if end == -1 else end + 1
+
+    def line_start(self, pos: int) -> int:
+        """
+        Метод для получения позиции начала строки, содержащей позицию pos.
+        """
+        return self.data.rfind(b'\n', 0, pos) + 1
+
+    def timestamp(self, pos: int, end: int) -> str:
+        """
+        Метод для получения времени записи строки, в виде 'YYYY-MM-DDTHH:MM:SS'.
+
+        :param pos: начало строки
+        :param end: конец строки
+        :return: время записи или None, если в строке его нет
+        """
+        found = self._timestamp_pattern.search(self.data, pos, end)
+        if found:
+            return found.group(1)[:19].decode().replace(' ', 'T')
+
+    def bisect(self, dt_iso_str: str, right: bool = False) -> int:
+        """
+        Метод для бинарного поиска по времени записей.
+
+        :param dt_iso_str: дата-время в формате ISO 8601
+        :param right: False - первая запись со временем >= dt, True - первая запись со временем > dt
+        :return: позиция начала найденной строки (размер файла, если таких записей нет)
+        """
+        dt_iso_str = dt_iso_str[:19]
+        lo, hi = 0, self.size
+        while lo < hi:
+            pos = self.line_start((lo + hi) // 2)
+            end = self.line_end(pos)
+            timestamp = self.timestamp(pos, end)
+            if timestamp is not None and (timestamp <= dt_iso_str if right else timestamp < dt_iso_str):
+                lo = end
+            else:
+                hi = pos
+        return lo
+
+    def lines(self, start: int, end: int, tokens: list = None):
+        """
+        Метод для перебора строк в диапазоне. Если переданы фрагменты, перебираются только строки, содержащие их все:
+        поиск самого длинного фрагмента выполняется прямо по отображенному файлу.
+
+        :param start: начало диапазона
+        :param end: конец диапазона
+        :param tokens: фрагменты, обязательно присутствующие в строке
+        :return: генератор пар (позиция начала строки, строка)
+        """
+        pos = start
+        while pos < end:
+            if tokens:
+                found = self.data.find(tokens[0], pos, end)
+                if found == -1:
+                    return
+                pos = self.line_start(found)
+            line_end = self.line_end(pos)
+            line = self.data[pos:line_end]
+            if not tokens or all(token in line for token in tokens[1:]):
+                yield pos, line
+            pos = line_end
+
+
+class LocalLogSearch:
+    def __init__(self, path_map: dict = None, timestamp_field: str = Config.log_timestamp_field,
+                 use_index: bool = True, index_dir: str = None):
+        """
+        Конструктор класса.
+
+        :param path_map: соответствие путей к логам, используемых LogReader, локальным путям
+        :param timestamp_field: поле с временем записи
+        :param use_index: использовать ли индекс по sphaera_x_operation_id/statementName/id кастомного объекта
+        :param index_dir: каталог для хранения индексов, по умолчанию Config.log_index_dir
+        """
+        self.path_map = path_map or {}
+        self.timestamp_field = timestamp_field
+        self.use_index = use_index
+        self.index_dir = index_dir
+        # индексы файлов логов, ключ - локальный путь
+        self._indexes = {}
+        self._indexes_lock = threading.Lock()
+
+    def resolve(self, file_path: str) -> str:
+        """
+        Метод для получения локального пути к файлу лога.
+
+        :param file_path: путь к файлу лога
+        :return: локальный путь
+        """
+        return self.path_map.get(file_path, file_path)
+
+    def open(self, file_path: str) -> LogFile:
+        return LogFile(self.resolve(file_path), self.timestamp_field)
+
+    def index(self, log_file: LogFile) -> LogIndex:
+        """
+        Метод для получения индекса файла лога, индекс дополняется строками, добавленными с прошлого обращения.
+
+        :param log_file: открытый файл лога
+        :return: объект класса LogIndex
+        """
+        with self._indexes_lock:
+            index = self._indexes.get(log_file.path)
+            if index is None:
+                index = self._indexes[log_file.path] = LogIndex(log_file.path, self.index_dir)
+        index.update(log_file)
+        return index
+
+    def close(self):
+        """
+        Метод для сохранения индексов на диск.
+        """
+        with self._indexes_lock:
+            indexes = list(self._indexes.values())
+        for index in indexes:
+            index.save()
+
+    def iter_find(self, file_path: str, find_dict: dict, start: str = None, end: str = None,
+                  log_count: int = None):
+        """
+        Метод для поиска логов.
+
+        :param file_path: путь к файлу в котором необходимо произвести поиск
+        :param find_dict: словарь с данными, по которым будет произведен поиск
+        :param start: дата-время начала поиска в формате ISO 8601, None - с начала файла
+        :param end: дата-время окончания поиска в формате ISO 8601, None - до конца файла
+        :param log_count: ограничение количества возвращаемых логов
+        :return: генератор найденных логов
+        """
+        if log_count is not None and log_count <= 0:
+            return
+        tokens = search_tokens(find_dict)
+        with self.open(file_path) as log_file:
+            # границы временного окна находим бинарным поиском, просматриваются только строки внутри окна
+            window_start = log_file.bisect(start) if start else 0
+            window_end = log_file.bisect(end, right=True) if end else log_file.size
+            key = index_key(find_dict) if self.use_index else None
+            if key:
+                # читаем только строки, найденные по индексу
+                positions = self.index(log_file).lookup(*key, start=window_start, end=window_end)
+                lines = ((pos, log_file.data[pos:log_file.line_end(pos)]) for pos in positions)
+            else:
+                lines = log_file.lines(window_start, window_end, tokens)
+            found = 0
+            for _, line in lines:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if matches(record, find_dict):
+                    yield record
+                    found += 1
+                    if log_count is not None and found >= log_count:
+                        return
+
+    def find(self, file_path: str, find_dict: dict, start: str = None, end: str = None,
+             log_count: int = None) -> list:
+        """
+        Метод для получения списка найденных логов, см. iter_find.
+        """
+        return list(self.iter_find(file_path, find_dict, start, end, log_count))
+
+    def find_many(self, file_path: str, queries: dict, start: str = None, end: str = None,
+                  log_count: int = None) -> dict:
+        """
+        Метод для поиска логов сразу по многим запросам за один проход по файлу. Запросы, для которых есть индекс,
+        выполняются по индексу, остальные - одним проходом по временному окну: строки-кандидаты находятся
+        одним регулярным выражением из самых длинных фрагментов всех запросов, каждая строка разбирается один раз.
+
+        :param file_path: путь к файлу в котором необходимо произвести поиск
+        :param queries: словарь {название запроса: словарь с данными, по которым будет произведен поиск}
+        :param start: дата-время начала поиска в формате ISO 8601, None - с начала файла
+        :param end: дата-время окончания поиска в формате ISO 8601, None - до конца файла
+        :param log_count: ограничение количества возвращаемых логов для каждого запроса
+        :return: словарь {название запроса: список найденных логов}
+        """
+        results = {name: [] for name in queries}
+        if log_count is not None and log_count <= 0:
+            return results
+        with self.open(file_path) as log_file:
+            window_start = log_file.bisect(start) if start else 0
+            window_end = log_file.bisect(end, right=True) if end else log_file.size
+            # фрагменты запросов, которые ищутся проходом по файлу
+            pending = {}
+            for name, find_dict in queries.items():
+                key = index_key(find_dict) if self.use_index else None
+                if key:
+                    positions = self.index(log_file).lookup(*key, start=window_start, end=window_end)
+                    for pos in positions:
+                        try:
+                            record = json.loads(log_file.data[pos:log_file.line_end(pos)])
+                        except ValueError:
+                            continue
+                        if matches(record, find_dict):
+                            results[name].append(record)
+                            if log_count is not None and len(results[name]) >= log_count:
+                                break
+                else:
+                    pending[name] = search_tokens(find_dict)
+            if pending:
+                self._scan(log_file, window_start, window_end, queries, pending, results, log_count)
+        return results
+
+    @staticmethod
+    def _scan(log_file: LogFile, start: int, end: int, queries: dict, pending: dict, results: dict,
+              log_count: int = None):
+        """
+        Метод для поиска логов по многим запросам за один проход по диапазону файла.
+
+        :param log_file: открытый файл лога
+        :param start: начало диапазона
+        :param end: конец диапазона
+        :param queries: словарь {название запроса: словарь с данными для поиска}
+        :param pending: словарь {название запроса: фрагменты запроса}, выполненные запросы из него удаляются
+        :param results: словарь {название запроса: список найденных логов}, дополняется найденными логами
+        :param log_count: ограничение количества возвращаемых логов для каждого запроса
+        """
+        def compile_pattern():
+            # запрос без фрагментов может совпасть с любой строкой
+            if any(not tokens for tokens in pending.values()):
+                return None
+            anchors = sorted({tokens[0] for tokens in pending.values()}, key=len, reverse=True)
+            return re.compile(b"|".join(re.escape(anchor) for anchor in anchors))
+
+        pattern = compile_pattern()
+        pos = start
+        while pos < end and pending:
+            if pattern is not None:
+                found = pattern.search(log_file.data, pos, end)
+                if found is None:
+                    return
+                pos = log_file.line_start(found.start())
+            line_end = log_file.line_end(pos)
+            line = log_file.data[pos:line_end]
+            record = None
+            for name, tokens in list(pending.items()):
+                if not all(token in line for token in tokens):
+                    continue
+                if record is None:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                if matches(record, queries[name]):
+                    results[name].append(record)
+                    if log_count is not None and len(results[name]) >= log_count:
+                        # запрос выполнен, больше его фрагменты не ищем
+                        del pending[name]
+                        pattern = compile_pattern()
+            pos = line_end
@@ -0,0 +1,200 @@
+"""
+Модуль содержит класс MessageTemplate для быстрого формирования большого количества однотипных сообщений адаптеру
+из шаблона в формате json или xml.
+
+Шаблон разбирается один раз: неизменные части сообщения заранее кодируются в байты, при формировании сообщения
+в них подставляются только значения полей ${имя}. Значения экранируются по месту подстановки: внутри строки json -
+как строка json, вне строки - как значение json (число, true/false, null, объект), в xml - как текст xml.
+
+    template = MessageTemplate('{"sensor_code": "${sensor_code}", "value": ${value}, "timestamp": "${timestamp}"}')
+    report = adapter.r.send_load(template.generate({"sensor_code": code, "value": i, "timestamp": datetime.now()}
+                                                   for i, code in enumerate(sensors)))
+
+:author: Andrei Ursaki.
+"""
+import json
+import re
+from datetime import date, datetime
+
+JSON = "json"
+XML = "xml"
+
+# ${имя} - поле шаблона, $$ - символ $
+_PLACEHOLDER = re.compile(r"\$(?:\{(\w+)\}|\$)")
+_XML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&apos;"})
+
+
+_encode_json_string = json.encoder.encode_basestring
+_encode_json = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _to_text(value) -> str:
+    """
+    Функция для получения текстового представления значения поля.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _json_string_encoder(encoding: str):
+    # значение внутри строки json: экранирование как у строки json без кавычек
+    def encode(value) -> bytes:
+        if value.__class__ is not str:
+            value = _to_text(value)
+        return _encode_json_string(value)[1:-1].encode(encoding)
+
+    return encode
+
+
+def _json_value_encoder(encoding: str):
+    # значение вне строки json: дата-время - строкой, остальное - как значение json
+    def encode(value) -> bytes:
+        cls = value.__class__
+        if cls is int:
+            return str(value).encode(encoding)
+        if cls is str:
+            return _encode_json_string(value).encode(encoding)
+        if isinstance(value, (datetime, date)):
+            return _encode_json_string(value.isoformat()).encode(encoding)
+        return _encode_json(value).encode(encoding)
+
+    return encode
+
+
+def _xml_encoder(encoding: str):
+    # кавычки тоже экранируются, поэтому значение можно подставлять и в текст, и в атрибут
+    def encode(value) -> bytes:
+        return _to_text(value).translate(_XML_ESCAPES).encode(encoding, errors="xmlcharrefreplace")
+
+    return encode
+
+
+def _json_string_positions(template: str) -> set:
+    """
+    Функция для получения позиций шаблона json, находящихся внутри строк.
+
+    :param template: шаблон
+    :return: множество позиций начала полей ${имя}, находящихся внутри строк
+    """
+    starts = {match.start() for match in _PLACEHOLDER.finditer(template)}
+    inside = set()
+    in_string = escaped = False
+    for position, char in enumerate(template):
+        if in_string and position in starts:
+            inside.add(position)
+        if escaped:
+            escaped = False
+        elif char == "\\" and in_string:
+            escaped = True
+        elif char == '"':
+            in_string = not in_string
+    return inside
+
+
+class MessageTemplate:
+    def __init__(self, template: str, kind: str = None, encoding: str = "utf-8"):
+        """
+        Конструктор класса.
+
+        :param template: шаблон сообщения с полями ${имя}, $$ - символ $
+        :param kind: формат шаблона (JSON, XML), по умолчанию определяется по первому символу
+        :param encoding: кодировка сообщений
+        """
+        if kind is None:
+            kind = XML if template.lstrip().startswith("<") else JSON
+        if kind not in (JSON, XML):
+            raise ValueError(f"Неизвестный формат шаблона: {kind}")
+        self.template = template
+        self.kind = kind
+        self.encoding = encoding
+        in_string = _json_string_positions(template) if kind == JSON else set()
+        # части шаблона: (неизменная часть в байтах, имя поля, функция кодирования значения)
+        self._parts = []
+        text, last = [], 0
+        for match in _PLACEHOLDER.finditer(template):
+            text.append(template[last:match.start()])
+            last = match.end()
+            name = match.group(1)
+            if name is None:
+                text.append("$")
+                continue
+            if kind == XML:
+                encoder = _xml_encoder(encoding)
+            elif match.start() in in_string:
+                encoder = _json_string_encoder(encoding)
+            else:
+                encoder = _json_value_encoder(encoding)
+            self._parts.append(("".join(text).encode(encoding), name, encoder))
+            text = []
+        text.append(template[last:])
+        self._tail = "".join(text).encode(encoding)
+        self.fields = tuple(dict.fromkeys(name for _, name, _ in self._parts))
+        # буфер переиспользуется между сообщениями, см. render
+        self._buffer = bytearray()
+
+    def render(self, values: dict = None, **kwargs) -> bytes:
+        """
+        Метод для формирования сообщения. Объект не потокобезопасен: для формирования сообщений в нескольких
+        потоках нужен свой шаблон в каждом потоке (генератор generate можно передавать в LoadGenerator).
+
+        :param values: словарь значений полей
+        :param kwargs: значения полей
+        :return: сообщение в байтах, готовое для отправки (Request.post, Request.send)
+        """
+        if kwargs:
+            values = dict(values, **kwargs) if values else kwargs
+        buffer = self._buffer
+        del buffer[:]
+        try:
+            for segment, name, encode in self._parts:
+                buffer += segment
+                buffer += encode(values[name])
+        except KeyError as e:
+            raise KeyError(f"Не задано значение поля шаблона {e.args[0]}") from None
+        buffer += self._tail
+        return bytes(buffer)
+
+    def generate(self, rows, **values):
+        """
+        Генератор сообщений для нагрузочной отправки (Request.send_load, LoadGenerator).
+
+        :param rows: итерируемый объект со словарями значений полей, меняющихся от сообщения к сообщению
+        :param values: значения полей, одинаковые для всех сообщений
+        :return: генератор сообщений в байтах
+        """
+        template = self.bind(**values) if values else self
+        render = template.render
+        for row in rows:
+            yield render(row)
+
+    def bind(self, **values) -> "MessageTemplate":
+        """
+        Метод для получения шаблона с подставленными значениями части полей: подставленные значения становятся
+        частью заранее закодированных неизменных частей.
+
+        :param values: значения полей
+        :return: новый объект класса MessageTemplate
+        """
+        bound = object.__new__(MessageTemplate)
+        bound.template, bound.kind, bound.encoding = self.template, self.kind, self.encoding
+        bound._parts, pending = [], b""
+        for segment, name, encode in self._parts:
+            if name in values:
+                pending += segment + encode(values[name])
+            else:
+                bound._parts.append((pending + segment, name, encode))
+                pending = b""
+        bound._tail = pending + self._tail
+        bound.fields = tuple(dict.fromkeys(name for _, name, _ in bound._parts))
+        bound._buffer = bytearray()
+        return bound
+
+    def __repr__(self):
+        return f"MessageTemplate({self.kind}, fields={list(self.fields)})"
@@ -0,0 +1,224 @@
+"""
+Модуль содержит плагин pytest с общими на всю сессию тестов объектами basic: пулом HTTP соединений, пулами
+соединений с БД, адаптерами и списками объектов/датчиков, а также распределением объектов/датчиков между
+процессами pytest-xdist.
+
+Подключение - в conftest.py проекта с тестами:
+
+    pytest_plugins = ["basic.pytest_plugin"]
+
+Запуск: pytest --telemetry-system-id 12 --adapter-endpoint http://10.100.122.5:8080/adapter -n auto
+
+Тест с маркером sensor_state и аргументом sensor_code выполняется для каждого объекта/датчика в этом состоянии
+(тесты без маркера и тесты, которые сами параметризуют sensor_code, не меняются). Список объектов/датчиков
+запрашивается из БД один раз и только для используемых состояний: при запуске с pytest-xdist - в главном процессе
+для состояний из --basic-sensor-states, рабочие процессы получают его готовым. Объекты/датчики делятся
+на непрерывные части по числу процессов (маркер xdist_group, для запуска с --dist loadgroup).
+
+    @pytest.mark.sensor_state(SensorStateSnapshot.WITH_OPEN_CARD, limit=100)
+    def test_card(basic_adapter, sensor_code):
+        ...
+
+:author: Andrei Ursaki.
+"""
+import os
+
+import pytest
+
+from basic.basic_adapter import BasicAdapter
+from basic.db_pool import ConnectionPool
+from basic.instrumentation import HistogramSink, instrumentation
+from basic.sensor_state import SensorStateSnapshot
+from basic.sql_helper import SqlHelper
+from basic.transport import Transport
+
+_STATES = (SensorStateSnapshot.ALL, SensorStateSnapshot.WITH_OPEN_CARD, SensorStateSnapshot.WITHOUT_OPEN_CARD)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("basic", "basic: автотесты адаптеров")
+    group.addoption("--telemetry-system-id", type=int, default=None,
+                    help="идентификатор телеметрической системы")
+    group.addoption("--adapter-endpoint", default=None, help="url/endpoint адаптера")
+    group.addoption("--adapter-content-type", default="application/json",
+                    help="тип данных, используемых в сообщениях адаптеру")
+    group.addoption("--basic-timings", action="store_true", default=False,
+                    help="вывести время HTTP запросов, запросов к БД и поиска по логам в конце сессии")
+    group.addoption("--basic-sensor-states", default=",".join(str(state) for state in _STATES),
+                    help="состояния объектов/датчиков (через запятую), списки которых главный процесс pytest-xdist "
+                         "передает рабочим процессам")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "sensor_state(state, limit=None): состояние объектов/датчиков для "
+                                       "параметра sensor_code (см. BasicAdapter.get_sensors) и их количество")
+    if config.getoption("basic_timings"):
+        config._basic_timings = instrumentation.add_sink(HistogramSink())
+
+
+def worker_count() -> int:
+    """
+    Функция для получения количества процессов pytest-xdist.
+
+    :return: количество процессов, 1 - если тесты выполняются без pytest-xdist
+    """
+    return int(os.environ.get("PYTEST_XDIST_WORKER_COUNT", 1))
+
+
+def shard_sensors(sensor_codes, shards: int = None) -> list:
+    """
+    Функция для параметризации тестов объектами/датчиками с распределением по процессам pytest-xdist:
+    объекты/датчики делятся на shards непрерывных частей, каждая часть помечается своей группой xdist_group.
+
+    :param sensor_codes: список кодов объектов/датчиков
+    :param shards: количество частей, по умолчанию - количество процессов pytest-xdist
+    :return: список параметров для pytest.mark.parametrize / metafunc.parametrize
+    """
+    sensor_codes = list(sensor_codes)
+    shards = shards or worker_count()
+    return [pytest.param(sensor_code, id=str(sensor_code),
+                         marks=pytest.mark.xdist_group(f"sensors-{i * shards // len(sensor_codes)}"))
+            for i, sensor_code in enumerate(sensor_codes)]
+
+
+def _load_sensor_lists(config, states=_STATES) -> dict:
+    """
+    Функция для получения списков объектов/датчиков по состояниям. В рабочем процессе pytest-xdist списки берутся
+    из данных, переданных главным процессом, иначе - из БД один раз за сессию, только для запрошенных состояний.
+
+    :param config: конфигурация pytest
+    :param states: состояния объектов/датчиков
+    :return: словарь {состояние: список кодов объектов/датчиков}
+    """
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None and "basic_sensors" in workerinput:
+        sensor_lists = workerinput["basic_sensors"]
+        missing = [state for state in states if state not in sensor_lists]
+        if missing:
+            raise pytest.UsageError(f"состояния {missing} не переданы рабочим процессам, "
+                                    f"добавьте их в --basic-sensor-states")
+        return {state: sensor_lists[state] for state in states}
+    sensor_lists = getattr(config, "_basic_sensors", None)
+    if sensor_lists is None:
+        sensor_lists = config._basic_sensors = {}
+    telemetry_system_id = config.getoption("telemetry_system_id")
+    missing = [state for state in states if state not in sensor_lists]
+    if missing and telemetry_system_id is not None:
+        snapshot = SensorStateSnapshot.for_sql_helper(SqlHelper(telemetry_system_id))
+        for state in missing:
+            sensor_lists[state] = list(snapshot.get(state))
+    return {state: sensor_lists.get(state, []) for state in states}
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    # главный процесс pytest-xdist: списки объектов/датчиков запрашиваются один раз и передаются всем процессам
+    states = [int(state) for state in node.config.getoption("basic_sensor_states").split(",") if state.strip()]
+    node.workerinput["basic_sensors"] = _load_sensor_lists(node.config, states)
+
+
+def _is_parametrized(metafunc, argname: str) -> bool:
+    for marker in metafunc.definition.iter_markers("parametrize"):
+        argnames = marker.args[0] if marker.args else marker.kwargs.get("argnames", ())
+        if isinstance(argnames, str):
+            argnames = [name.strip() for name in argnames.split(",")]
+        if argname in argnames:
+            return True
+    return False
+
+
+def pytest_generate_tests(metafunc):
+    marker = metafunc.definition.get_closest_marker("sensor_state")
+    if marker is None or "sensor_code" not in metafunc.fixturenames or _is_parametrized(metafunc, "sensor_code"):
+        return
+    state = marker.args[0] if marker.args else SensorStateSnapshot.ALL
+    limit = marker.kwargs.get("limit")
+    sensor_codes = _load_sensor_lists(metafunc.config, (state,))[state][:limit]
+    metafunc.parametrize("sensor_code", shard_sensors(sensor_codes))
+
+
+@pytest.fixture(scope="session")
+def telemetry_system_id(pytestconfig) -> int:
+    value = pytestconfig.getoption("telemetry_system_id")
+    if value is None:
+        pytest.skip("не задан параметр --telemetry-system-id")
+    return value
+
+
+@pytest.fixture(scope="session")
+def basic_transport() -> Transport:
+    """
+    Общий на сессию пул HTTP соединений.
+    """
+    transport = Transport.shared()
+    yield transport
+    transport.close()
+
+
+@pytest.fixture(scope="session")
+def basic_db_pools():
+    """
+    Общие на сессию пулы соединений с БД, закрываются в конце сессии.
+    """
+    yield ConnectionPool
+    ConnectionPool.close_all()
+
+
+@pytest.fixture(scope="session")
+def sql_helper(telemetry_system_id, basic_db_pools) -> SqlHelper:
+    return SqlHelper(telemetry_system_id=telemetry_system_id)
+
+
+@pytest.fixture(scope="session")
+def adapter_factory(basic_transport, basic_db_pools):
+    """
+    Фабрика адаптеров: для каждой комбинации параметров адаптер создается один раз за сессию.
+    """
+    adapters = {}
+
+    def factory(telemetry_system_id: int, endpoint: str, content_type: str = "application/json") -> BasicAdapter:
+        key = (telemetry_system_id, endpoint, content_type)
+        if key not in adapters:
+            adapters[key] = BasicAdapter(telemetry_system_id, endpoint, content_type, basic_transport)
+        return adapters[key]
+
+    return factory
+
+
+@pytest.fixture(scope="session")
+def basic_adapter(pytestconfig, telemetry_system_id, adapter_factory) -> BasicAdapter:
+    endpoint = pytestconfig.getoption("adapter_endpoint")
+    if endpoint is None:
+        pytest.skip("не задан параметр --adapter-endpoint")
+    return adapter_factory(telemetry_system_id, endpoint, pytestconfig.getoption("adapter_content_type"))
+
+
+@pytest.fixture(scope="session")
+def sensor_lists(pytestconfig) -> dict:
+    """
+    Списки объектов/датчиков по состояниям на момент начала сессии, см. BasicAdapter.get_sensors.
+    """
+    return _load_sensor_lists(pytestconfig)
+
+
+def pytest_sessionfinish(session):
+    sink = getattr(session.config, "_basic_timings", None)
+    workeroutput = getattr(session.config, "workeroutput", None)
+    if sink is not None and workeroutput is not None:
+        # рабочий процесс pytest-xdist передает замеры главному процессу
+        workeroutput["basic_timings"] = sink.export()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    sink = getattr(node.config, "_basic_timings", None)
+    exported = getattr(node, "workeroutput", {}).get("basic_timings")
+    if sink is not None and exported:
+        sink.merge(exported)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    sink = getattr(config, "_basic_timings", None)
+    if sink is not None and sink.latency and getattr(config, "workerinput", None) is None:
+        terminalreporter.write_sep("=", "basic: время операций")
+        terminalreporter.write_line(sink.report())
@@ -0,0 +1,259 @@
+"""
+Модуль содержит реестр именованных параметризованных запросов SqlHelper (класс Query, функции register и get)
+и класс QueryCache - кэш результатов справочных запросов.
+
+Значения передаются в запросы только параметрами "?", поэтому текст каждого запроса постоянен: SQL Server
+компилирует план один раз, а на соединении из пула запрос подготавливается один раз (см. ConnectionPool.prepared).
+Результаты справочных запросов (t_sensor), которые не меняются во время тестов, кэшируются. Запросы к данным,
+которые меняют адаптеры (значения атрибутов КО, карточки), не кэшируются.
+
+:author: Andrei Ursaki.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from basic import db_config
+
+# БД запроса - атрибут SqlHelper со строкой подключения
+SENSORS = "sensors_conn"
+LAYER_OBJ = "layer_obj_conn"
+OMNIDATA = "omnidata_conn"
+
+
+@lru_cache(maxsize=256)
+def _format(sql: str, values: int = None, top: int = None) -> str:
+    if values is None and top is None:
+        return sql
+    values = values or 0
+    return sql.format(values=",".join("?" * values), top=int(top or 0),
+                      references=" or ".join(["ces.ExternalSystemReference like ?"] * values))
+
+
+class Query:
+    def __init__(self, name: str, database: str, sql: str, cache_ttl: float = None):
+        """
+        Конструктор класса.
+
+        :param name: название запроса
+        :param database: БД запроса (SENSORS, LAYER_OBJ, OMNIDATA)
+        :param sql: запрос с плейсхолдерами "?", {values} - список из нескольких "?" (для in), {top} - количество строк,
+            {references} - условия "ces.ExternalSystemReference like ?" через or
+        :param cache_ttl: время жизни результата в кэше, сек, None - результат не кэшируется
+        """
+        self.name = name
+        self.database = database
+        self.sql = sql
+        self.cache_ttl = cache_ttl
+
+    def statement(self, values: int = None, top: int = None) -> str:
+        """
+        Метод для получения текста запроса. Текст зависит только от количества значений и строк, поэтому
+        повторяется между вызовами.
+
+        :param values: количество плейсхолдеров в {values} и условий в {references}
+        :param top: количество строк в {top}
+        :return: запрос
+        """
+        return _format(self.sql, values, top)
+
+    def __repr__(self):
+        return f"Query({self.name})"
+
+
+_registry = {}
+
+
+def register(name: str, database: str, sql: str, cache_ttl: float = None) -> Query:
+    """
+    Функция для добавления запроса в реестр.
+
+    :param name: название запроса
+    :param database: БД запроса (SENSORS, LAYER_OBJ, OMNIDATA)
+    :param sql: запрос, см. Query
+    :param cache_ttl: время жизни результата в кэше, сек, None - результат не кэшируется
+    :return: объект класса Query
+    """
+    if name in _registry:
+        raise ValueError(f"Запрос {name} уже зарегистрирован")
+    query = _registry[name] = Query(name, database, sql, cache_ttl)
+    return query
+
+
+def get(name: str) -> Query:
+    """
+    Функция для получения запроса из реестра.
+
+    :param name: название запроса
+    :return: объект класса Query
+    """
+    try:
+        return _registry[name]
+    except KeyError:
+        raise KeyError(f"Неизвестный запрос {name}") from None
+
+
+class QueryCache:
+    def __init__(self, size: int = db_config.query_cache_size):
+        """
+        Конструктор класса. Кэш результатов запросов с вытеснением по времени жизни и давно не используемых
+        результатов (LRU).
+
+        :param size: максимальное количество результатов в кэше
+        """
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        # {ключ: (время устаревания, результат)}, от давно использованных к недавно использованным
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Метод для получения результата из кэша.
+
+        :param key: ключ (название запроса, строка подключения, параметры)
+        :return: результат или None, если его нет в кэше или он устарел
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value, ttl: float):
+        """
+        Метод для добавления результата в кэш.
+
+        :param key: ключ (название запроса, строка подключения, параметры)
+        :param value: результат
+        :param ttl: время жизни результата, сек
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, name: str = None):
+        """
+        Метод для удаления результатов из кэша.
+
+        :param name: название запроса, если не передано - кэш очищается полностью
+        """
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == name]:
+                    del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# общий кэш результатов справочных запросов
+query_cache = QueryCache()
+
+register("all_sensor_codes", SENSORS, """SELECT sensor_code
+                    FROM [SphaeraTelemetryReference02].[dbo].[t_sensor]
+                    where telemetry_system_id = ? and sensor_code != 'SensorCodeDefault'
+                    and removed_dt is NULL """, cache_ttl=db_config.query_cache_ttl)
+
+register("sensor_attributes", LAYER_OBJ, """SELECT t_s.sensor_code, a.Code,av.Value,
+                    t_s.layerobject_caption as caption,t_s.address as t_address, t_s.location_lat, t_s.location_long,
+                    t_s.call_center_id,t_s.case_type_area,e.id,t_s.municipality_name
+                    FROM [LayerObjectRostov].[dbo].[Element] e
+                    join ElementType et on e.ElementTypeId = et.Id
+                    join ElementTypeAttribute eta on eta.ElementTypeId = et.id
+                    join Attribute a on a.Id = eta.AttributeId
+                    join AttributeValue av on e.id = av.ElementId  and av.AttributeId = a.Id
+                    join [SphaeraTelemetryReference02].[dbo].[t_sensor] t_s on t_s.layerobject_id = e.Id
+                    where t_s.telemetry_system_id = ? and t_s.sensor_code in ({values})
+                    order by t_s.sensor_code""")
+
+register("card_references", OMNIDATA, """select distinct ExternalSystemReference from [cse_CaseExternalSystemReference_tab]
+                    where ExternalSystemReference like ?""")
+
+register("sensors_with_card", OMNIDATA, """select distinct ces.ExternalSystemReference
+                   from [OmniData].[dbo].[cse_CaseExternalSystemReference_tab] ces
+                   join [OmniData].[dbo].[cse_Case_tab] cf on cf.CallCenterId = ces.CallCenterId
+                   and cf.CaseFolderId = ces.CaseFolderId
+                   where ({references})""")
+
+register("sensors_with_card_created_after", OMNIDATA, """select distinct ces.ExternalSystemReference
+                   from [OmniData].[dbo].[cse_CaseExternalSystemReference_tab] ces
+                   join [OmniData].[dbo].[cse_Case_tab] cf on cf.CallCenterId = ces.CallCenterId
+                   and cf.CaseFolderId = ces.CaseFolderId
+                   where ({references}) and cf.Created >= ?""")
+
+register("sensors_with_notification", OMNIDATA, """select distinct ces.ExternalSystemReference
+                   from [OmniData].[dbo].[cse_CaseExternalSystemReference_tab] ces
+                   where ({references})
+                   and exists (select 1 from [OmniData].[dbo].[cse_TimeActivatedCase_tab] tac
+                               where tac.CallCenterId = ces.CallCenterId and tac.CaseFolderId = ces.CaseFolderId)""")
+
+register("cards_data", OMNIDATA, """SELECT cf.MunicipalityName, ces.CallCenterId, ces.CaseFolderId, ces.CaseId, cf.CaseTypeId,
+                    ces.ExternalSystemName, ces.ExternalSystemReference, cf.Created as CardCreated,
+                    cf.XCoordinate,cf.YCoordinate,cf.CaseIndex1,cf.CaseIndex2,cf.CaseIndex3,cf.CaseIndex1Name,cf.CaseIndex2Name,cf.CaseIndex3Name,
+                    cf.CaseIndexComment,cf.RouteDirections
+                    FROM [OmniData].[dbo].[cse_Case_tab] cf
+                    join [OmniData].[dbo].[cse_CaseExternalSystemReference_tab] ces on cf.CallCenterId = ces.CallCenterId
+                    and cf.CaseFolderId = ces.CaseFolderId
+                    where ({references})
+                    and exists (select 1 from [OmniData].[dbo].[geo_Municipality_tab] mun
+                                where mun.CallCenterId = ces.CallCenterId)
+                    order by cf.Created desc""")
+
+register("cards_notices", OMNIDATA, """select n.CallCenterId, n.CaseFolderId,
+                    n.OrderNo, n.CaseNoteTypeId, n.ImportanceId, n.Created, n.Creator, n.Canceled, n.CaseId, n.NoteText
+                    from [OmniData].[dbo].[cse_Note_tab] n
+                    where exists (select 1 from [OmniData].[dbo].[cse_CaseExternalSystemReference_tab] ces
+                                  where ces.CallCenterId = n.CallCenterId and ces.CaseFolderId = n.CaseFolderId
+                                  and ({references}))
+                    order by n.CallCenterId, n.CaseFolderId, n.OrderNo""")
+
+register("card_notices", OMNIDATA, """select OrderNo, CaseNoteTypeId, ImportanceId, Created, Creator, Canceled, CaseId, NoteText
+                    from [OmniData].[dbo].[cse_Note_tab]
+                    where CallCenterId = ? and CaseFolderId = ?
+                    order by OrderNo""")
+
+register("delete_notify", OMNIDATA, """delete tac from [OmniData].[dbo].[cse_TimeActivatedCase_tab] tac
+                   join #cards c on tac.CallCenterId = c.CallCenterId and tac.CaseFolderId = c.CaseFolderId
+                   and tac.CaseId = c.CaseId""")
+
+register("change_index_to_test", OMNIDATA, """update cf set CaseIndex1=64,CaseIndex2=NULL,CaseIndex3=NULL,
+                   CaseIndex1Name='Тестирование Системы',CaseIndex2Name=NULL,CaseIndex3Name=NULL
+                   from [OmniData].[dbo].[cse_Case_tab] cf
+                   join #cards c on cf.CallCenterId = c.CallCenterId and cf.CaseFolderId = c.CaseFolderId
+                   and cf.CaseId = c.CaseId""")
+
+register("cards_for_close", OMNIDATA, """
+            SELECT ces.CallCenterId, cf.CaseFolderId, cf.CaseId,cf.CaseTypeId
+      FROM [OmniData].[dbo].[cse_Case_tab] cf
+      join [OmniData].[dbo].[cse_CaseExternalSystemReference_tab] ces on cf.CallCenterId = ces.CallCenterId and cf.CaseFolderId = ces.CaseFolderId
+      where ces.ExternalSystemReference like ?
+      order by cf.Created desc
+      """)
+
+register("cards_for_close_page", OMNIDATA, """select distinct top {top} cf.CallCenterId, cf.CaseFolderId, cf.CaseId, cf.CaseTypeId
+                    from [OmniData].[dbo].[cse_Case_tab] cf
+                    join [OmniData].[dbo].[cse_CaseExternalSystemReference_tab] ces
+                    on cf.CallCenterId = ces.CallCenterId and cf.CaseFolderId = ces.CaseFolderId
+                    where ces.ExternalSystemReference like ?
+                    and (cf.CallCenterId > ? or cf.CallCenterId = ? and (cf.CaseFolderId > ?
+                         or cf.CaseFolderId = ? and cf.CaseId > ?))
+                    order by cf.CallCenterId, cf.CaseFolderId, cf.CaseId""")
+
+register("server_time", OMNIDATA, "select getdate()")
+
+register("notification_in_card", OMNIDATA, """select top 1 1 from [OmniData].[dbo].[cse_CaseExternalSystemReference_tab] ces
+                    join [OmniData].[dbo].[cse_TimeActivatedCase_tab] tac on ces.CallCenterId = tac.CallCenterId
+                    and ces.CaseFolderId = tac.CaseFolderId
+                    where ces.ExternalSystemReference like ?""")
@@ -1,52 +1,152 @@
 import json
+import logging
 import time
-from datetime import datetime
 
-import requests
+from basic.load_generator import LoadGenerator
+from basic.transport import Transport
+
+logger = logging.getLogger(__name__)
+
+
+def encode_message(input_msg) -> bytes:
+    """
+    Функция для получения тела запроса: строка кодируется в utf-8, готовые байты (например, из MessageTemplate)
+    отправляются как есть.
+
+    :param input_msg: сообщение (str или bytes)
+    :return: тело запроса
+    """
+    if isinstance(input_msg, (bytes, bytearray)):
+        return input_msg
+    return input_msg.encode('utf-8')
+
+
+def message_text(input_msg) -> str:
+    """
+    Функция для получения текста сообщения для печати/вывода: строка возвращается как есть, байты декодируются.
+
+    :param input_msg: сообщение (str или bytes)
+    :return: текст сообщения
+    """
+    if isinstance(input_msg, str):
+        return input_msg
+    return bytes(input_msg).decode('utf-8', 'replace')
+
+
+def request_headers(content_type, headers=None) -> dict:
+    """
+    Функция для получения заголовков запроса к адаптеру.
+
+    :param content_type: тип данных, используемых в сообщении
+    :param headers: дополнительные заголовки для запроса
+    :return: словарь заголовков
+    """
+    result = {"Content-Type": f"{content_type}; charset=utf-8"}
+    if headers:
+        result.update(headers)
+    return result
+
+
+def print_response(input_msg, response, print_msg=False):
+    """
+    Функция для вывода отправленного сообщения и ответа сервера (Request.send, AsyncRequest.send).
+
+    :param input_msg: сообщение (str или bytes)
+    :param response: ответ сервера (requests.Response или AsyncResponse)
+    :param print_msg: выводить ли сообщение
+    """
+    if print_msg:
+        if isinstance(input_msg, bytes):
+            input_msg = input_msg.decode('utf-8')
+        try:
+            input_msg = json.loads(input_msg)
+        except json.decoder.JSONDecodeError:
+            input_msg = input_msg
+        print(json.dumps(input_msg, indent=4, ensure_ascii=False))
+    if response.status_code != 200:
+        print(response.status_code)
+    if response.content:
+        print(response.content.decode('utf-8'))
+
+
+def with_delays(msgs, delay):
+    """
+    Генератор сообщений для send_requests_with_delay.
+
+    :param msgs: сообщения
+    :param delay: пауза между сообщениями, сек
+    :return: генератор кортежей (пауза перед отправкой сообщения, сообщение), перед первым сообщением паузы нет
+    """
+    for i, msg in enumerate(msgs):
+        yield (delay if i else 0), msg
 
 
 class Request:
 
-    def __init__(self, endpoint, content_type):
+    def __init__(self, endpoint, content_type, transport: Transport = None):
         self.endpoint = endpoint
         self.content_type = content_type
+        # если транспорт не передан, используется общий пул соединений процесса
+        self.transport = transport or Transport.shared()
 
     @staticmethod
-    def send_request(input_msg, endpoint, content_type, print_msg=False, headers=None):
-        msg = input_msg.encode('utf-8')
-        session = requests.session()
-        session.headers = {"Content-Type": f"{content_type}; charset=utf-8"}
-        session.headers.update({"Content-Length": str(len(msg))})
-        if headers:
-            session.headers.update(headers)
-        response = session.post(url=endpoint, data=msg, verify=False)
-        print("\n", datetime.now(), f'Message sent to {endpoint}')
+    def send_request(input_msg, endpoint, content_type, print_msg=False, headers=None, transport=None):
+        msg = encode_message(input_msg)
+        transport = transport or Transport.shared()
+        response = transport.post(endpoint, msg, headers=request_headers(content_type, headers), verify=False)
+        logger.debug("Message sent to %s", endpoint)
         if print_msg:
-            print(input_msg)
+            print(message_text(input_msg))
         return response.text
 
+    def post(self, input_msg, header=None):
+        """
+        Метод для отправки сообщения адаптеру без печати/вывода.
+
+        :param input_msg: сообщение (str или bytes, например из MessageTemplate)
+        :param header: дополнительные заголовки для запроса
+        :return: ответ сервера
+        """
+        return self.transport.post(self.endpoint, encode_message(input_msg),
+                                   headers=request_headers(self.content_type, header))
+
     def send(self, input_msg, print_msg=False, header=None):
-        msg = input_msg.encode('utf-8')
-        session = requests.session()
-        session.headers = {"Content-Type": f"{self.content_type}; charset=utf-8"}
-        session.headers.update({"Content-Length": str(len(msg))})
-        if header:
-            session.headers.update(header)
-        response = session.post(url=self.endpoint, data=msg)
-        print("\n", datetime.now(), f'Message sent to {self.endpoint}')
-        if print_msg:
-            try:
-                input_msg = json.loads(input_msg)
-            except json.decoder.JSONDecodeError:
-                input_msg = input_msg
-            print(json.dumps(input_msg, indent=4, ensure_ascii=False))
-        if response.status_code != 200:
-            print(response.status_code)
-        if response.content:
-            print(response.content.decode('utf-8'))
+        response = self.post(input_msg, header)
+        logger.debug("Message sent to %s", self.endpoint)
+        print_response(input_msg, response, print_msg)
 
     def send_requests_with_delay(self, msgs, delay=30, print_msg=False):
-        for msg in msgs:
+        for pause, msg in with_delays(msgs, delay):
+            if pause:
+                time.sleep(pause)
             self.send(msg, print_msg=print_msg)
-            if msgs.index(msg) != len(msgs) - 1:
-                time.sleep(delay)
+
+    def send_load(self, msgs, rate=None, concurrency=10, ramp_up=None, duration=None):
+        """
+        Метод для нагрузочной отправки сообщений, см. класс LoadGenerator.
+
+        :param msgs: итерируемый объект или генератор сообщений (например, MessageTemplate.generate)
+        :param rate: целевая частота отправки, сообщений в секунду (None - отправка с фиксированной конкурентностью)
+        :param concurrency: количество одновременно отправляемых сообщений
+        :param ramp_up: профиль разгона - список этапов (длительность в секундах, частота в конце этапа)
+        :param duration: максимальная длительность нагрузки, сек
+        :return: отчет нагрузки с задержками p50/p95/p99, ошибками по кодам ответа и пропускной способностью
+        """
+        if concurrency <= self.transport.pool_size:
+            return LoadGenerator(self, rate=rate, concurrency=concurrency, ramp_up=ramp_up).run(msgs, duration)
+        # пул соединений транспорта меньше конкурентности, для нагрузки нужен свой транспорт
+        with Request(self.endpoint, self.content_type, Transport(pool_size=concurrency)) as request:
+            return LoadGenerator(request, rate=rate, concurrency=concurrency, ramp_up=ramp_up).run(msgs, duration)
+
+    def close(self):
+        """
+        Метод для закрытия соединений транспорта, если он не общий.
+        """
+        if not self.transport.is_shared:
+            self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
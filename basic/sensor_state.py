@@ -0,0 +1,98 @@
+"""
+Модуль содержит класс SensorStateSnapshot - снимок состояний объектов/датчиков телеметрической системы.
+
+:author: Andrei Ursaki.
+"""
+import threading
+import time
+
+from basic.config import Config
+
+
+class SensorStateSnapshot:
+    # состояния объектов/датчиков, см. BasicAdapter.get_sensors
+    ALL = 0
+    WITH_OPEN_CARD = 1
+    WITHOUT_OPEN_CARD = 2
+    # общие снимки, ключ - телеметрическая система и строки подключения к БД
+    _snapshots = {}
+    _snapshots_lock = threading.Lock()
+
+    def __init__(self, sql_helper, ttl: float):
+        """
+        Конструктор класса. Данные из БД загружаются при первом обращении и только те, что нужны для состояния.
+
+        :param sql_helper: объект класса SqlHelper
+        :param ttl: время жизни снимка, сек
+        """
+        self.sql_helper = sql_helper
+        self.expires_at = time.monotonic() + ttl
+        self._sensors = None
+        self._sensors_with_open_card = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(sql_helper) -> tuple:
+        return sql_helper.telemetry_system_id, sql_helper.sensors_conn, sql_helper.omnidata_conn
+
+    @classmethod
+    def for_sql_helper(cls, sql_helper, ttl: float = Config.sensor_state_ttl) -> "SensorStateSnapshot":
+        """
+        Метод для получения общего снимка для телеметрической системы. Снимок пересоздается по истечении ttl.
+
+        :param sql_helper: объект класса SqlHelper
+        :param ttl: время жизни снимка, сек
+        :return: объект класса SensorStateSnapshot
+        """
+        key = cls._key(sql_helper)
+        with cls._snapshots_lock:
+            snapshot = cls._snapshots.get(key)
+            if snapshot is None or snapshot.expired:
+                snapshot = cls._snapshots[key] = cls(sql_helper, ttl)
+            return snapshot
+
+    @classmethod
+    def invalidate(cls, sql_helper=None):
+        """
+        Метод для сброса снимка, например после открытия или закрытия карточек.
+
+        :param sql_helper: объект класса SqlHelper, если не передан - сбрасываются снимки всех систем
+        """
+        with cls._snapshots_lock:
+            if sql_helper is None:
+                cls._snapshots.clear()
+            else:
+                cls._snapshots.pop(cls._key(sql_helper), None)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def _load_sensors(self):
+        with self._lock:
+            if self._sensors is None:
+                # порядок объектов сохраняем как в t_sensor
+                self._sensors = tuple(self.sql_helper.get_all_sensor_codes())
+
+    def _load_sensors_with_open_card(self):
+        with self._lock:
+            if self._sensors_with_open_card is None:
+                self._sensors_with_open_card = frozenset(self.sql_helper.get_all_sensors_with_open_card())
+
+    def get(self, state: int) -> list:
+        """
+        Метод для получения списка объектов/датчиков в выбранном состоянии.
+
+        :param state: необходимое состояние объектов/датчиков (0 - датчики из t_sensor, 1 - с открытыми карточками, 2 - без открытых карточек)
+        :return: список объектов/датчиков
+        """
+        if state == self.ALL:
+            self._load_sensors()
+            return list(self._sensors)
+        elif state == self.WITH_OPEN_CARD:
+            self._load_sensors_with_open_card()
+            return list(self._sensors_with_open_card)
+        elif state == self.WITHOUT_OPEN_CARD:
+            self._load_sensors()
+            self._load_sensors_with_open_card()
+            return [sensor for sensor in self._sensors if sensor not in self._sensors_with_open_card]
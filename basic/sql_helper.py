@@ -3,11 +3,11 @@
 
 :author: Andrei Ursaki.
 """
-import re
-
-import pyodbc
-
-from basic import db_config
+from basic import db_config, queries
+from basic.batch_mutation import BatchMutation
+from basic.db_pool import ConnectionPool, QueryResult, statement_name
+from basic.instrumentation import instrumentation
+from basic.queries import query_cache
 
 
 class SqlHelper(object):
@@ -24,21 +24,71 @@ class SqlHelper(object):
         self.omnidata_conn = omnidata_conn
 
     @staticmethod
-    def execute_query(conn_str, query, is_commit_needed=False):
+    def pool(conn_str) -> ConnectionPool:
+        """
+        Метод для получения пула соединений. Пул общий для всех объектов, работающих с одной БД.
+
+        :param conn_str: строка с параметрами подключения к БД
+        :return: объект класса ConnectionPool
+        """
+        return ConnectionPool.for_connection(conn_str)
+
+    @staticmethod
+    def execute_query(conn_str, query, is_commit_needed=False, params=()):
         """
         Метод отвечающий за выполнение запроса к БД.
 
         :param conn_str: строка с параметрами подключения к БД
         :param query: запрос
         :param is_commit_needed: параметр необходимый в случае типа запроса "insert" или "delete", по умолчанию False
-        :return:
+        :param params: значения параметров запроса (плейсхолдеры "?")
+        :return: результат запроса, строки уже получены из БД, соединение возвращено в пул
+        """
+        with instrumentation.span("sql", statement_name(query)) as attrs:
+            with SqlHelper.pool(conn_str).cursor(commit=is_commit_needed) as cursor:
+                cursor.execute(query, params)
+                result = QueryResult(cursor)
+            attrs["rows"] = len(result)
+        return result
+
+    def fetch(self, name, *params, values=None, top=None):
         """
-        conn = pyodbc.connect(conn_str)
-        cursor = conn.cursor()
-        cursor.execute(query)
-        if is_commit_needed:
-            conn.commit()
-        return cursor
+        Метод для выполнения запроса из реестра (см. basic/queries.py). Запрос выполняется подготовленным курсором
+        соединения из пула, результат справочного запроса берется из кэша, пока не истечет время его жизни.
+
+        :param name: название запроса
+        :param params: значения параметров запроса (плейсхолдеры "?")
+        :param values: количество плейсхолдеров в {values} запроса
+        :param top: количество строк в {top} запроса
+        :return: результат запроса, строки уже получены из БД, соединение возвращено в пул
+        """
+        query = queries.get(name)
+        conn_str = getattr(self, query.database)
+        key = None
+        if query.cache_ttl:
+            key = (name, conn_str, values, top, params)
+            cached = query_cache.get(key)
+            if cached is not None:
+                return cached.copy()
+        statement = query.statement(values, top)
+        with instrumentation.span("sql", name) as attrs:
+            with self.pool(conn_str).prepared(statement) as cursor:
+                cursor.execute(statement, params)
+                result = QueryResult(cursor)
+            attrs["rows"] = len(result)
+        if key is not None:
+            query_cache.put(key, result, query.cache_ttl)
+            return result.copy()
+        return result
+
+    @staticmethod
+    def invalidate_cache(name=None):
+        """
+        Метод для удаления результатов справочных запросов из кэша, например после изменения t_sensor.
+
+        :param name: название запроса, если не передано - кэш очищается полностью
+        """
+        query_cache.invalidate(name)
 
     def get_all_sensor_codes(self):
         """
@@ -47,12 +97,7 @@ class SqlHelper(object):
         :return: список идентификаторов объектов
         """
         sensor_code_list = []
-        query = f"""SELECT sensor_code      
-                    FROM [SphaeraTelemetryReference02].[dbo].[t_sensor]
-                    where telemetry_system_id = {self.telemetry_system_id} and sensor_code != 'SensorCodeDefault' 
-                    and removed_dt is NULL """
-        # print(query)
-        cursor = self.execute_query(self.sensors_conn, query)
+        cursor = self.fetch("all_sensor_codes", self.telemetry_system_id)
         for row in cursor.fetchall():
             sensor_code_list.append(row[0])
         return sensor_code_list
@@ -63,131 +108,305 @@ class SqlHelper(object):
 
         :return: список идентификаторов объектов
         """
-        sensor_code_list = []
-        query = f"""select ExternalSystemReference from [cse_CaseExternalSystemReference_tab]
-                    where ExternalSystemReference like '{self.telemetry_system_id}-%'"""
-        cursor = self.execute_query(self.omnidata_conn, query)
+        sensor_codes = set()
+        cursor = self.fetch("card_references", f"{self.telemetry_system_id}-%")
         for row in cursor.fetchall():
-            sensor_code = re.findall(r"<[^{}]+>", row[0])[0][1:-1]
-            sensor_code_list.append(sensor_code)
-        return list(set(sensor_code_list))
+            sensor_code = self._sensor_code_from_reference(row[0])
+            if sensor_code is not None:
+                sensor_codes.add(sensor_code)
+        return list(sensor_codes)
+
+    @staticmethod
+    def _sensor_code_from_reference(reference):
+        """
+        Метод для получения идентификатора объекта из ExternalSystemReference карточки вида '<id системы>-<<код>>...'.
+
+        :param reference: ExternalSystemReference карточки
+        :return: идентификатор объекта или None
+        """
+        start = reference.find('<')
+        end = reference.find('>', start + 1)
+        if start == -1 or end == -1:
+            return None
+        return reference[start + 1:end]
 
     def get_sensor_attributes(self, sensor_code):
         """
         Метод для получения атрибутов КО.
 
+        :param sensor_code: идентификатор объекта
+        :return: словарь атрибутов КО
+        """
+        cursor = self.fetch("sensor_attributes", self.telemetry_system_id, sensor_code, values=1)
+        data = [row[1:] for row in cursor.fetchall()]
+        if not data:
+            return {}
+        # первый столбец - идентификатор объекта, в словарь атрибутов он не попадает
+        columns = [column[0] for column in cursor.description][1:]
+        return self._build_sensor_attributes(columns, data, sensor_code)
+
+    @staticmethod
+    def _build_sensor_attributes(columns, data, sensor_code):
+        """
+        Метод для составления словаря атрибутов КО из строк запроса.
+
+        :param columns: названия столбцов запроса без столбца с идентификатором объекта
+        :param data: строки запроса для одного объекта, без столбца с идентификатором объекта
         :param sensor_code: идентификатор объекта
         :return: словарь атрибутов КО
         """
         sensor_attribute_dict = {}
-        query = f"""SELECT TOP 1000  a.Code,av.Value,
-                    t_s.layerobject_caption as caption,t_s.address as t_address, t_s.location_lat, t_s.location_long,
-                    t_s.call_center_id,t_s.case_type_area,e.id,t_s.municipality_name
-                    FROM [LayerObjectRostov].[dbo].[Element] e
-                    join ElementType et on e.ElementTypeId = et.Id 
-                    join ElementTypeAttribute eta on eta.ElementTypeId = et.id
-                    join Attribute a on a.Id = eta.AttributeId 
-                    join AttributeValue av on e.id = av.ElementId  and av.AttributeId = a.Id
-                    join [SphaeraTelemetryReference02].[dbo].[t_sensor] t_s on t_s.layerobject_id = e.Id
-                    where t_s.sensor_code = '{sensor_code}' and t_s.telemetry_system_id = {self.telemetry_system_id}"""
-        cursor = self.execute_query(self.layer_obj_conn, query)
-        columns = [column[0] for column in cursor.description]
-        data = cursor.fetchall()
-        if data:
-            for i in list(range(2, len(columns))):
-                # с 3 столбца начинаются атрибуты, которых нет в КО
-                if data[0][i]:
-                    sensor_attribute_dict[columns[i]] = data[0][i]
-                    # добавляем атрибуты из БД справочников в словарь
-            for row in data:
-                if row[1]:
-                    sensor_attribute_dict[row[0]] = row[1]
-                    # добавляем атрибуты КО в словарь
-            sensor_attribute_dict['sensor_code'] = sensor_code
+        for i in list(range(2, len(columns))):
+            # с 3 столбца начинаются атрибуты, которых нет в КО
+            if data[0][i]:
+                sensor_attribute_dict[columns[i]] = data[0][i]
+                # добавляем атрибуты из БД справочников в словарь
+        for row in data:
+            if row[1]:
+                sensor_attribute_dict[row[0]] = row[1]
+                # добавляем атрибуты КО в словарь
+        sensor_attribute_dict['sensor_code'] = sensor_code
         return sensor_attribute_dict
 
+    def iter_sensor_attributes(self, sensor_codes, chunk_size=db_config.query_chunk_size,
+                               fetch_size=db_config.fetch_size):
+        """
+        Метод для потокового получения атрибутов КО для многих объектов.
+        Идентификаторы отправляются в запрос порциями, строки читаются из курсора частями, словарь атрибутов
+        объекта возвращается, как только прочитаны все его строки.
+
+        :param sensor_codes: список идентификаторов объектов
+        :param chunk_size: количество идентификаторов в одном запросе
+        :param fetch_size: количество строк, получаемых из курсора за один раз
+        :return: генератор словарей атрибутов КО, объекты без атрибутов пропускаются
+        """
+        # убираем повторы, сохраняя порядок
+        sensor_codes = list(dict.fromkeys(sensor_codes))
+        for i in range(0, len(sensor_codes), chunk_size):
+            chunk = sensor_codes[i:i + chunk_size]
+            query = queries.get("sensor_attributes").statement(values=len(chunk))
+            with self.pool(self.layer_obj_conn).prepared(query) as cursor:
+                # замер охватывает чтение всех строк порции (и обработку объектов между ними), количество строк
+                # записывается и при досрочном закрытии генератора
+                with instrumentation.span("sql", "sensor_attributes", sensors=len(chunk)) as attrs:
+                    cursor.execute(query, [self.telemetry_system_id] + chunk)
+                    # первый столбец - идентификатор объекта, в словарь атрибутов он не попадает
+                    columns = [column[0] for column in cursor.description][1:]
+                    sensor_code, data, fetched = None, [], 0
+                    try:
+                        rows = cursor.fetchmany(fetch_size)
+                        while rows:
+                            fetched += len(rows)
+                            for row in rows:
+                                if row[0] != sensor_code:
+                                    if data:
+                                        yield self._build_sensor_attributes(columns, data, sensor_code)
+                                    sensor_code, data = row[0], []
+                                data.append(row[1:])
+                            rows = cursor.fetchmany(fetch_size)
+                    finally:
+                        attrs["rows"] = fetched
+                    if data:
+                        yield self._build_sensor_attributes(columns, data, sensor_code)
+
     def get_card_data(self, sensor_code):
         """
-        Метод для получения информации из карточки.
+        Метод для получения информации из карточки. Как и раньше, возвращается самая старая карточка объекта
+        (существующие тесты рассчитаны на это), последняя созданная карточка - первый элемент get_cards_data,
+        ее проверяет CardVerifier.
 
         :param sensor_code: идентификатор объекта
         :return: словарь атрибутов карточки
         """
-        query = f"""SELECT TOP 1000 cf.MunicipalityName, ces.CallCenterId, ces.CaseFolderId, ces.CaseId, cf.CaseTypeId, 
-                    ces.ExternalSystemName, ces.ExternalSystemReference, cf.Created as CardCreated,
-                    cf.XCoordinate,cf.YCoordinate,cf.CaseIndex1,cf.CaseIndex2,cf.CaseIndex3,cf.CaseIndex1Name,cf.CaseIndex2Name,cf.CaseIndex3Name,
-                    cf.CaseIndexComment,cf.RouteDirections
-                    FROM [OmniData].[dbo].[cse_Case_tab] cf
-                    join [OmniData].[dbo].[cse_CaseExternalSystemReference_tab] ces on cf.CallCenterId = ces.CallCenterId 
-                    and cf.CaseFolderId = ces.CaseFolderId                
-                    join [OmniData].[dbo].[geo_Municipality_tab] mun on mun.CallCenterId = ces.CallCenterId
-                    where ces.ExternalSystemReference like '{self.telemetry_system_id}-<{sensor_code}>%'
-                    order by cf.Created desc"""
-        # print(query)
-        cursor = self.execute_query(self.omnidata_conn, query)
-        columns = [column[0] for column in cursor.description]
-        results = {}
-        for row in cursor.fetchall():
-            card_dict = dict(zip(columns, row))
-            card_dict['Notices'] = self.get_card_notices(card_dict.get('CallCenterId'), card_dict.get('CaseFolderId'))
-            results.update(card_dict)
+        cards = self.get_cards_data([sensor_code]).get(sensor_code)
+        # карточки отсортированы по дате создания от новых к старым
+        return cards[-1] if cards else {}
+
+    @staticmethod
+    def _match_reference(reference, prefix, sensor_codes):
+        """
+        Метод для определения объекта по ExternalSystemReference карточки, аналог условия like '<prefix><code>>%'.
+
+        :param reference: ExternalSystemReference карточки
+        :param prefix: начало ExternalSystemReference, вида '<telemetry_system_id>-<'
+        :param sensor_codes: множество искомых идентификаторов объектов
+        :return: идентификатор объекта или None, если карточка не относится к искомым объектам
+        """
+        if not reference.startswith(prefix):
+            return None
+        end = reference.find('>', len(prefix))
+        while end != -1:
+            sensor_code = reference[len(prefix):end]
+            if sensor_code in sensor_codes:
+                return sensor_code
+            end = reference.find('>', end + 1)
+        return None
+
+    def _reference_chunks(self, sensor_codes, chunk_size=db_config.reference_chunk_size):
+        """
+        Метод для получения шаблонов ExternalSystemReference для поиска карточек объектов порциями.
+        Порция дополняется повтором последнего шаблона до степени двойки, чтобы текст запроса (и план SQL Server)
+        повторялся при разном количестве объектов.
+
+        :param sensor_codes: множество идентификаторов объектов
+        :param chunk_size: количество объектов в одном запросе
+        :return: кортеж (начало ExternalSystemReference до кода объекта, генератор кортежей шаблонов для like)
+        """
+        prefix = f"{self.telemetry_system_id}-<"
+        patterns = [f"{prefix}{sensor_code}>%" for sensor_code in sorted(sensor_codes)]
+
+        def chunks():
+            for i in range(0, len(patterns), chunk_size):
+                chunk = patterns[i:i + chunk_size]
+                size = min(1 << (len(chunk) - 1).bit_length(), chunk_size)
+                yield tuple(chunk + chunk[-1:] * (size - len(chunk)))
+
+        return prefix, chunks()
+
+    def _match_references(self, name, sensor_codes, params=()):
+        """
+        Метод для выполнения запроса, возвращающего ExternalSystemReference карточек, и отбора объектов.
+
+        :param name: название запроса, первые параметры - шаблоны ExternalSystemReference ({references})
+        :param sensor_codes: список идентификаторов объектов
+        :param params: остальные параметры запроса
+        :return: множество идентификаторов объектов, для которых найдены карточки
+        """
+        sensor_codes = set(sensor_codes)
+        prefix, chunks = self._reference_chunks(sensor_codes)
+        found = set()
+        for patterns in chunks:
+            cursor = self.fetch(name, *patterns, *params, values=len(patterns))
+            for row in cursor.fetchall():
+                sensor_code = self._match_reference(row[0], prefix, sensor_codes)
+                if sensor_code is not None:
+                    found.add(sensor_code)
+        return found
+
+    def get_server_time(self):
+        """
+        Метод для получения текущего времени сервера БД OmniData, в котором записывается время создания карточек.
 
+        :return: дата-время сервера БД
+        """
+        return self.fetch("server_time").fetchone()[0]
+
+    def get_sensors_with_card(self, sensor_codes, created_after=None):
+        """
+        Метод для проверки наличия карточек сразу для многих объектов одним запросом.
+
+        :param sensor_codes: список идентификаторов объектов
+        :param created_after: учитывать только карточки, созданные не раньше этого времени
+        :return: множество идентификаторов объектов, для которых есть карточка
+        """
+        if created_after is None:
+            return self._match_references("sensors_with_card", sensor_codes)
+        return self._match_references("sensors_with_card_created_after", sensor_codes, (created_after,))
+
+    def get_sensors_with_notification(self, sensor_codes):
+        """
+        Метод для проверки наличия напоминаний в карточках сразу для многих объектов одним запросом.
+
+        :param sensor_codes: список идентификаторов объектов
+        :return: множество идентификаторов объектов, в карточках которых есть напоминания
+        """
+        return self._match_references("sensors_with_notification", sensor_codes)
+
+    def get_cards_data(self, sensor_codes):
+        """
+        Метод для получения информации из карточек сразу для многих объектов.
+        Карточки и напоминания получаются двумя запросами на каждые reference_chunk_size объектов, из БД читаются
+        только карточки запрошенных объектов.
+
+        :param sensor_codes: список идентификаторов объектов
+        :return: словарь {идентификатор объекта: список словарей атрибутов карточек, от новых к старым}
+        """
+        sensor_codes = set(sensor_codes)
+        prefix, chunks = self._reference_chunks(sensor_codes)
+        results = {}
+        for patterns in chunks:
+            cursor = self.fetch("cards_data", *patterns, values=len(patterns))
+            columns = [column[0] for column in cursor.description]
+            # карточки по ключу (CallCenterId, CaseFolderId), к ним будут добавлены напоминания
+            cards_by_folder = {}
+            for row in cursor.fetchall():
+                card_dict = dict(zip(columns, row))
+                sensor_code = self._match_reference(card_dict['ExternalSystemReference'], prefix, sensor_codes)
+                if sensor_code is None:
+                    continue
+                card_dict['Notices'] = []
+                results.setdefault(sensor_code, []).append(card_dict)
+                folder = (card_dict['CallCenterId'], card_dict['CaseFolderId'])
+                cards_by_folder.setdefault(folder, []).append(card_dict)
+            if not cards_by_folder:
+                continue
+            cursor = self.fetch("cards_notices", *patterns, values=len(patterns))
+            # первые два столбца - ключ карточки, в словарь напоминания не попадают
+            columns = [column[0] for column in cursor.description][2:]
+            for row in cursor.fetchall():
+                for card_dict in cards_by_folder.get((row[0], row[1]), ()):
+                    card_dict['Notices'].append(dict(zip(columns, row[2:])))
         return results
 
     def get_card_notices(self, call_center, case_folder_id):
-        query = f"""select OrderNo, CaseNoteTypeId, ImportanceId, Created, Creator, Canceled, CaseId, NoteText 
-                    from [OmniData].[dbo].[cse_Note_tab]
-                    where CallCenterId = {call_center} and CaseFolderId = {case_folder_id}
-                    order by OrderNo"""
-        cursor = self.execute_query(self.omnidata_conn, query)
+        cursor = self.fetch("card_notices", call_center, case_folder_id)
         columns = [column[0] for column in cursor.description]
         results = []
         for row in cursor.fetchall():
             results.append(dict(zip(columns, row)))
         return results
 
-    def delete_notify(self, card_list):
+    def delete_notify(self, card_list, chunk_size=db_config.batch_chunk_size):
         """
         Метод для удаления напоминаний для карточек.
 
-        :param card_list: список карточек
+        :param card_list: список карточек, строки вида 'CallCenterId|CaseFolderId|CaseId' или строки запроса
+        :param chunk_size: количество карточек, обрабатываемых в одной транзакции
+        :return: результат изменения, объект класса BatchResult
         """
-        card_list_str = ','.join([f"'{card}'" for card in card_list])
-        query = f"""delete from [OmniData].[dbo].[cse_TimeActivatedCase_tab]
-                          where  CONCAT(CallCenterId, '|', CaseFolderId, '|', CaseId) in ({card_list_str})"""
-        cursor = self.execute_query(self.omnidata_conn, query, is_commit_needed=True)
+        query = queries.get("delete_notify").sql
+        return BatchMutation(self.pool(self.omnidata_conn), query, chunk_size).run(card_list)
 
-    def change_index_to_test(self, card_list):
+    def change_index_to_test(self, card_list, chunk_size=db_config.batch_chunk_size):
         """
         Метод для изменения индексов 1 уровня на 64 "Тестирование Системы".
 
-        :param card_list: список карточек
+        :param card_list: список карточек, строки вида 'CallCenterId|CaseFolderId|CaseId' или строки запроса
+        :param chunk_size: количество карточек, обрабатываемых в одной транзакции
+        :return: результат изменения, объект класса BatchResult
         """
-        card_list_str = ','.join([f"'{card}'" for card in card_list])
-        query = f"""update [OmniData].[dbo].[cse_Case_tab] set CaseIndex1=64,CaseIndex2=NULL,CaseIndex3=NULL,
-                       CaseIndex1Name='Тестирование Системы',CaseIndex2Name=NULL,CaseIndex3Name=NULL
-                       where  CONCAT(CallCenterId, '|', CaseFolderId, '|', CaseId) in ({card_list_str})"""
-        # print(query)
-        cursor = self.execute_query(self.omnidata_conn, query, is_commit_needed=True)
+        query = queries.get("change_index_to_test").sql
+        return BatchMutation(self.pool(self.omnidata_conn), query, chunk_size).run(card_list)
 
     def get_card_for_close(self, telemetry_system_id):
-        query = f"""
-            SELECT ces.CallCenterId, cf.CaseFolderId, cf.CaseId,cf.CaseTypeId
-      FROM [OmniData].[dbo].[cse_Case_tab] cf
-      join [OmniData].[dbo].[cse_CaseExternalSystemReference_tab] ces on cf.CallCenterId = ces.CallCenterId and cf.CaseFolderId = ces.CaseFolderId
-      where ces.ExternalSystemReference like '{telemetry_system_id}-%'
-      order by cf.Created desc
-      """
-        cursor = self.execute_query(self.omnidata_conn, query)
+        cursor = self.fetch("cards_for_close", f"{telemetry_system_id}-%")
         return cursor.fetchall()
 
+    def iter_cards_for_close(self, telemetry_system_id=None, page_size=db_config.batch_chunk_size, after=None):
+        """
+        Метод для постраничного получения карточек телеметрической системы. Страницы выбираются по ключу карточки
+        (keyset), а не по смещению, поэтому каждый запрос читает только свою страницу, а обход можно продолжить
+        с любой карточки.
+
+        :param telemetry_system_id: идентификатор телеметрической системы, по умолчанию - из конструктора
+        :param page_size: количество карточек на странице
+        :param after: ключ карточки (CallCenterId, CaseFolderId, CaseId), после которой продолжить обход
+        :return: генератор страниц - списков строк (CallCenterId, CaseFolderId, CaseId, CaseTypeId)
+        """
+        if telemetry_system_id is None:
+            telemetry_system_id = self.telemetry_system_id
+        # ключ меньше любого существующего
+        call_center_id, case_folder_id, case_id = after if after is not None else (-1, -1, -1)
+        while True:
+            page = self.fetch("cards_for_close_page", f"{telemetry_system_id}-%", call_center_id, call_center_id,
+                              case_folder_id, case_folder_id, case_id, top=page_size).fetchall()
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            call_center_id, case_folder_id, case_id = page[-1][:3]
+
     def is_notification_in_card(self, sensor_code):
-        query = f"""select * from [OmniData].[dbo].[cse_CaseExternalSystemReference_tab] ces
-                    join [OmniData].[dbo].[cse_TimeActivatedCase_tab] tac on ces.CallCenterId = tac.CallCenterId 
-                    and ces.CaseFolderId = tac.CaseFolderId and ces.CaseFolderId= tac.CaseFolderId
-                    where ces.ExternalSystemReference like '{self.telemetry_system_id}-<{sensor_code}>%'"""
-        cursor = self.execute_query(self.omnidata_conn, query)
-        if cursor.fetchall():
-            return True
-        else:
-            return False
+        cursor = self.fetch("notification_in_card", f"{self.telemetry_system_id}-<{sensor_code}>%")
+        return cursor.fetchone() is not None
@@ -0,0 +1,69 @@
+"""
+Модуль содержит класс LatencyStats для сбора статистики по задержкам.
+
+:author: Andrei Ursaki.
+"""
+import math
+import threading
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """
+    Функция для вычисления перцентиля (метод ближайшего ранга).
+
+    :param sorted_values: отсортированный список значений
+    :param p: перцентиль, от 0 до 100
+    :return: значение перцентиля, None для пустого списка
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class LatencyStats:
+    def __init__(self):
+        """
+        Конструктор класса. Значения хранятся в секундах, методы безопасны для вызова из нескольких потоков.
+        """
+        self._values = []
+        self._total = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        """
+        Метод для добавления значения задержки.
+
+        :param seconds: задержка, сек
+        """
+        with self._lock:
+            self._values.append(seconds)
+            self._total += seconds
+
+    @property
+    def count(self) -> int:
+        return len(self._values)
+
+    @property
+    def values(self) -> list:
+        with self._lock:
+            return list(self._values)
+
+    def summary(self) -> dict:
+        """
+        Метод для получения сводной статистики.
+
+        :return: словарь с количеством, средним, минимумом, максимумом и перцентилями p50/p95/p99 в миллисекундах
+        """
+        with self._lock:
+            values = sorted(self._values)
+            total = self._total
+        if not values:
+            return {"count": 0}
+        return {"count": len(values),
+                "mean_ms": total / len(values) * 1000,
+                "min_ms": values[0] * 1000,
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": values[-1] * 1000}
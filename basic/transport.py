@@ -0,0 +1,125 @@
+"""
+Модуль содержит класс Transport - общий транспортный слой для HTTP запросов.
+
+:author: Andrei Ursaki.
+"""
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from basic.config import Config
+from basic.instrumentation import instrumentation
+
+
+class Transport:
+    # общий экземпляр транспорта, см. метод shared
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, pool_size: int = Config.http_pool_size, retries: int = Config.http_retries,
+                 backoff_factor: float = Config.http_backoff_factor, timeout=Config.http_timeout):
+        """
+        Конструктор класса.
+
+        :param pool_size: максимальное количество keep-alive соединений к одному хосту
+        :param retries: количество повторных попыток установить соединение
+        :param backoff_factor: коэффициент задержки между повторными попытками
+        :param timeout: таймаут запроса, число или кортеж (подключение, чтение)
+        """
+        self.pool_size = pool_size
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        # сессии с пулом соединений, ключ - схема и хост endpoint'а
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.closed = False
+
+    @classmethod
+    def shared(cls) -> "Transport":
+        """
+        Метод для получения общего для всего процесса экземпляра транспорта.
+
+        :return: объект класса Transport
+        """
+        with cls._shared_lock:
+            if cls._shared is None or cls._shared.closed:
+                cls._shared = cls()
+            return cls._shared
+
+    @property
+    def is_shared(self) -> bool:
+        """
+        Является ли транспорт общим для всего процесса.
+        """
+        return self is Transport._shared
+
+    def _create_session(self) -> requests.Session:
+        """
+        Метод для создания сессии с пулом соединений.
+
+        :return: сессия requests
+        """
+        # повторяем только установку соединения: повторная отправка POST после чтения могла бы продублировать сообщение
+        retry = Retry(total=self.retries, connect=self.retries, read=0, status=0, redirect=0,
+                      backoff_factor=self.backoff_factor)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry, pool_block=True)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def session(self, endpoint: str) -> requests.Session:
+        """
+        Метод для получения сессии для endpoint'а. Для всех endpoint'ов одного хоста используется одна сессия.
+
+        :param endpoint: url/endpoint
+        :return: сессия requests
+        """
+        if self.closed:
+            raise RuntimeError("Transport is closed")
+        url = urlsplit(endpoint)
+        key = (url.scheme, url.netloc)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._sessions[key] = self._create_session()
+        return session
+
+    def post(self, endpoint: str, data: bytes, headers: dict = None, verify: bool = True,
+             **kwargs) -> requests.Response:
+        """
+        Метод для отправки POST запроса через пул соединений.
+
+        :param endpoint: url/endpoint
+        :param data: тело запроса
+        :param headers: заголовки для запроса
+        :param verify: проверять ли сертификат сервера
+        :return: ответ сервера
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        with instrumentation.span("http", f"POST {endpoint}", bytes_sent=len(data)) as attrs:
+            response = self.session(endpoint).post(url=endpoint, data=data, headers=headers, verify=verify, **kwargs)
+            attrs["status"] = response.status_code
+        return response
+
+    def close(self):
+        """
+        Метод для закрытия всех сессий и соединений.
+        """
+        with self._lock:
+            self.closed = True
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,114 @@
+"""
+Модуль содержит класс Waiter для ожидания реакции системы сразу для многих объектов/датчиков
+и класс WaitResult с результатами ожидания.
+
+:author: Andrei Ursaki.
+"""
+import asyncio
+import time
+
+from basic.config import Config
+
+
+class WaitResult:
+    def __init__(self):
+        """
+        Конструктор класса.
+        """
+        # время от начала ожидания до выполнения условия, ключ - код объекта/датчика
+        self.satisfied = {}
+        # объекты/датчики, для которых условие не выполнилось
+        self.pending = set()
+        self.polls = 0
+        self.duration = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.pending
+
+    def __bool__(self):
+        return self.ok
+
+    def to_dict(self) -> dict:
+        return {"satisfied": len(self.satisfied), "pending": sorted(self.pending), "polls": self.polls,
+                "duration_s": self.duration}
+
+    def __repr__(self):
+        return f"WaitResult({self.to_dict()})"
+
+
+class Waiter:
+    def __init__(self, timeout: float = Config.wait_timeout, initial_delay: float = Config.wait_initial_delay,
+                 max_delay: float = Config.wait_max_delay, backoff_factor: float = Config.wait_backoff_factor):
+        """
+        Конструктор класса.
+
+        :param timeout: максимальное время ожидания, сек
+        :param initial_delay: пауза после первой проверки, сек
+        :param max_delay: максимальная пауза между проверками, сек
+        :param backoff_factor: во сколько раз увеличивается пауза после каждой проверки
+        """
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff_factor = backoff_factor
+
+    def wait(self, sensor_codes, poll) -> WaitResult:
+        """
+        Метод для ожидания выполнения условия. Каждая проверка - один вызов poll для всех объектов/датчиков,
+        для которых условие еще не выполнилось. Ожидание заканчивается, как только условие выполнилось для всех
+        объектов/датчиков, или по истечении timeout.
+
+        :param sensor_codes: коды объектов/датчиков
+        :param poll: функция, принимающая множество кодов и возвращающая множество кодов, для которых условие выполнено
+        :return: результат ожидания
+        """
+        steps = self._steps(sensor_codes)
+        result = next(steps)
+        try:
+            while True:
+                delay = steps.send(poll(frozenset(result.pending)))
+                time.sleep(delay)
+        except StopIteration:
+            return result
+
+    async def wait_async(self, sensor_codes, poll) -> WaitResult:
+        """
+        Метод для ожидания выполнения условия в asyncio, см. wait.
+
+        :param sensor_codes: коды объектов/датчиков
+        :param poll: корутина, принимающая множество кодов и возвращающая множество кодов, для которых условие выполнено
+        :return: результат ожидания
+        """
+        steps = self._steps(sensor_codes)
+        result = next(steps)
+        try:
+            while True:
+                delay = steps.send(await poll(frozenset(result.pending)))
+                await asyncio.sleep(delay)
+        except StopIteration:
+            return result
+
+    def _steps(self, sensor_codes):
+        """
+        Генератор шагов ожидания: получает результат очередной проверки и возвращает паузу до следующей.
+        Первым значением возвращается результат ожидания, он дополняется после каждой проверки.
+        """
+        result = WaitResult()
+        result.pending = set(sensor_codes)
+        start = time.monotonic()
+        deadline = start + self.timeout
+        delay = self.initial_delay
+        satisfied = yield result
+        while True:
+            satisfied = set(satisfied) & result.pending
+            result.polls += 1
+            now = time.monotonic()
+            for sensor_code in satisfied:
+                result.satisfied[sensor_code] = now - start
+            result.pending -= satisfied
+            if not result.pending or now >= deadline:
+                break
+            satisfied = yield min(delay, deadline - now)
+            delay = min(delay * self.backoff_factor, self.max_delay)
+        result.duration = time.monotonic() - start
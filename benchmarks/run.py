@@ -0,0 +1,169 @@
+"""
+Модуль запускает нагрузочные замеры basic без боевых хостов: адаптер, CardChecker и LogChecker заменены локальными
+HTTP заглушками в отдельном процессе, БД - файлом SQLite. Результаты сохраняются в json для сравнения между версиями.
+
+Запуск из корня проекта: python -m benchmarks.run --sensors 1000 --output bench.json
+
+:author: Andrei Ursaki.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from basic.basic_adapter import BasicAdapter
+from basic.config import Config
+from basic.db_pool import ConnectionPool
+from basic.log_reader import LogReader
+from basic.log_search import LocalLogSearch
+from basic.message_template import MessageTemplate
+from basic.sql_helper import SqlHelper
+from basic.stats import LatencyStats
+from benchmarks import sqlite_backend
+from benchmarks.stand_ins import StandInProcess, write_log_fixture
+
+TELEMETRY_SYSTEM_ID = 1
+SERVER = "bench"
+
+
+def measure(func, iterations: int) -> dict:
+    """
+    Функция для замера времени выполнения.
+
+    :param func: функция без параметров, получает номер итерации
+    :param iterations: количество итераций
+    :return: словарь с перцентилями задержки и пропускной способностью
+    """
+    stats = LatencyStats()
+    # печать в stdout (например, в Request.send) не должна влиять на замер
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for i in range(iterations):
+            call_start = time.perf_counter()
+            func(i)
+            stats.add(time.perf_counter() - call_start)
+        duration = time.perf_counter() - start
+    result = stats.summary()
+    result["throughput_ops_s"] = iterations / duration if duration else 0.0
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args) -> dict:
+    """
+    Функция для запуска всех замеров.
+
+    :param args: параметры запуска
+    :return: отчет в виде словаря
+    """
+    work_dir = tempfile.mkdtemp(prefix="basic_bench_")
+    try:
+        return _run(args, work_dir)
+    finally:
+        ConnectionPool.close_all()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _run(args, work_dir: str) -> dict:
+    db_path = os.path.join(work_dir, "bench.sqlite")
+    log_path = os.path.join(work_dir, "Integration.log")
+    sqlite_backend.seed(db_path, TELEMETRY_SYSTEM_ID, args.sensors, args.cards_per_sensor, args.notes_per_card)
+    log_start, log_end = write_log_fixture(log_path, args.log_records, args.rules)
+    ConnectionPool.connect_function = sqlite_backend.connect
+
+    reader_paths = {fr"\\{SERVER}{Config.integration_logs_path}": log_path}
+    log_search = LocalLogSearch(reader_paths, index_dir=os.path.join(work_dir, "index"))
+    results = {}
+    # заглушки работают в отдельном процессе и не делят GIL с замеряемым кодом
+    with StandInProcess(reader_paths, index_dir=os.path.join(work_dir, "stand_in_index")) as server:
+        Config.card_checker_url = server.url
+        Config.log_checker_url = server.url
+        adapter = BasicAdapter(TELEMETRY_SYSTEM_ID, f"{server.url}/adapter", "application/json")
+        adapter.sh = SqlHelper(TELEMETRY_SYSTEM_ID, sensors_conn=db_path, layer_obj_conn=db_path,
+                               omnidata_conn=db_path)
+        sensors = adapter.get_sensors(0)
+        rnd = random.Random(0)
+        msg = json.dumps({"sensor_code": sensors[0], "value": 1, "timestamp": datetime.now().isoformat()})
+
+        results["request.send"] = measure(lambda i: adapter.r.send(msg), args.iterations)
+        results["request.send_load"] = adapter.r.send_load([msg] * args.iterations * 10,
+                                                           concurrency=args.concurrency).to_dict()
+        template = MessageTemplate('{"sensor_code": "${sensor_code}", "value": ${value}, "timestamp": "${timestamp}"}')
+        results["message_template.render"] = measure(
+            lambda i: template.render(sensor_code=sensors[i % len(sensors)], value=i, timestamp=datetime.now()),
+            args.iterations * 10)
+        results["message_template.json_dumps"] = measure(
+            lambda i: json.dumps({"sensor_code": sensors[i % len(sensors)], "value": i,
+                                  "timestamp": datetime.now().isoformat()}).encode("utf-8"), args.iterations * 10)
+        rows = ({"sensor_code": sensors[i % len(sensors)], "value": i, "timestamp": datetime.now()}
+                for i in range(args.iterations * 10))
+        results["request.send_load[template]"] = adapter.r.send_load(template.generate(rows),
+                                                                     concurrency=args.concurrency).to_dict()
+
+        def get_sensors_cold(i):
+            adapter.invalidate_sensors()
+            adapter.sh.invalidate_cache()
+            adapter.get_sensors(2)
+
+        results["basic_adapter.get_sensors[cold]"] = measure(get_sensors_cold, args.iterations)
+        results["basic_adapter.get_sensors[cached]"] = measure(lambda i: adapter.get_sensors(2), args.iterations)
+        results["basic_adapter.check_card"] = measure(
+            lambda i: adapter.check_card(rnd.choice(sensors), {"CaseIndex1": 1}), args.iterations)
+        cards_info = {sensor_code: {"CaseIndex1": 1} for sensor_code in sensors[:100]}
+        results["basic_adapter.check_cards[remote]"] = measure(lambda i: adapter.check_cards(cards_info),
+                                                               max(args.iterations // 10, 1))
+        results["basic_adapter.check_cards[local]"] = measure(lambda i: adapter.check_cards(cards_info, local=True),
+                                                              max(args.iterations // 10, 1))
+        results["sql_helper.get_card_data"] = measure(lambda i: adapter.sh.get_card_data(rnd.choice(sensors)),
+                                                      args.iterations)
+        results["sql_helper.get_cards_data[all]"] = measure(lambda i: adapter.sh.get_cards_data(sensors),
+                                                            max(args.iterations // 10, 1))
+
+        remote_reader = LogReader(SERVER, log_start, log_end)
+        local_reader = LogReader(SERVER, log_start, log_end, backend=log_search)
+        results["log_reader.get_chain_for_rule[remote]"] = measure(
+            lambda i: remote_reader.get_chain_for_rule(f"rule{i % args.rules}"), args.iterations)
+        results["log_reader.get_chain_for_rule[local]"] = measure(
+            lambda i: local_reader.get_chain_for_rule(f"rule{i % args.rules}"), args.iterations)
+    return {"meta": {"created": datetime.now().isoformat(timespec="seconds"), "git_revision": git_revision(),
+                     "python": platform.python_version(), "platform": platform.platform(),
+                     "params": vars(args)},
+            "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочные замеры basic на локальных заглушках")
+    parser.add_argument("--sensors", type=int, default=1000, help="количество объектов/датчиков")
+    parser.add_argument("--cards-per-sensor", type=int, default=2, help="карточек у объекта с открытой карточкой")
+    parser.add_argument("--notes-per-card", type=int, default=3, help="напоминаний в карточке")
+    parser.add_argument("--log-records", type=int, default=100000, help="записей в файле лога")
+    parser.add_argument("--rules", type=int, default=50, help="количество CEP правил в логе")
+    parser.add_argument("--iterations", type=int, default=100, help="количество итераций каждого замера")
+    parser.add_argument("--concurrency", type=int, default=10, help="конкурентность для send_load")
+    parser.add_argument("--output", help="файл для сохранения отчета, по умолчанию stdout")
+    args = parser.parse_args()
+    report = json.dumps(run(args), ensure_ascii=False, indent=4)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Модуль содержит тестовую БД SQLite с таблицами t_sensor/cse_*/LayerObject для запуска SqlHelper без SQL Server.
+
+:author: Andrei Ursaki.
+"""
+import random
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+SCHEMA = """
+create table t_sensor (sensor_code text, telemetry_system_id integer, removed_dt text, layerobject_id integer,
+                       layerobject_caption text, address text, location_lat real, location_long real,
+                       call_center_id integer, case_type_area text, municipality_name text);
+create index ix_t_sensor on t_sensor (telemetry_system_id, sensor_code);
+create table cse_Case_tab (CallCenterId integer, CaseFolderId integer, CaseId integer, CaseTypeId integer,
+                           MunicipalityName text, Created text, XCoordinate real, YCoordinate real,
+                           CaseIndex1 integer, CaseIndex2 integer, CaseIndex3 integer, CaseIndex1Name text,
+                           CaseIndex2Name text, CaseIndex3Name text, CaseIndexComment text, RouteDirections text,
+                           primary key (CallCenterId, CaseFolderId, CaseId));
+create table cse_CaseExternalSystemReference_tab (CallCenterId integer, CaseFolderId integer, CaseId integer,
+                                                  ExternalSystemName text, ExternalSystemReference text);
+create index ix_ces_reference on cse_CaseExternalSystemReference_tab (ExternalSystemReference);
+create index ix_ces_folder on cse_CaseExternalSystemReference_tab (CallCenterId, CaseFolderId);
+create table cse_Note_tab (CallCenterId integer, CaseFolderId integer, OrderNo integer, CaseNoteTypeId integer,
+                           ImportanceId integer, Created text, Creator text, Canceled integer, CaseId integer,
+                           NoteText text);
+create index ix_note_folder on cse_Note_tab (CallCenterId, CaseFolderId);
+create table cse_TimeActivatedCase_tab (CallCenterId integer, CaseFolderId integer, CaseId integer);
+create table geo_Municipality_tab (CallCenterId integer, Name text);
+create table Element (Id integer primary key, ElementTypeId integer);
+create table ElementType (Id integer primary key);
+create table ElementTypeAttribute (ElementTypeId integer, AttributeId integer);
+create table Attribute (Id integer primary key, Code text);
+create table AttributeValue (ElementId integer, AttributeId integer, Value text);
+"""
+
+
+@lru_cache(maxsize=256)
+def translate(query: str) -> str:
+    """
+    Функция для перевода запроса T-SQL, используемого SqlHelper, в диалект SQLite.
+
+    :param query: запрос T-SQL
+    :return: запрос SQLite
+    """
+    # [БД].[dbo].[таблица] -> [таблица], все таблицы находятся в одной БД
+    query = re.sub(r"\[\w+\]\.\[dbo\]\.", "", query)
+    # время сервера в формате, в котором в тестовой БД хранится время создания карточек
+    query = re.sub(r"\bgetdate\(\)", "strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')", query,
+                   flags=re.IGNORECASE)
+    # временные таблицы #таблица -> temp.таблица
+    query = re.sub(r"if object_id\('tempdb\.\.#(\w+)'\) is not null drop table #\w+",
+                   r"drop table if exists temp.\1", query, flags=re.IGNORECASE)
+    query = re.sub(r"#(\w+)", r"temp.\1", query)
+    # select top N ... -> select ... limit N
+    top = re.search(r"\bTOP\s+(\d+)\b", query, flags=re.IGNORECASE)
+    if top:
+        query = f"{query[:top.start()]}{query[top.end():].rstrip()} limit {top.group(1)}"
+    return query
+
+
+class Cursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=()):
+        query = translate(query)
+        if not params and ";" in query:
+            # пакет из нескольких запросов без параметров
+            for statement in query.split(";"):
+                if statement.strip():
+                    self._cursor.execute(statement)
+            return self
+        self._cursor.execute(query, params)
+        return self
+
+    def executemany(self, query, rows):
+        self._cursor.executemany(translate(query), rows)
+        return self
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class Connection:
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self) -> Cursor:
+        return Cursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def connect(conn_str: str) -> Connection:
+    """
+    Функция подключения для ConnectionPool.connect_function, строка подключения - путь к файлу БД.
+    """
+    return Connection(conn_str)
+
+
+def seed(path: str, telemetry_system_id: int, sensors: int, cards_per_sensor: int, notes_per_card: int,
+         attributes: int = 5, open_card_share: float = 0.5, seed_value: int = 0):
+    """
+    Функция для заполнения тестовой БД.
+
+    :param path: путь к файлу БД
+    :param telemetry_system_id: идентификатор телеметрической системы
+    :param sensors: количество объектов/датчиков
+    :param cards_per_sensor: количество карточек у объекта с открытыми карточками
+    :param notes_per_card: количество напоминаний в карточке
+    :param attributes: количество атрибутов КО
+    :param open_card_share: доля объектов с открытыми карточками
+    :param seed_value: начальное значение генератора случайных чисел
+    """
+    rnd = random.Random(seed_value)
+    created = datetime(2021, 1, 1)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    conn.execute("insert into geo_Municipality_tab values (1, 'Ростов-на-Дону')")
+    conn.execute("insert into ElementType values (1)")
+    conn.executemany("insert into Attribute values (?, ?)", [(i, f"Attr{i}") for i in range(1, attributes + 1)])
+    conn.executemany("insert into ElementTypeAttribute values (1, ?)", [(i,) for i in range(1, attributes + 1)])
+    folder_id = 0
+    for n in range(1, sensors + 1):
+        sensor_code = f"SENSOR-{n:06d}"
+        conn.execute("insert into t_sensor values (?, ?, NULL, ?, ?, ?, ?, ?, 1, NULL, ?)",
+                     (sensor_code, telemetry_system_id, n, f"Объект {n}", f"ул. Тестовая, {n}",
+                      47 + rnd.random(), 39 + rnd.random(), "Ростов-на-Дону"))
+        conn.execute("insert into Element values (?, 1)", (n,))
+        conn.executemany("insert into AttributeValue values (?, ?, ?)",
+                         [(n, i, f"value-{n}-{i}") for i in range(1, attributes + 1)])
+        if rnd.random() >= open_card_share:
+            continue
+        for _ in range(cards_per_sensor):
+            folder_id += 1
+            created += timedelta(seconds=1)
+            conn.execute("insert into cse_Case_tab values (1, ?, ?, 5, 'Ростов-на-Дону', ?, ?, ?, 1, 2, 3, "
+                         "'Индекс 1', 'Индекс 2', 'Индекс 3', '', '')",
+                         (folder_id, folder_id, created.isoformat(), 39 + rnd.random(), 47 + rnd.random()))
+            conn.execute("insert into cse_CaseExternalSystemReference_tab values (1, ?, ?, 'Telemetry', ?)",
+                         (folder_id, folder_id, f"{telemetry_system_id}-<{sensor_code}>-{folder_id}"))
+            conn.executemany("insert into cse_Note_tab values (1, ?, ?, 1, 1, ?, 'bench', 0, ?, ?)",
+                             [(folder_id, order, created.isoformat(), folder_id, f"Напоминание {order}")
+                              for order in range(1, notes_per_card + 1)])
+    conn.commit()
+    conn.close()
@@ -0,0 +1,164 @@
+"""
+Модуль содержит локальные HTTP заглушки адаптера, CoordCom CardChecker (checkByExternalSystemReference,
+checkCustomObject) и LogChecker (findLogs), а также генератор тестового файла лога.
+
+Запуск заглушек отдельным процессом (адрес печатается в stdout):
+python -m benchmarks.stand_ins --paths '{"путь к логу в LogReader": "локальный путь"}'
+
+:author: Andrei Ursaki.
+"""
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from basic.config import Config
+from basic.log_search import LocalLogSearch
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # заголовки и тело отправляются отдельно, без этого каждый ответ ждет delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body: dict = None, status: int = 200):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8") if body is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        route = self.path.strip("/")
+        if route == "adapter":
+            self._reply()
+            return
+        try:
+            msg = json.loads(data)
+        except ValueError:
+            self._reply({"error": "Некорректный json"}, 400)
+            return
+        if route in ("checkByExternalSystemReference", "checkCustomObject"):
+            # CardChecker возвращает результат сравнения каждого проверяемого поля
+            checked = {key: {"expected": value, "actual": value, "result": True} for key, value in msg.items()}
+            self._reply({"response": checked})
+        elif route == "findLogs":
+            # постраничная выдача: пропускаем offset логов и возвращаем не больше log_count
+            offset, log_count = msg.get("offset") or 0, msg.get("log_count")
+            try:
+                logs = list(itertools.islice(
+                    self.server.log_search.iter_find(msg["file_path"], msg["find"], msg.get("from"), msg.get("to")),
+                    offset, offset + log_count if log_count else None))
+            except OSError as e:
+                self._reply({"error": str(e)})
+                return
+            # в ответе LogChecker ключ содержит кириллическую "о", как ее ожидает LogReader
+            self._reply({"found_lоgs": logs})
+        else:
+            self._reply({"error": f"Неизвестный метод {route}"}, 404)
+
+
+class StandInServer:
+    def __init__(self, log_search: LocalLogSearch = None):
+        """
+        Конструктор класса. Сервер запускается в фоновом потоке на свободном порту localhost.
+
+        :param log_search: локальный поиск по логам для метода findLogs
+        """
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.log_search = log_search or LocalLogSearch()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class StandInProcess:
+    def __init__(self, path_map: dict = None, index_dir: str = None):
+        """
+        Конструктор класса. Заглушки запускаются в отдельном процессе (python -m benchmarks.stand_ins), поэтому
+        обработка запросов не конкурирует с замеряемым кодом за GIL.
+
+        :param path_map: соответствие путей к логам, используемых LogReader, локальным путям (см. LocalLogSearch)
+        :param index_dir: каталог для хранения индексов логов процесса заглушек
+        """
+        self.path_map = path_map or {}
+        self.index_dir = index_dir
+        self.url = None
+        self._process = None
+
+    def __enter__(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (root, os.environ.get("PYTHONPATH")))))
+        command = [sys.executable, "-m", "benchmarks.stand_ins", "--paths", json.dumps(self.path_map)]
+        if self.index_dir:
+            command += ["--index-dir", self.index_dir]
+        self._process = subprocess.Popen(command, cwd=root, env=env, stdout=subprocess.PIPE, text=True)
+        # процесс печатает адрес, когда сервер готов принимать запросы
+        self.url = self._process.stdout.readline().strip()
+        if not self.url:
+            self._process.wait()
+            raise RuntimeError(f"Процесс заглушек завершился с кодом {self._process.returncode}")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._process.terminate()
+        self._process.wait()
+        self._process.stdout.close()
+
+
+def write_log_fixture(path: str, records: int, rules: int, chain_length: int = 4,
+                      start: datetime = datetime(2021, 1, 1)) -> tuple:
+    """
+    Функция для генерации файла лога в формате, который читает LocalLogSearch.
+
+    :param path: путь к файлу
+    :param records: количество записей
+    :param rules: количество CEP правил
+    :param chain_length: количество записей в одной цепочке (sphaera_x_operation_id)
+    :param start: время первой записи, записи идут с интервалом в 1 секунду
+    :return: время первой и последней записи
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(records):
+            record = {Config.log_timestamp_field: (start + timedelta(seconds=i)).isoformat() + ".000+03:00",
+                      "sphaera_process": "Sphaera.Telemetry.Cep",
+                      "sphaera_x_operation_id": f"bench-operation-{i // chain_length}",
+                      "sphaera_operation": "Process",
+                      "sphaera_data": [{"data": f"<statementName>rule{i // chain_length % rules}</statementName>"}]}
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return start, start + timedelta(seconds=records - 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальные HTTP заглушки адаптера, CardChecker и LogChecker")
+    parser.add_argument("--paths", default="{}", help="json {путь к логу в LogReader: локальный путь}")
+    parser.add_argument("--index-dir", help="каталог для хранения индексов логов")
+    args = parser.parse_args()
+    server = StandInServer(LocalLogSearch(json.loads(args.paths), index_dir=args.index_dir))
+    print(server.url, flush=True)
+    server._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
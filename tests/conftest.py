@@ -0,0 +1,18 @@
+import pytest
+
+from basic.db_pool import ConnectionPool
+from benchmarks import sqlite_backend
+
+TELEMETRY_SYSTEM_ID = 1
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """
+    Тестовая БД SQLite (см. benchmarks/sqlite_backend.py), строка подключения - путь к файлу.
+    """
+    path = str(tmp_path / "test.sqlite")
+    sqlite_backend.seed(path, TELEMETRY_SYSTEM_ID, sensors=20, cards_per_sensor=2, notes_per_card=1)
+    monkeypatch.setattr(ConnectionPool, "connect_function", sqlite_backend.connect)
+    yield path
+    ConnectionPool.close_all()
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from basic.config import Config
+from basic.log_search import LocalLogSearch
+from tests.test_log_search import record, rule_query, write
+
+aio = pytest.importorskip("basic.aio")
+
+
+class TrackingSearch(LocalLogSearch):
+    """
+    Локальный поиск, запоминающий, сколько логов уже найдено и закрыт ли генератор.
+    """
+    def __init__(self):
+        super().__init__(use_index=False)
+        self.produced = 0
+        self.closed = False
+
+    def iter_find(self, *args, **kwargs):
+        try:
+            for log in super().iter_find(*args, **kwargs):
+                self.produced += 1
+                yield log
+        finally:
+            self.closed = True
+
+
+@pytest.fixture
+def log_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "log_local_chunk_size", 5)
+    path = str(tmp_path / "Integration.log")
+    write(path, [record(i) for i in range(120)])
+    return path
+
+
+def reader(search):
+    return aio.AsyncLogReader("127.0.0.1", datetime(2021, 1, 1), datetime(2021, 1, 2), backend=search)
+
+
+def test_local_iter_logs_streams_chunks(log_path):
+    search = TrackingSearch()
+
+    async def main():
+        logs, produced = [], []
+        async for log in reader(search).iter_logs(log_path, rule_query("rule1"), full_file_search=True):
+            logs.append(log)
+            produced.append(search.produced)
+        return logs, produced
+
+    logs, produced = asyncio.run(main())
+    assert logs == LocalLogSearch(use_index=False).find(log_path, rule_query("rule1"))
+    assert len(logs) == 40
+    # пока не прочитана часть, следующая не ищется
+    assert produced[:6] == [5, 5, 5, 5, 5, 10]
+    assert search.closed
+
+
+def test_local_iter_logs_closed_early(log_path):
+    search = TrackingSearch()
+
+    async def main():
+        logs = reader(search).iter_logs(log_path, rule_query("rule1"), full_file_search=True)
+        first = await logs.__anext__()
+        await logs.aclose()
+        return first
+
+    assert asyncio.run(main())["sphaera_data"] == rule_query("rule1")["sphaera_data"]
+    assert search.produced == 5 and search.closed
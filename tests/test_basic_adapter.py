@@ -0,0 +1,44 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+
+from basic.basic_adapter import BasicAdapter
+from basic.sql_helper import SqlHelper
+from tests.conftest import TELEMETRY_SYSTEM_ID
+
+
+@pytest.fixture
+def adapter(sqlite_db):
+    adapter = BasicAdapter(TELEMETRY_SYSTEM_ID, "http://127.0.0.1:1/adapter", "application/json")
+    adapter.sh = SqlHelper(TELEMETRY_SYSTEM_ID, sensors_conn=sqlite_db, layer_obj_conn=sqlite_db,
+                           omnidata_conn=sqlite_db)
+    return adapter
+
+
+def open_card(path: str, sensor_code: str):
+    with sqlite3.connect(path) as conn:
+        conn.execute("insert into cse_Case_tab (CallCenterId, CaseFolderId, CaseId, Created) "
+                     "values (1, 9999, 9999, ?)", (datetime.now().isoformat(),))
+        conn.execute("insert into cse_CaseExternalSystemReference_tab values (1, 9999, 9999, 'Telemetry', ?)",
+                     (f"{TELEMETRY_SYSTEM_ID}-<{sensor_code}>-9999",))
+
+
+def test_wait_for_cards_ignores_leftover_cards(adapter):
+    with_card = adapter.get_sensors(1)
+    assert with_card
+    result = adapter.wait_for_cards(with_card, timeout=0.2)
+    assert not result.satisfied
+    assert adapter.wait_for_cards(with_card, created_after=datetime(2000, 1, 1), timeout=0.2).ok
+
+
+def test_wait_for_cards_finds_new_card(adapter, sqlite_db):
+    sensor_code = adapter.get_sensors(2)[0]
+    timer = threading.Timer(0.2, open_card, (sqlite_db, sensor_code))
+    timer.start()
+    try:
+        result = adapter.wait_for_cards([sensor_code], timeout=3)
+    finally:
+        timer.join()
+    assert result.ok
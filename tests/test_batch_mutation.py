@@ -0,0 +1,40 @@
+import sqlite3
+
+from basic.batch_mutation import BatchMutation
+from basic.db_pool import ConnectionPool
+
+# запрос в диалекте SQLite, соединяющий таблицу с #cards по ключевым столбцам
+REINDEX = """update [OmniData].[dbo].[cse_Case_tab] set CaseIndex1 = 64
+             where exists (select 1 from #cards c where c.CallCenterId = cse_Case_tab.CallCenterId
+                           and c.CaseFolderId = cse_Case_tab.CaseFolderId and c.CaseId = cse_Case_tab.CaseId)"""
+
+
+def card_keys(path: str, limit: int) -> list:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("select CallCenterId, CaseFolderId, CaseId from cse_Case_tab order by CaseFolderId "
+                            "limit ?", (limit,)).fetchall()
+
+
+def reindexed(path: str) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("select count(*) from cse_Case_tab where CaseIndex1 = 64").fetchone()[0]
+
+
+def test_run_in_chunks(sqlite_db):
+    keys = card_keys(sqlite_db, 7)
+    result = BatchMutation(ConnectionPool(sqlite_db), REINDEX, chunk_size=3).run(keys)
+    assert (result.chunks, result.cards, result.rows_affected) == (3, 7, 7)
+    assert reindexed(sqlite_db) == 7
+
+
+def test_duplicate_keys_in_chunk(sqlite_db):
+    keys = card_keys(sqlite_db, 3)
+    cards = keys + ["|".join(map(str, keys[0])), keys[1]]
+    result = BatchMutation(ConnectionPool(sqlite_db), REINDEX, chunk_size=10).run(cards)
+    assert (result.chunks, result.cards, result.rows_affected) == (1, 3, 3)
+    assert reindexed(sqlite_db) == 3
+
+
+def test_parse_card_key():
+    assert BatchMutation.parse_card_key("1|2|3") == (1, 2, 3)
+    assert BatchMutation.parse_card_key((1, "2", 3, 5)) == (1, 2, 3)
@@ -0,0 +1,36 @@
+from basic.card_verifier import CardVerifier
+from basic.check_report import CheckReport
+from basic.sql_helper import SqlHelper
+from tests.conftest import TELEMETRY_SYSTEM_ID
+
+
+def test_remote_response_without_field_results_passes():
+    report = CheckReport()
+    report.add("S1", 0.1, {"status": "ok", "fields": ["CaseIndex1"]})
+    report.add("S2", 0.1, {"CaseIndex1": True, "XCoordinate": {"value": 1}})
+    report.add("S3", 0.1, None, "Пустой ответ CardChecker")
+    assert report.passed == ["S1", "S2"]
+    assert report.failed == ["S3"]
+    assert report.mismatches == {}
+
+
+def test_field_results_are_checked():
+    report = CheckReport()
+    report.add("S1", 0.1, {"CaseIndex1": {"expected": 1, "actual": 1, "result": True}})
+    report.add("S2", 0.1, {"CaseIndex1": {"expected": 1, "actual": 2, "result": False},
+                           "CaseIndex2": {"expected": 2, "actual": 2, "result": True}})
+    assert report.passed == ["S1"]
+    assert report.mismatches == {"S2": ["CaseIndex1"]}
+    assert report.to_dict()["failed"] == 1
+
+
+def test_verify_many_checks_newest_card(sqlite_db):
+    sql_helper = SqlHelper(TELEMETRY_SYSTEM_ID, sensors_conn=sqlite_db, layer_obj_conn=sqlite_db,
+                           omnidata_conn=sqlite_db)
+    sensor_code = sql_helper.get_all_sensors_with_open_card()[0]
+    cards = sql_helper.get_cards_data([sensor_code])[sensor_code]
+    assert cards[0]["CardCreated"] > cards[-1]["CardCreated"]
+    assert sql_helper.get_card_data(sensor_code) == cards[-1]
+    report = CardVerifier(sql_helper).verify_many({sensor_code: {"CardCreated": cards[0]["CardCreated"],
+                                                                 "CaseFolderId": cards[0]["CaseFolderId"]}})
+    assert report.passed == [sensor_code]
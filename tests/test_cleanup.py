@@ -0,0 +1,92 @@
+import json
+import sqlite3
+
+import pytest
+
+from basic.cleanup import CLOSE, CleanupPipeline
+from basic.sensor_state import SensorStateSnapshot
+from basic.sql_helper import SqlHelper
+from tests.conftest import TELEMETRY_SYSTEM_ID
+
+
+@pytest.fixture
+def sql_helper(sqlite_db):
+    return SqlHelper(TELEMETRY_SYSTEM_ID, sensors_conn=sqlite_db, layer_obj_conn=sqlite_db, omnidata_conn=sqlite_db)
+
+
+def all_card_keys(path: str) -> list:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("select CallCenterId, CaseFolderId, CaseId from cse_Case_tab "
+                            "order by CallCenterId, CaseFolderId, CaseId").fetchall()
+
+
+def keys(page: list) -> list:
+    return [tuple(row[:3]) for row in page]
+
+
+class StubClose:
+    """
+    Этап закрытия карточек: запоминает обработанные карточки, на странице с номером fail_on выбрасывает ошибку.
+    """
+    def __init__(self, fail_on: int = None):
+        self.fail_on = fail_on
+        self.pages = []
+
+    def __call__(self, cards: list) -> int:
+        if len(self.pages) == self.fail_on:
+            self.pages.append(None)
+            raise RuntimeError("close failed")
+        self.pages.append(keys(cards))
+        return len(cards)
+
+
+def test_keyset_paging(sql_helper, sqlite_db):
+    expected = all_card_keys(sqlite_db)
+    assert len(expected) > 7
+    pages = [keys(page) for page in sql_helper.iter_cards_for_close(page_size=3)]
+    assert all(len(page) == 3 for page in pages[:-1])
+    assert [key for page in pages for key in page] == expected
+    # обход продолжается после переданной карточки
+    resumed = [key for page in sql_helper.iter_cards_for_close(page_size=3, after=expected[4]) for key in keys(page)]
+    assert resumed == expected[5:]
+
+
+def test_checkpoint_resume(sql_helper, sqlite_db, tmp_path):
+    expected = all_card_keys(sqlite_db)
+    checkpoint = str(tmp_path / "cleanup.json")
+    failing = StubClose(fail_on=2)
+    with pytest.raises(RuntimeError):
+        CleanupPipeline(sql_helper, (CLOSE,), close=failing, page_size=3, workers=1, checkpoint=checkpoint,
+                        progress=lambda report: None).run()
+    with open(checkpoint, encoding="utf-8") as f:
+        state = json.load(f)
+    # в контрольной точке - последняя карточка второй страницы, третья страница не обработана (уже начатая
+    # четвертая страница могла завершиться, но контрольная точка сдвигается только по непрерывному префиксу)
+    assert state["telemetry_system_id"] == TELEMETRY_SYSTEM_ID
+    assert state["last_key"] == list(expected[5])
+
+    resumed = StubClose()
+    report = CleanupPipeline(sql_helper, (CLOSE,), close=resumed, page_size=3, workers=1, checkpoint=checkpoint,
+                             progress=lambda report: None).run()
+    assert [key for page in resumed.pages for key in page] == expected[6:]
+    assert report.cards == len(expected) - 6
+    assert report.rows_affected == {CLOSE: len(expected) - 6}
+    assert report.last_key == list(expected[-1])
+    assert not (tmp_path / "cleanup.json").exists()
+
+
+def test_stages_invalidate_sensor_state(sql_helper):
+    snapshot = SensorStateSnapshot.for_sql_helper(sql_helper)
+    CleanupPipeline(sql_helper, (CLOSE,), close=StubClose(), page_size=100, workers=1,
+                    progress=lambda report: None).run()
+    assert SensorStateSnapshot.for_sql_helper(sql_helper) is not snapshot
+
+
+def test_dry_run(sql_helper, sqlite_db):
+    close = StubClose()
+    snapshot = SensorStateSnapshot.for_sql_helper(sql_helper)
+    report = CleanupPipeline(sql_helper, (CLOSE,), close=close, page_size=3, workers=2, dry_run=True,
+                             progress=lambda report: None).run()
+    assert report.cards == len(all_card_keys(sqlite_db))
+    assert close.pages == [] and report.rows_affected == {}
+    assert SensorStateSnapshot.for_sql_helper(sql_helper) is snapshot
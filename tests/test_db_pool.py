@@ -0,0 +1,170 @@
+import pytest
+
+from basic.db_pool import ConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.closed = False
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, query, *params):
+        if not self.conn.alive:
+            raise ConnectionError("connection lost")
+        self.conn.executed.append(query)
+        return self
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    """
+    Соединение вместо pyodbc: запоминает выполненные запросы, может "умереть" и не откатить транзакцию.
+    """
+    def __init__(self, conn_str):
+        self.conn_str = conn_str
+        self.alive = True
+        self.fail_rollback = False
+        self.closed = False
+        self.commits = self.rollbacks = 0
+        self.executed = []
+        self.cursors = []
+
+    def cursor(self):
+        cursor = FakeCursor(self)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise ConnectionError("connection lost")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(conn_str):
+        opened.append(FakeConnection(conn_str))
+        return opened[-1]
+
+    monkeypatch.setattr(ConnectionPool, "connect_function", connect)
+    return opened
+
+
+def test_checkout_and_release(connections):
+    pool = ConnectionPool("db", size=2)
+    with pool.connection() as first:
+        with pool.connection() as second:
+            assert first is not second
+    # свободные соединения выдаются повторно, последнее возвращенное - первым, новое не открывается
+    with pool.connection() as conn:
+        assert conn is first
+    with pool.cursor(commit=True) as cursor:
+        cursor.execute("update t set a = 1")
+    assert len(connections) == 2
+    assert first.commits == 1 and first.cursors[-1].closed
+
+
+def test_checkout_timeout(connections):
+    pool = ConnectionPool("db", size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+    # место освобождено, соединение снова выдается
+    with pool.connection() as conn:
+        assert conn is connections[0]
+
+
+def test_rollback_on_error(connections):
+    pool = ConnectionPool("db", size=1)
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError
+    conn = connections[0]
+    assert conn.rollbacks == 1 and not conn.closed
+    with pool.connection() as again:
+        assert again is conn
+
+
+def test_discard_when_rollback_fails(connections):
+    pool = ConnectionPool("db", size=1)
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            conn.fail_rollback = True
+            raise ValueError
+    assert conn.closed
+    with pool.connection() as new:
+        assert new is not conn
+    assert len(connections) == 2
+
+
+def test_idle_health_check(connections):
+    pool = ConnectionPool("db", size=1, health_check_interval=0)
+    with pool.connection() as conn:
+        pass
+    with pool.connection() as again:
+        assert again is conn
+    assert conn.executed == ["SELECT 1"]
+    conn.alive = False
+    with pool.connection() as new:
+        assert new is not conn
+    assert conn.closed
+
+
+def test_no_health_check_within_interval(connections):
+    pool = ConnectionPool("db", size=1, health_check_interval=60)
+    with pool.connection() as conn:
+        conn.alive = False
+    with pool.connection() as again:
+        assert again is conn
+    assert conn.executed == []
+
+
+def test_prepared_cursors_lru(connections):
+    pool = ConnectionPool("db", size=1)
+    used = {}
+    for query in ("q1", "q2", "q1", "q3"):
+        with pool.prepared(query, size=2) as cursor:
+            assert used.setdefault(query, cursor) is cursor
+    # q2 использовался давнее всех и вытеснен
+    assert used["q2"].closed
+    assert not used["q1"].closed and not used["q3"].closed
+    with pool.prepared("q2", size=2) as cursor:
+        assert cursor is not used["q2"]
+    assert used["q1"].closed
+
+
+def test_prepared_cursor_closed_after_error(connections):
+    pool = ConnectionPool("db", size=1)
+    with pytest.raises(ValueError):
+        with pool.prepared("q1") as cursor:
+            raise ValueError
+    assert cursor.closed
+    with pool.prepared("q1") as again:
+        assert again is not cursor
+
+
+def test_close(connections):
+    pool = ConnectionPool("db", size=2)
+    with pool.prepared("q1") as cursor:
+        pass
+    pool.close()
+    assert connections[0].closed and cursor.closed
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            pass
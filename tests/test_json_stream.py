@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+from basic.json_stream import JsonStreamResult, iter_json_array
+
+DOCUMENT = {"found_logs": [-1.5e3, 0, 12, -7.25, 3e-2, True, None, "строка", {"a": [1, 2.5]}, [10, -20]],
+            "error": None}
+
+
+def chunked(data: bytes, size: int):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1024])
+def test_items_split_across_chunks(size):
+    data = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+    result = JsonStreamResult()
+    items = list(iter_json_array(chunked(data, size), "found_logs", result))
+    assert items == DOCUMENT["found_logs"]
+    assert result.found and result.error is None
+
+
+def test_trailing_number_is_decoded_at_eof():
+    data = b'{"found_logs": [1, -1.5e3'
+    result = JsonStreamResult()
+    assert list(iter_json_array(chunked(data, 1), "found_logs", result)) == [1, -1.5e3]
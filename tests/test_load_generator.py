@@ -0,0 +1,79 @@
+import asyncio
+import math
+import time
+
+import pytest
+
+from basic.load_generator import LoadGenerator
+from basic.transport import Transport
+
+
+class _Response:
+    status_code = 200
+
+
+class FakeRequest:
+    def __init__(self):
+        self.sent = []
+
+    def post(self, msg):
+        self.sent.append(time.perf_counter())
+        return _Response()
+
+
+class FakeAsyncRequest(FakeRequest):
+    async def post(self, msg):
+        return super().post(msg)
+
+
+def test_schedule_follows_cumulative_ramp():
+    generator = LoadGenerator(FakeRequest(), ramp_up=[(2, 50)])
+    schedule = generator.schedule()
+    offsets = [next(schedule) for _ in range(61)]
+    # интеграл частоты 25 * t^2 / 2 достигает n в момент sqrt(n / 12.5)
+    for n, offset in enumerate(offsets[:51]):
+        assert offset == pytest.approx(math.sqrt(n / 12.5))
+    # после разгона - постоянная частота 50 сообщений в секунду
+    for k, offset in enumerate(offsets[51:], start=1):
+        assert offset == pytest.approx(2 + k / 50)
+
+
+def test_schedule_with_constant_rate_and_flat_stage():
+    generator = LoadGenerator(FakeRequest(), rate=10, ramp_up=[(1, 0), (1, 10)])
+    schedule = generator.schedule()
+    offsets = [next(schedule) for _ in range(8)]
+    assert offsets[0] == pytest.approx(1)
+    assert offsets[5] == pytest.approx(2)
+    assert offsets[7] == pytest.approx(2.2)
+
+
+def _assert_ramp_send_times(sent, start):
+    # разгон до 40 сообщений в секунду за 0.5 с: 11 сообщений, n-е - в момент sqrt(n / 40)
+    assert len(sent) == 11
+    for n, sent_at in enumerate(sent):
+        assert sent_at - start == pytest.approx(math.sqrt(n / 40), abs=0.05)
+
+
+def test_ramp_up_send_times():
+    request = FakeRequest()
+    start = time.perf_counter()
+    report = LoadGenerator(request, ramp_up=[(0.5, 40)]).run(range(100), duration=0.5 + 1e-3)
+    assert report.sent == 11
+    _assert_ramp_send_times(request.sent, start)
+
+
+def test_async_ramp_up_send_times():
+    from basic.aio import AsyncLoadGenerator
+
+    request = FakeAsyncRequest()
+    start = time.perf_counter()
+    report = asyncio.run(AsyncLoadGenerator(request, ramp_up=[(0.5, 40)]).run(range(100), duration=0.5 + 1e-3))
+    assert report.sent == 11
+    _assert_ramp_send_times(request.sent, start)
+
+
+def test_concurrency_above_transport_pool_size():
+    request = FakeRequest()
+    request.transport = Transport(pool_size=10)
+    with pytest.raises(ValueError):
+        LoadGenerator(request, concurrency=50)
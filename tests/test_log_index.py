@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+from basic.log_index import OPERATION, RULE, LogIndex
+from basic.log_search import LocalLogSearch, LogFile
+
+RULES = ["rule1", "Правило1", 'rule"q', "a\\b"]
+
+
+def rule_query(rule: str) -> dict:
+    return {"sphaera_data": [{"data": f"<statementName>{rule}</statementName>"}]}
+
+
+@pytest.fixture(params=[True, False], ids=["ensure_ascii", "utf-8"])
+def log_path(request, tmp_path):
+    path = tmp_path / "Integration.log"
+    with open(path, "w", encoding="utf-8") as f:
+        for i, rule in enumerate(RULES * 2):
+            record = {"@timestamp": f"2021-01-01T00:00:{i:02d}.000+03:00", "sphaera_x_operation_id": f"оп-{i % 3}",
+                      "sphaera_data": [{"data": f"<statementName>{rule}</statementName>"}]}
+            f.write(json.dumps(record, ensure_ascii=request.param) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("rule", RULES)
+def test_index_matches_full_scan(log_path, tmp_path, rule):
+    indexed = LocalLogSearch(index_dir=str(tmp_path / "index"))
+    scanned = LocalLogSearch(use_index=False)
+    expected = scanned.find(log_path, rule_query(rule))
+    assert len(expected) == 2
+    assert indexed.find(log_path, rule_query(rule)) == expected
+    assert indexed.find_many(log_path, {"q": rule_query(rule)}) == {"q": expected}
+
+
+def test_index_keys_are_unescaped(log_path, tmp_path):
+    index = LogIndex(log_path, str(tmp_path / "index"))
+    with LogFile(log_path) as log_file:
+        index.update(log_file)
+    assert len(index.lookup(RULE, "Правило1")) == 2
+    assert len(index.lookup(OPERATION, "оп-0")) == 3
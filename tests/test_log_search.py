@@ -0,0 +1,106 @@
+import json
+import os
+
+import pytest
+
+from basic.log_search import LocalLogSearch, LogFile, matches
+
+START = "2021-01-01T00:00:00"
+
+
+def record(i: int, rule: str = None, **fields) -> dict:
+    rule = rule or f"rule{i % 3}"
+    return dict({"@timestamp": f"2021-01-01T00:{i // 60:02d}:{i % 60:02d}.000+03:00",
+                 "sphaera_x_operation_id": f"op-{i // 2}", "sphaera_operation": "Process",
+                 "sphaera_data": [{"data": f"<statementName>{rule}</statementName>"}]}, **fields)
+
+
+def write(path, records, mode="w"):
+    with open(path, mode, encoding="utf-8") as f:
+        for item in records:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+
+def rule_query(rule: str) -> dict:
+    return {"sphaera_data": [{"data": f"<statementName>{rule}</statementName>"}]}
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    path = str(tmp_path / "Integration.log")
+    write(path, [record(i) for i in range(120)])
+    return path
+
+
+@pytest.fixture(params=[True, False], ids=["index", "scan"])
+def search(request, tmp_path):
+    return LocalLogSearch(use_index=request.param, index_dir=str(tmp_path / "index"))
+
+
+def test_matches_semantics():
+    log = {"a": "abc", "b": 1, "list": [{"data": "<x>value</x>"}, {"data": "other"}]}
+    assert matches(log, {"a": "abc", "b": 1})
+    # поля сравниваются на равенство, строки в списках - как подстрока
+    assert not matches(log, {"a": "ab"})
+    assert matches(log, {"list": [{"data": "value"}]})
+    assert matches(log, {"list": [{"data": "value"}, {"data": "oth"}]})
+    assert not matches(log, {"list": [{"data": "missing"}]})
+    assert not matches(log, {"missing": None})
+
+
+def test_bisect_window(log_path):
+    with LogFile(log_path) as log_file:
+        pos = log_file.bisect("2021-01-01T00:01:00")
+        assert log_file.timestamp(pos, log_file.line_end(pos)) == "2021-01-01T00:01:00"
+        pos = log_file.bisect("2021-01-01T00:01:00", right=True)
+        assert log_file.timestamp(pos, log_file.line_end(pos)) == "2021-01-01T00:01:01"
+        assert log_file.bisect("2020-01-01T00:00:00") == 0
+        assert log_file.bisect("2022-01-01T00:00:00") == log_file.size
+
+
+def test_find_in_window(log_path, search):
+    found = search.find(log_path, rule_query("rule1"), "2021-01-01T00:00:10", "2021-01-01T00:00:19")
+    assert [log["@timestamp"][:19] for log in found] == [f"2021-01-01T00:00:{s}" for s in (10, 13, 16, 19)]
+
+
+def test_log_count(log_path, search):
+    assert len(search.find(log_path, rule_query("rule1"))) == 40
+    assert len(search.find(log_path, rule_query("rule1"), log_count=5)) == 5
+    assert search.find(log_path, rule_query("rule1"), log_count=0) == []
+    assert len(search.find(log_path, {"sphaera_x_operation_id": "op-3"}, log_count=1)) == 1
+
+
+def test_appended_partial_line(log_path, search):
+    query = {"sphaera_x_operation_id": "op-new"}
+    line = json.dumps(record(120, sphaera_x_operation_id="op-new")) + "\n"
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(line[:40])
+    # строка еще не дописана
+    assert search.find(log_path, query) == []
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write(line[40:])
+    assert len(search.find(log_path, query)) == 1
+
+
+def test_rotation(log_path, search, tmp_path):
+    assert len(search.find(log_path, rule_query("rule1"))) == 40
+    rotated = str(tmp_path / "new.log")
+    write(rotated, [record(i, rule="rotated") for i in range(10)])
+    os.replace(rotated, log_path)
+    assert search.find(log_path, rule_query("rule1")) == []
+    assert len(search.find(log_path, rule_query("rotated"))) == 10
+
+
+def test_find_many_matches_find(log_path, search):
+    queries = {"rule0": rule_query("rule0"), "op": {"sphaera_x_operation_id": "op-5"},
+               "process": {"sphaera_operation": "Process", "sphaera_data": [{"data": "rule2"}]},
+               "none": {"sphaera_operation": "Missing"}}
+    start, end = "2021-01-01T00:00:05", "2021-01-01T00:01:30"
+    expected = {name: search.find(log_path, find_dict, start, end, 7) for name, find_dict in queries.items()}
+    assert search.find_many(log_path, queries, start, end, 7) == expected
+    assert [len(logs) for logs in expected.values()] == [7, 2, 7, 0]
+
+
+def test_missing_file(search, tmp_path):
+    with pytest.raises(OSError):
+        search.find(str(tmp_path / "missing.log"), rule_query("rule1"))
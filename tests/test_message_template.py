@@ -0,0 +1,80 @@
+import json
+from datetime import datetime
+from xml.etree import ElementTree
+
+import pytest
+
+from basic.message_template import JSON, XML, MessageTemplate
+
+JSON_TEMPLATE = '{"sensor_code": "${sensor_code}", "text": "Значение: ${value}", "value": ${value}, ' \
+                '"extra": ${extra}, "price": "$$${value}"}'
+VALUES = ['кавычка " и \\ слеш', "<tag>&</tag>", "строка\nс переводом", 12, 2.5, True, None, {"a": [1, "б"]}]
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_json_escaping(value):
+    message = MessageTemplate(JSON_TEMPLATE).render(sensor_code='S"1', value=value, extra=value)
+    data = json.loads(message.decode("utf-8"))
+    assert data["sensor_code"] == 'S"1'
+    # вне строки - значением json
+    assert data["value"] == value and data["extra"] == value
+
+
+@pytest.mark.parametrize("value, text", [(VALUES[0], VALUES[0]), (VALUES[2], VALUES[2]), (12, "12"),
+                                         (True, "true"), (None, "")])
+def test_json_string_escaping(value, text):
+    data = json.loads(MessageTemplate(JSON_TEMPLATE).render(sensor_code="S1", value=value, extra=0))
+    # внутри строки - текстом
+    assert data["text"] == f"Значение: {text}"
+    assert data["price"] == f"${text}"
+
+
+def test_json_datetime():
+    timestamp = datetime(2021, 1, 1, 12, 30)
+    data = json.loads(MessageTemplate(JSON_TEMPLATE).render(sensor_code="S1", value=timestamp, extra=timestamp))
+    assert data["value"] == data["extra"] == "2021-01-01T12:30:00"
+
+
+@pytest.mark.parametrize("value", VALUES[:3])
+def test_xml_escaping(value):
+    template = MessageTemplate('<message code="${sensor_code}"><value>${value}</value></message>')
+    assert template.kind == XML
+    root = ElementTree.fromstring(template.render(sensor_code=value.replace("\n", " "), value=value))
+    # перевод строки в атрибуте парсер заменяет пробелом, поэтому в атрибут подставляется значение без него
+    assert root.get("code") == value.replace("\n", " ") and root.find("value").text == value
+
+
+def test_encoding():
+    template = MessageTemplate('<message><value>${value}</value></message>', encoding="ascii")
+    message = template.render(value="Привет")
+    assert ElementTree.fromstring(message).find("value").text == "Привет"
+
+
+def test_escaped_quote_in_template_string():
+    # экранированная кавычка не закрывает строку, поле остается внутри строки
+    template = MessageTemplate('{"text": "\\"${value}\\"", "value": ${value}}')
+    assert json.loads(template.render(value=1)) == {"text": '"1"', "value": 1}
+
+
+def test_missing_field():
+    with pytest.raises(KeyError, match="sensor_code"):
+        MessageTemplate(JSON_TEMPLATE).render(value=1, extra=1)
+
+
+def test_bind_and_generate():
+    template = MessageTemplate(JSON_TEMPLATE)
+    assert template.kind == JSON and template.fields == ("sensor_code", "value", "extra")
+    bound = template.bind(sensor_code="S1", extra=[1])
+    assert bound.fields == ("value",)
+    messages = list(template.generate(({"value": i} for i in range(3)), sensor_code="S1", extra=[1]))
+    assert messages == [bound.render(value=i) for i in range(3)]
+    assert messages[2] == template.render(sensor_code="S1", value=2, extra=[1])
+    # все поля подставлены, сообщение - неизменная часть
+    assert template.bind(sensor_code="S1", value=2, extra=[1]).render() == messages[2]
+
+
+def test_render_buffer_is_not_shared():
+    template = MessageTemplate('{"value": ${value}}')
+    first = template.render(value="первое длинное значение")
+    second = template.render(value=1)
+    assert json.loads(first) == {"value": "первое длинное значение"} and json.loads(second) == {"value": 1}
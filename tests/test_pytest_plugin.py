@@ -0,0 +1,83 @@
+import pytest
+
+import basic.pytest_plugin as plugin
+
+pytest_plugins = ["pytester"]
+
+CONFTEST = """
+import pytest
+
+pytest_plugins = ["basic.pytest_plugin"]
+
+
+def pytest_configure(config):
+    # списки объектов/датчиков без обращения к БД
+    config._basic_sensors = {1: ["S1", "S2", "S3"]}
+"""
+
+
+@pytest.fixture
+def plugin_pytester(pytester):
+    pytester.makeconftest(CONFTEST)
+    return pytester
+
+
+def test_sensor_state_marker_parametrizes_sensor_code(plugin_pytester):
+    plugin_pytester.makepyfile("""
+        import pytest
+
+        @pytest.mark.sensor_state(1, limit=2)
+        def test_card(sensor_code):
+            assert sensor_code in ("S1", "S2")
+    """)
+    result = plugin_pytester.runpytest("-v")
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(["*test_card?S1?*", "*test_card?S2?*"])
+
+
+def test_sensor_code_without_marker_is_not_parametrized(plugin_pytester):
+    plugin_pytester.makepyfile("""
+        import pytest
+
+        @pytest.fixture
+        def sensor_code():
+            return "own"
+
+        @pytest.mark.parametrize("sensor_code", ["A", "B"])
+        def test_parametrized(sensor_code):
+            assert sensor_code in ("A", "B")
+
+        @pytest.mark.sensor_state(1)
+        @pytest.mark.parametrize("value, sensor_code", [(1, "C")])
+        def test_parametrized_with_marker(value, sensor_code):
+            assert sensor_code == "C"
+
+        def test_fixture(sensor_code):
+            assert sensor_code == "own"
+    """)
+    plugin_pytester.runpytest().assert_outcomes(passed=4)
+
+
+def test_only_requested_states_are_loaded(pytester, monkeypatch):
+    requested = []
+
+    class Snapshot(plugin.SensorStateSnapshot):
+        @classmethod
+        def for_sql_helper(cls, sql_helper, ttl=None):
+            return cls(sql_helper, 0)
+
+        def get(self, state):
+            requested.append(state)
+            return ["S1"]
+
+    monkeypatch.setattr(plugin, "SensorStateSnapshot", Snapshot)
+    pytester.makeconftest('pytest_plugins = ["basic.pytest_plugin"]')
+    pytester.makepyfile("""
+        import pytest
+
+        @pytest.mark.sensor_state(2)
+        def test_card(sensor_code):
+            assert sensor_code == "S1"
+    """)
+    pytester.runpytest("--telemetry-system-id", "1").assert_outcomes(passed=1)
+    assert requested == [2]
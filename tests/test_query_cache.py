@@ -0,0 +1,75 @@
+import sqlite3
+
+from basic.db_pool import QueryResult
+from basic.queries import QueryCache, query_cache
+from basic.sql_helper import SqlHelper
+from tests.conftest import TELEMETRY_SYSTEM_ID
+
+
+class FakeCursor:
+    description = (("sensor_code",),)
+    rowcount = -1
+
+    def fetchall(self):
+        return [("S1",), ("S2",), ("S3",)]
+
+
+def test_ttl():
+    cache = QueryCache()
+    cache.put(("q1", "db"), "live", ttl=60)
+    cache.put(("q2", "db"), "expired", ttl=0)
+    assert cache.get(("q1", "db")) == "live"
+    assert cache.get(("q2", "db")) is None
+    # устаревший результат удаляется из кэша
+    assert len(cache) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_eviction():
+    cache = QueryCache(size=2)
+    cache.put(("q1",), 1, ttl=60)
+    cache.put(("q2",), 2, ttl=60)
+    cache.get(("q1",))
+    cache.put(("q3",), 3, ttl=60)
+    # q2 использовался давнее всех
+    assert cache.get(("q2",)) is None
+    assert cache.get(("q1",)) == 1 and cache.get(("q3",)) == 3
+
+
+def test_invalidate():
+    cache = QueryCache()
+    cache.put(("q1", "db", 1), 1, ttl=60)
+    cache.put(("q1", "db", 2), 2, ttl=60)
+    cache.put(("q2", "db", 1), 3, ttl=60)
+    cache.invalidate("q1")
+    assert len(cache) == 1 and cache.get(("q2", "db", 1)) == 3
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_query_result_copy_reads_from_start():
+    result = QueryResult(FakeCursor())
+    assert result.fetchone() == ("S1",)
+    copy = result.copy()
+    assert copy.fetchall() == [("S1",), ("S2",), ("S3",)]
+    # позиция чтения у копии своя
+    assert result.fetchall() == [("S2",), ("S3",)]
+    assert copy.fetchone() is None
+    assert (copy.description, copy.rowcount, len(copy)) == (result.description, result.rowcount, 3)
+
+
+def test_sql_helper_returns_cached_copies(sqlite_db):
+    sh = SqlHelper(TELEMETRY_SYSTEM_ID, sensors_conn=sqlite_db, layer_obj_conn=sqlite_db, omnidata_conn=sqlite_db)
+    query_cache.invalidate()
+    try:
+        sensors = sh.get_all_sensor_codes()
+        assert len(sensors) == 20
+        with sqlite3.connect(sqlite_db) as conn:
+            conn.execute("delete from t_sensor")
+        # справочный запрос берется из кэша, каждый вызов читает результат с начала
+        assert sh.get_all_sensor_codes() == sensors
+        assert sh.get_all_sensor_codes() == sensors
+        sh.invalidate_cache("all_sensor_codes")
+        assert sh.get_all_sensor_codes() == []
+    finally:
+        query_cache.invalidate()
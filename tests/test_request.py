@@ -0,0 +1,23 @@
+from types import SimpleNamespace
+
+import pytest
+
+from basic.request import Request
+
+
+class FakeTransport:
+    def __init__(self):
+        self.sent = []
+
+    def post(self, endpoint, data, headers=None, verify=True):
+        self.sent.append(data)
+        return SimpleNamespace(text="ok")
+
+
+@pytest.mark.parametrize("message", ['{"value": "Привет"}', '{"value": "Привет"}'.encode("utf-8")])
+def test_send_request_prints_message(message, capsys):
+    transport = FakeTransport()
+    assert Request.send_request(message, "http://adapter", "application/json", print_msg=True,
+                                transport=transport) == "ok"
+    assert transport.sent == ['{"value": "Привет"}'.encode("utf-8")]
+    assert capsys.readouterr().out == '{"value": "Привет"}\n'
@@ -0,0 +1,35 @@
+import pytest
+
+from basic.instrumentation import HistogramSink, instrumentation
+from basic.sql_helper import SqlHelper
+from tests.conftest import TELEMETRY_SYSTEM_ID
+
+
+@pytest.fixture
+def histogram():
+    sink = HistogramSink()
+    instrumentation.add_sink(sink)
+    yield sink
+    instrumentation.remove_sink(sink)
+
+
+@pytest.fixture
+def sql_helper(sqlite_db):
+    return SqlHelper(TELEMETRY_SYSTEM_ID, sensors_conn=sqlite_db, layer_obj_conn=sqlite_db, omnidata_conn=sqlite_db)
+
+
+def test_iter_sensor_attributes_span_rows(sql_helper, histogram):
+    sensor_codes = sql_helper.get_all_sensor_codes()[:7]
+    attributes = list(sql_helper.iter_sensor_attributes(sensor_codes, chunk_size=4, fetch_size=3))
+    assert [item["sensor_code"] for item in attributes] == sensor_codes
+    totals = histogram.summary()["sql sensor_attributes"]
+    # 5 атрибутов у каждого объекта
+    assert (totals["count"], totals["sensors"], totals["rows"]) == (2, 7, 35)
+    assert attributes[0] == sql_helper.get_sensor_attributes(sensor_codes[0])
+
+
+def test_iter_sensor_attributes_closed_early(sql_helper, histogram):
+    attributes = sql_helper.iter_sensor_attributes(sql_helper.get_all_sensor_codes(), fetch_size=3)
+    next(attributes)
+    attributes.close()
+    assert histogram.summary()["sql sensor_attributes"]["rows"] == 6